@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+#_____________________________________________________________________________
+#
+# Copyright (c) 2012 Berlin Institute of Technology
+# All rights reserved.
+#
+# Developed by:	Philipp Meier <pmeier82@gmail.com>
+#               Neural Information Processing Group (NI)
+#               School for Electrical Engineering and Computer Science
+#               Berlin Institute of Technology
+#               MAR 5-6, Marchstr. 23, 10587 Berlin, Germany
+#               http://www.ni.tu-berlin.de/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal with the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimers.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimers in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the names of Neural Information Processing Group (NI), Berlin
+#   Institute of Technology, nor the names of its contributors may be used to
+#   endorse or promote products derived from this Software without specific
+#   prior written permission.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# CONTRIBUTORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# WITH THE SOFTWARE.
+#_____________________________________________________________________________
+#
+# Acknowledgements:
+#   Philipp Meier <pmeier82@gmail.com>
+#_____________________________________________________________________________
+#
+"""micro-benchmarks for the numerical kernels
+
+The benchmarks follow the conventions of airspeed velocity (asv): every
+class with `time_*` methods is a benchmark, parametrised by `params` and
+`param_names`, with `setup` called for each parameter combination. They can
+be run with asv (see asv.conf.json) or offline with the bundled runner:
+
+    python -m benchmarks.run -o results.json
+
+which records the timings to JSON and can compare against an earlier run.
+"""
+__docformat__ = 'restructuredtext'
+
+##---IMPORTS
+
+import scipy as sp
+
+##---FUNCTIONS
+
+def gen_data(td, nc, dtype=sp.float64, seed=42):
+    """white noise test data
+
+    :type td: int
+    :param td: sample count
+    :type nc: int
+    :param nc: channel count
+    :type dtype: dtype resolvable
+    :param dtype: dtype of the data
+        Default=float64
+    :type seed: int
+    :param seed: seed of the random generator
+        Default=42
+    :rtype: ndarray
+    :returns: data [td, nc]
+    """
+
+    rs = sp.random.RandomState(seed)
+    return rs.randn(td, nc).astype(dtype)
+
+
+def gen_spike_train(td, rate=0.01, tf=47, seed=42):
+    """sorted spike sample times with a refractory period of tf samples
+
+    :type td: int
+    :param td: sample count
+    :type rate: float
+    :param rate: spike probability per sample
+    :type tf: int
+    :param tf: minimal distance of two spikes
+    :rtype: ndarray
+    :returns: spike times
+    """
+
+    rs = sp.random.RandomState(seed)
+    isi = tf + rs.geometric(rate, size=int(td * rate) + 1)
+    train = sp.cumsum(isi)
+    return train[train < td - tf]
+
+##---MAIN
+
+if __name__ == '__main__':
+    pass
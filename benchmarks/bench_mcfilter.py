@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+#_____________________________________________________________________________
+#
+# Copyright (c) 2012 Berlin Institute of Technology
+# All rights reserved.
+#
+# Developed by:	Philipp Meier <pmeier82@gmail.com>
+#               Neural Information Processing Group (NI)
+#               School for Electrical Engineering and Computer Science
+#               Berlin Institute of Technology
+#               MAR 5-6, Marchstr. 23, 10587 Berlin, Germany
+#               http://www.ni.tu-berlin.de/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal with the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimers.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimers in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the names of Neural Information Processing Group (NI), Berlin
+#   Institute of Technology, nor the names of its contributors may be used to
+#   endorse or promote products derived from this Software without specific
+#   prior written permission.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# CONTRIBUTORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# WITH THE SOFTWARE.
+#_____________________________________________________________________________
+#
+# Acknowledgements:
+#   Philipp Meier <pmeier82@gmail.com>
+#_____________________________________________________________________________
+#
+"""benchmarks for the multichanneled FIR filter kernels"""
+__docformat__ = 'restructuredtext'
+
+##---IMPORTS
+
+import scipy as sp
+from botmpy.common import mcfilter, mcfilter_hist, mcfilter_hist_bank
+from . import gen_data
+
+##---CLASSES
+
+class McFilter(object):
+    params = ([21, 47, 65], [1, 4, 16], [4096, 65536],
+              ['float32', 'float64'], ['direct', 'fft'])
+    param_names = ['tf', 'nc', 'td', 'dtype', 'method']
+
+    def setup(self, tf, nc, td, dtype, method):
+        self.data = gen_data(td, nc, dtype)
+        self.filt = gen_data(tf, nc, dtype, seed=23)
+
+    def time_mcfilter(self, tf, nc, td, dtype, method):
+        mcfilter(self.data, self.filt, method=method)
+
+
+class McFilterHist(object):
+    params = ([21, 47, 65], [1, 4, 16], [4096, 65536],
+              ['float32', 'float64'], ['direct', 'fft'])
+    param_names = ['tf', 'nc', 'td', 'dtype', 'method']
+
+    def setup(self, tf, nc, td, dtype, method):
+        self.data = gen_data(td, nc, dtype)
+        self.filt = gen_data(tf, nc, dtype, seed=23)
+        self.hist = sp.zeros((tf - 1, nc), dtype=dtype)
+
+    def time_mcfilter_hist(self, tf, nc, td, dtype, method):
+        mcfilter_hist(self.data, self.filt, self.hist, method=method)
+
+
+class McFilterHistBank(object):
+    params = ([1, 8, 24], [21, 47], [4, 16], [65536],
+              ['float32', 'float64'], ['direct', 'fft'])
+    param_names = ['nf', 'tf', 'nc', 'td', 'dtype', 'method']
+
+    def setup(self, nf, tf, nc, td, dtype, method):
+        self.data = gen_data(td, nc, dtype)
+        self.filt = gen_data(nf * tf, nc, dtype, seed=23).reshape(nf, tf, nc)
+        self.hist = sp.zeros((tf - 1, nc), dtype=dtype)
+
+    def time_mcfilter_hist_bank(self, nf, tf, nc, td, dtype, method):
+        mcfilter_hist_bank(self.data, self.filt, self.hist, method=method)
+
+##---MAIN
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+#_____________________________________________________________________________
+#
+# Copyright (c) 2012 Berlin Institute of Technology
+# All rights reserved.
+#
+# Developed by:	Philipp Meier <pmeier82@gmail.com>
+#               Neural Information Processing Group (NI)
+#               School for Electrical Engineering and Computer Science
+#               Berlin Institute of Technology
+#               MAR 5-6, Marchstr. 23, 10587 Berlin, Germany
+#               http://www.ni.tu-berlin.de/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal with the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimers.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimers in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the names of Neural Information Processing Group (NI), Berlin
+#   Institute of Technology, nor the names of its contributors may be used to
+#   endorse or promote products derived from this Software without specific
+#   prior written permission.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# CONTRIBUTORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# WITH THE SOFTWARE.
+#_____________________________________________________________________________
+#
+# Acknowledgements:
+#   Philipp Meier <pmeier82@gmail.com>
+#_____________________________________________________________________________
+#
+"""benchmarks for the ringbuffer"""
+__docformat__ = 'restructuredtext'
+
+##---IMPORTS
+
+from botmpy.common import MxRingBuffer
+from . import gen_data
+
+##---CLASSES
+
+class RingBuffer(object):
+    params = ([21, 47, 65], [1, 4, 16], [350, 1000],
+              ['float32', 'float64'])
+    param_names = ['tf', 'nc', 'capacity', 'dtype']
+
+    def setup(self, tf, nc, capacity, dtype):
+        self.rb = MxRingBuffer(capacity=capacity, dimension=(tf, nc),
+                               dtype=dtype)
+        self.items = gen_data(capacity * tf, nc, dtype).reshape(
+            capacity, tf, nc)
+        self.rb.extend(self.items)
+
+    def time_append(self, tf, nc, capacity, dtype):
+        self.rb.append(self.items[0])
+
+    def time_mean(self, tf, nc, capacity, dtype):
+        self.rb.mean()
+
+##---MAIN
+
+if __name__ == '__main__':
+    pass
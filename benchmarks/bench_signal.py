@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+#_____________________________________________________________________________
+#
+# Copyright (c) 2012 Berlin Institute of Technology
+# All rights reserved.
+#
+# Developed by:	Philipp Meier <pmeier82@gmail.com>
+#               Neural Information Processing Group (NI)
+#               School for Electrical Engineering and Computer Science
+#               Berlin Institute of Technology
+#               MAR 5-6, Marchstr. 23, 10587 Berlin, Germany
+#               http://www.ni.tu-berlin.de/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal with the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimers.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimers in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the names of Neural Information Processing Group (NI), Berlin
+#   Institute of Technology, nor the names of its contributors may be used to
+#   endorse or promote products derived from this Software without specific
+#   prior written permission.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# CONTRIBUTORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# WITH THE SOFTWARE.
+#_____________________________________________________________________________
+#
+# Acknowledgements:
+#   Philipp Meier <pmeier82@gmail.com>
+#_____________________________________________________________________________
+#
+"""benchmarks for the filter utility and signal functions"""
+__docformat__ = 'restructuredtext'
+
+##---IMPORTS
+
+import scipy as sp
+from botmpy.common import xi_vs_f, mteo, xcorr, mcvec_to_conc
+from . import gen_data
+
+##---CLASSES
+
+class XiVsF(object):
+    params = ([2, 8, 16], [21, 47, 65], [1, 4])
+    param_names = ['nf', 'tf', 'nc']
+
+    def setup(self, nf, tf, nc):
+        self.xi = gen_data(nf * tf, nc).reshape(nf, tf, nc)
+        self.xi = sp.asarray([mcvec_to_conc(xi) for xi in self.xi])
+        self.f = self.xi[::-1].copy()
+
+    def time_xi_vs_f(self, nf, tf, nc):
+        xi_vs_f(self.xi, self.f, nc=nc)
+
+
+class Mteo(object):
+    params = ([4096, 65536], ['float32', 'float64'])
+    param_names = ['td', 'dtype']
+
+    def setup(self, td, dtype):
+        self.data = gen_data(td, 1, dtype)[:, 0]
+
+    def time_mteo(self, td, dtype):
+        mteo(self.data, kvalues=[1, 3, 5])
+
+
+class Xcorr(object):
+    params = ([1024, 16384], [None, 64], ['float32', 'float64'])
+    param_names = ['td', 'lag', 'dtype']
+
+    def setup(self, td, lag, dtype):
+        self.a = gen_data(td, 1, dtype)[:, 0]
+        self.b = gen_data(td, 1, dtype, seed=23)[:, 0]
+
+    def time_xcorr(self, td, lag, dtype):
+        xcorr(self.a, self.b, lag=lag)
+
+##---MAIN
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+#_____________________________________________________________________________
+#
+# Copyright (c) 2012 Berlin Institute of Technology
+# All rights reserved.
+#
+# Developed by:	Philipp Meier <pmeier82@gmail.com>
+#               Neural Information Processing Group (NI)
+#               School for Electrical Engineering and Computer Science
+#               Berlin Institute of Technology
+#               MAR 5-6, Marchstr. 23, 10587 Berlin, Germany
+#               http://www.ni.tu-berlin.de/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal with the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimers.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimers in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the names of Neural Information Processing Group (NI), Berlin
+#   Institute of Technology, nor the names of its contributors may be used to
+#   endorse or promote products derived from this Software without specific
+#   prior written permission.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# CONTRIBUTORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# WITH THE SOFTWARE.
+#_____________________________________________________________________________
+#
+# Acknowledgements:
+#   Philipp Meier <pmeier82@gmail.com>
+#_____________________________________________________________________________
+#
+"""benchmarks for the spike detection and epoch handling functions"""
+__docformat__ = 'restructuredtext'
+
+##---IMPORTS
+
+import scipy as sp
+from botmpy.common import threshold_detection, merge_epochs, extract_spikes
+from . import gen_data, gen_spike_train
+
+##---CLASSES
+
+class ThresholdDetection(object):
+    params = ([4, 16], [65536], ['float32', 'float64'])
+    param_names = ['nc', 'td', 'dtype']
+
+    def setup(self, nc, td, dtype):
+        self.data = gen_data(td, nc, dtype)
+        self.th = sp.ones(nc) * 3.0
+
+    def time_threshold_detection(self, nc, td, dtype):
+        threshold_detection(self.data, self.th, min_dist=16)
+
+
+class MergeEpochs(object):
+    params = ([100, 1000, 10000], [2, 8])
+    param_names = ['n', 'nsets']
+
+    def setup(self, n, nsets):
+        self.sets = []
+        for k in xrange(nsets):
+            starts = gen_spike_train(n * 100, rate=0.01, tf=5, seed=k)
+            self.sets.append(sp.column_stack((starts, starts + 47)))
+
+    def time_merge_epochs(self, n, nsets):
+        merge_epochs(*self.sets, min_dist=10)
+
+
+class ExtractSpikes(object):
+    params = ([21, 47, 65], [1, 4, 16], [True, False])
+    param_names = ['tf', 'nc', 'mc']
+
+    def setup(self, tf, nc, mc):
+        self.data = gen_data(65536, nc)
+        starts = gen_spike_train(65536, rate=0.01, tf=tf)
+        self.epochs = sp.column_stack((starts, starts + tf))
+
+    def time_extract_spikes(self, tf, nc, mc):
+        extract_spikes(self.data, self.epochs, mc=mc)
+
+##---MAIN
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+#_____________________________________________________________________________
+#
+# Copyright (c) 2012 Berlin Institute of Technology
+# All rights reserved.
+#
+# Developed by:	Philipp Meier <pmeier82@gmail.com>
+#               Neural Information Processing Group (NI)
+#               School for Electrical Engineering and Computer Science
+#               Berlin Institute of Technology
+#               MAR 5-6, Marchstr. 23, 10587 Berlin, Germany
+#               http://www.ni.tu-berlin.de/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal with the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimers.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimers in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the names of Neural Information Processing Group (NI), Berlin
+#   Institute of Technology, nor the names of its contributors may be used to
+#   endorse or promote products derived from this Software without specific
+#   prior written permission.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# CONTRIBUTORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# WITH THE SOFTWARE.
+#_____________________________________________________________________________
+#
+# Acknowledgements:
+#   Philipp Meier <pmeier82@gmail.com>
+#_____________________________________________________________________________
+#
+"""offline runner for the benchmark suite
+
+Discovers all `bench_*` modules of the benchmarks package, runs every `time_*`
+method for each parameter combination and records the timings to JSON::
+
+    python -m benchmarks.run -o results.json [-b PATTERN]
+    python -m benchmarks.run -o new.json --compare old.json
+
+When comparing, benchmarks that got slower than the threshold ratio are
+reported as regressions and the exit status is set to 1.
+"""
+__docformat__ = 'restructuredtext'
+
+##---IMPORTS
+
+import argparse
+import inspect
+import itertools
+import json
+import os
+import pkgutil
+import platform
+import re
+import sys
+import time
+import timeit
+import numpy
+import scipy as sp
+
+##---CONSTANTS
+
+MIN_TIME = 0.05
+REPEAT = 5
+
+##---FUNCTIONS
+
+def _param_grid(cls):
+    """parameter combinations of a benchmark class"""
+
+    params = getattr(cls, 'params', [])
+    if not params:
+        return [], [()]
+    if not isinstance(params[0], (list, tuple)):
+        params = [params]
+    names = getattr(cls, 'param_names', None)
+    if names is None:
+        names = ['param%d' % (i + 1) for i in xrange(len(params))]
+    return list(names), list(itertools.product(*params))
+
+
+def discover(pattern=None):
+    """find the benchmarks of the package
+
+    :type pattern: str
+    :param pattern: regular expression the benchmark name has to match. The
+        name is `module.Class.method`.
+        Default=None
+    :rtype: list
+    :returns: list of (name, cls, method name)
+    """
+
+    pkg_dir = os.path.dirname(os.path.abspath(__file__))
+    rval = []
+    for _, mod_name, _ in sorted(pkgutil.iter_modules([pkg_dir])):
+        if not mod_name.startswith('bench_'):
+            continue
+        __import__('benchmarks.%s' % mod_name)
+        mod = sys.modules['benchmarks.%s' % mod_name]
+        for cls_name, cls in sorted(inspect.getmembers(mod, inspect.isclass)):
+            if cls.__module__ != mod.__name__:
+                continue
+            for meth in sorted(dir(cls)):
+                if not meth.startswith('time_'):
+                    continue
+                name = '%s.%s.%s' % (mod_name, cls_name, meth)
+                if pattern is None or re.search(pattern, name):
+                    rval.append((name, cls, meth))
+    return rval
+
+
+def time_call(func, min_time=MIN_TIME, repeat=REPEAT):
+    """time a callable
+
+    The number of calls per measurement is doubled until one measurement
+    takes at least `min_time` seconds.
+
+    :type func: callable
+    :param func: callable without arguments
+    :type min_time: float
+    :param min_time: minimal duration of one measurement in seconds
+        Default=MIN_TIME
+    :type repeat: int
+    :param repeat: number of measurements
+        Default=REPEAT
+    :rtype: dict
+    :returns: min and median seconds per call, number and repeat
+    """
+
+    timer = timeit.Timer(func)
+    number = 1
+    while True:
+        t = timer.timeit(number)
+        if t >= min_time or number >= 2 ** 20:
+            break
+        number *= 2
+    times = [t] + timer.repeat(repeat - 1, number)
+    times = sp.asarray(times) / number
+    return {'min': float(times.min()), 'median': float(sp.median(times)),
+            'number': number, 'repeat': repeat}
+
+
+def run(benchmarks, min_time=MIN_TIME, repeat=REPEAT, verbose=True):
+    """run benchmarks
+
+    :type benchmarks: list
+    :param benchmarks: benchmarks as returned by `discover`
+    :type min_time: float
+    :param min_time: minimal duration of one measurement in seconds
+        Default=MIN_TIME
+    :type repeat: int
+    :param repeat: number of measurements
+        Default=REPEAT
+    :type verbose: bool
+    :param verbose: print progress
+        Default=True
+    :rtype: dict
+    :returns: benchmark name -> list of results per parameter combination
+    """
+
+    rval = {}
+    for name, cls, meth in benchmarks:
+        names, grid = _param_grid(cls)
+        rval[name] = []
+        for combo in grid:
+            obj = cls()
+            res = {'params': dict(zip(names, combo))}
+            try:
+                if hasattr(obj, 'setup'):
+                    obj.setup(*combo)
+            except NotImplementedError:
+                res['skipped'] = True
+            else:
+                func = getattr(obj, meth)
+                res.update(time_call(lambda: func(*combo), min_time, repeat))
+                if hasattr(obj, 'teardown'):
+                    obj.teardown(*combo)
+            rval[name].append(res)
+            if verbose:
+                print '%-50s %-50s %s' % (
+                    name, _fmt_params(res['params']),
+                    'skipped' if 'skipped' in res else
+                    '%.3gs' % res['min'])
+                sys.stdout.flush()
+    return rval
+
+
+def environment():
+    """description of the benchmark environment"""
+
+    from botmpy.common.mcfilter import USE_CYTHON
+
+    return {
+        'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'numpy': numpy.__version__,
+        'scipy': sp.__version__,
+        'use_cython': USE_CYTHON}
+
+
+def compare(new, old, threshold=1.2):
+    """compare two result sets
+
+    :type new: dict
+    :param new: new results
+    :type old: dict
+    :param old: reference results
+    :type threshold: float
+    :param threshold: ratio new/old above which a result is a regression
+        Default=1.2
+    :rtype: list
+    :returns: list of (name, params, old, new, ratio) for the regressions
+    """
+
+    regressions = []
+    for name in sorted(new):
+        if name not in old:
+            continue
+        ref = dict((_fmt_params(r['params']), r) for r in old[name])
+        for res in new[name]:
+            key = _fmt_params(res['params'])
+            if key not in ref or 'min' not in res or 'min' not in ref[key]:
+                continue
+            ratio = res['min'] / ref[key]['min']
+            flag = ''
+            if ratio > threshold:
+                flag = ' REGRESSION'
+                regressions.append(
+                    (name, key, ref[key]['min'], res['min'], ratio))
+            elif ratio < 1.0 / threshold:
+                flag = ' improved'
+            print '%-50s %-50s %.3gs -> %.3gs (%.2fx)%s' % (
+                name, key, ref[key]['min'], res['min'], ratio, flag)
+    return regressions
+
+
+def _fmt_params(params):
+    return ', '.join('%s=%s' % (k, params[k]) for k in sorted(params))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='run the BOTMpy micro-benchmarks')
+    parser.add_argument('-o', '--output', default=None,
+                        help='write the results to this JSON file')
+    parser.add_argument('-b', '--bench', default=None,
+                        help='regular expression to select benchmarks')
+    parser.add_argument('-c', '--compare', default=None,
+                        help='JSON file of an earlier run to compare with')
+    parser.add_argument('-t', '--threshold', type=float, default=1.2,
+                        help='slowdown ratio reported as regression')
+    parser.add_argument('--min-time', type=float, default=MIN_TIME,
+                        help='minimal duration of one measurement')
+    parser.add_argument('--repeat', type=int, default=REPEAT,
+                        help='number of measurements')
+    args = parser.parse_args(argv)
+
+    results = run(discover(args.bench), args.min_time, args.repeat)
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump({'meta': environment(), 'results': results}, f,
+                      indent=1, sort_keys=True)
+    if args.compare is not None:
+        with open(args.compare, 'r') as f:
+            old = json.load(f)['results']
+        regressions = compare(results, old, args.threshold)
+        if regressions:
+            print '%d regressions' % len(regressions)
+            return 1
+    return 0
+
+##---MAIN
+
+if __name__ == '__main__':
+    sys.exit(main())
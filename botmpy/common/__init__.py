@@ -58,10 +58,14 @@ from .funcs_spike import *
 
 from .datafile import *
 from .mcfilter import *
+from .sic import *
 
 from .amplitude_histogram import *
+from .chunk_source import *
 from .covariance_estimator import *
+from .event_accumulator import *
 from .matrix_ops import *
+from .pool import *
 from .ringbuffer import *
 from .spike_alignment import *
 
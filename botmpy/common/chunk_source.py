@@ -0,0 +1,366 @@
+# -*- coding: utf-8 -*-
+#_____________________________________________________________________________
+#
+# Copyright (c) 2012 Berlin Institute of Technology
+# All rights reserved.
+#
+# Developed by:	Philipp Meier <pmeier82@gmail.com>
+#               Neural Information Processing Group (NI)
+#               School for Electrical Engineering and Computer Science
+#               Berlin Institute of Technology
+#               MAR 5-6, Marchstr. 23, 10587 Berlin, Germany
+#               http://www.ni.tu-berlin.de/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal with the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimers.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimers in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the names of Neural Information Processing Group (NI), Berlin
+#   Institute of Technology, nor the names of its contributors may be used to
+#   endorse or promote products derived from this Software without specific
+#   prior written permission.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# CONTRIBUTORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# WITH THE SOFTWARE.
+#_____________________________________________________________________________
+#
+# Acknowledgements:
+#   Philipp Meier <pmeier82@gmail.com>
+#_____________________________________________________________________________
+#
+
+
+"""chunk-wise access to recordings with prefetching"""
+__docformat__ = 'restructuredtext'
+__all__ = ['ChunkSourceError', 'ChunkSource', 'ArrayChunkSource',
+           'MemmapChunkSource']
+
+##---IMPORTS
+
+import os
+from Queue import Queue, Empty, Full
+from threading import Thread, Event
+import sys
+import scipy as sp
+
+##---CLASSES
+
+class ChunkSourceError(Exception):
+    pass
+
+
+class ChunkSource(object):
+    """abstract chunk-wise reader for a recording
+
+    Iterating over a `ChunkSource` yields the recording [n, nc] in
+    consecutive chunks of `chunk_size` samples. Every chunk is a C-contiguous
+    copy of the recording converted to `dtype`. With `prefetch` > 0 the
+    chunks are read and converted by a background thread that runs up to
+    `prefetch` chunks ahead of the consumer, so reading the next chunk
+    overlaps with processing the current one. At most `prefetch` + 2 chunks
+    are held in memory at any time.
+
+    Implementations provide the shape of the recording and the read of a
+    sample range as the private interface. The memory is bounded only if the
+    recording itself is not held in memory, as for `MemmapChunkSource`. A
+    `DataFile` can not read a sample range, so a recording loaded by
+    `DataFile.get_data` can be wrapped by `ArrayChunkSource`, but is held in
+    memory as a whole.
+    """
+
+    ## constructor
+
+    def __init__(self, chunk_size=100000, dtype=None, prefetch=1):
+        """
+        :type chunk_size: int
+        :param chunk_size: chunk size (samples)
+            Default=100000
+        :type dtype: dtype resolvable
+        :param dtype: dtype of the chunks, use the dtype of the consumer to
+            convert in the prefetch thread. If None, use the dtype of the
+            recording.
+            Default=None
+        :type prefetch: int
+        :param prefetch: number of chunks to read ahead in the background, if
+            0 the chunks are read on demand.
+            Default=1
+        """
+
+        # checks
+        if chunk_size < 1:
+            raise ValueError('chunk_size < 1')
+        if prefetch < 0:
+            raise ValueError('prefetch < 0')
+
+        # members
+        self._chunk_size = int(chunk_size)
+        self._dtype = None if dtype is None else sp.dtype(dtype)
+        self._prefetch = int(prefetch)
+
+    ## properties
+
+    def get_chunk_size(self):
+        return self._chunk_size
+
+    chunk_size = property(get_chunk_size, doc='chunk size (samples)')
+
+    def get_dtype(self):
+        if self._dtype is None:
+            return self._get_dtype()
+        return self._dtype
+
+    dtype = property(get_dtype, doc='dtype of the chunks')
+
+    def get_nsample(self):
+        return self._get_shape()[0]
+
+    nsample = property(get_nsample, doc='length of the recording (samples)')
+
+    def get_nc(self):
+        return self._get_shape()[1]
+
+    nc = property(get_nc, doc='channel count of the recording')
+
+    ## methods interface
+
+    def read(self, start, stop, out=None):
+        """read a sample range of the recording
+
+        :type start: int
+        :param start: first sample
+        :type stop: int
+        :param stop: sample after the last sample
+        :type out: ndarray
+        :param out: if not None, the samples are written to this array
+            [stop - start, nc] in place and converted to its dtype, e.g. the
+            region of a `FilterWorkspace` returned by `reserve`.
+            Default=None
+        :rtype: ndarray
+        :returns: C-contiguous copy of the samples [stop - start, nc], or
+            `out`
+        """
+
+        start = max(0, int(start))
+        stop = max(start, min(self.nsample, int(stop)))
+        if out is None:
+            return sp.array(self._read(start, stop), dtype=self.dtype,
+                            order='C')
+        if out.shape != (stop - start, self.nc):
+            raise ValueError('out has to be [%d, %d]' %
+                             (stop - start, self.nc))
+        out[:] = self._read(start, stop)
+        return out
+
+    def close(self):
+        """release the resources of the recording"""
+
+        self._close()
+
+    ## private interface - to be implemented in subclasses
+
+    def _get_shape(self):
+        """shape of the recording
+
+        :rtype: tuple
+        :returns: (samples, channels)
+        """
+
+        raise NotImplementedError
+
+    def _get_dtype(self):
+        """dtype of the recording"""
+
+        raise NotImplementedError
+
+    def _read(self, start, stop):
+        """read a sample range of the recording, may return a view
+
+        :type start: int
+        :param start: first sample
+        :type stop: int
+        :param stop: sample after the last sample
+        :rtype: ndarray
+        :returns: samples [stop - start, nc]
+        """
+
+        raise NotImplementedError
+
+    def _close(self):
+        pass
+
+    ## iteration
+
+    def _iter_chunks(self):
+        for start in xrange(0, self.nsample, self._chunk_size):
+            yield self.read(start, start + self._chunk_size)
+
+    def _iter_prefetch(self):
+        queue = Queue(maxsize=self._prefetch)
+        stop = Event()
+        reader = Thread(target=_prefetch_loop,
+                        args=(self._iter_chunks(), queue, stop))
+        reader.daemon = True
+        reader.start()
+        try:
+            while True:
+                item = queue.get()
+                if item is None:
+                    break
+                success, value = item
+                if success is False:
+                    raise value[0], value[1], value[2]
+                yield value
+        finally:
+            # the consumer may stop early, unblock and stop the reader
+            stop.set()
+            while reader.is_alive():
+                try:
+                    queue.get(timeout=.01)
+                except Empty:
+                    pass
+            reader.join()
+
+    ## special methods
+
+    def __iter__(self):
+        if self._prefetch > 0:
+            return self._iter_prefetch()
+        return self._iter_chunks()
+
+    def __len__(self):
+        return -(-self.nsample // self._chunk_size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __str__(self):
+        return '%s(ns=%s,nc=%s,chunk_size=%s,prefetch=%s)' % (
+            self.__class__.__name__, self.nsample, self.nc, self._chunk_size,
+            self._prefetch)
+
+
+class ArrayChunkSource(ChunkSource):
+    """chunk source for an array like recording
+
+    The recording may be any array [n, nc] that supports slicing along the
+    samples, e.g. an ndarray or a `numpy.memmap`.
+    """
+
+    def __init__(self, data, **kwargs):
+        """
+        :type data: ndarray
+        :param data: recording [n, nc]
+        :keyword: see `ChunkSource`
+        """
+
+        # checks
+        if data.ndim != 2:
+            raise ChunkSourceError('data has to be of shape [n, nc]')
+
+        # super
+        super(ArrayChunkSource, self).__init__(**kwargs)
+
+        # members
+        self._data = data
+
+    def _get_shape(self):
+        return self._data.shape
+
+    def _get_dtype(self):
+        return self._data.dtype
+
+    def _read(self, start, stop):
+        return self._data[start:stop]
+
+    def _close(self):
+        self._data = sp.empty((0,) + self._data.shape[1:], self._data.dtype)
+
+
+class MemmapChunkSource(ArrayChunkSource):
+    """chunk source for a raw binary recording on disk
+
+    The file holds the samples in row major order (channels interleaved)
+    and is accessed by a read-only `numpy.memmap`, so only the chunks in
+    flight are held in memory, regardless of the size of the recording.
+    """
+
+    def __init__(self, filename, nc, file_dtype=sp.int16, offset=0,
+                 **kwargs):
+        """
+        :type filename: str
+        :param filename: path to the raw binary file
+        :type nc: int
+        :param nc: channel count
+        :type file_dtype: dtype resolvable
+        :param file_dtype: dtype of the samples in the file
+            Default=int16
+        :type offset: int
+        :param offset: size of the file header (bytes)
+            Default=0
+        :keyword: see `ChunkSource`
+        """
+
+        # checks
+        file_dtype = sp.dtype(file_dtype)
+        nbytes = os.path.getsize(filename) - int(offset)
+        if nbytes < 0 or nbytes % (file_dtype.itemsize * nc) != 0:
+            raise ChunkSourceError('file size does not match %s channels of '
+                                   '%s' % (nc, file_dtype))
+
+        # super
+        ns = nbytes // (file_dtype.itemsize * nc)
+        if ns > 0:
+            data = sp.memmap(filename, dtype=file_dtype, mode='r',
+                             offset=int(offset), shape=(ns, int(nc)))
+        else:
+            data = sp.empty((0, int(nc)), dtype=file_dtype)
+        super(MemmapChunkSource, self).__init__(data, **kwargs)
+
+        # members
+        self._filename = filename
+
+    def get_filename(self):
+        return self._filename
+
+    filename = property(get_filename, doc='path to the raw binary file')
+
+##---FUNCTIONS
+
+def _prefetch_loop(chunks, queue, stop):
+    """read the chunks into the queue until they are exhausted or stopped"""
+
+    try:
+        for chunk in chunks:
+            while not stop.is_set():
+                try:
+                    queue.put((True, chunk), timeout=.1)
+                    break
+                except Full:
+                    pass
+            if stop.is_set():
+                return
+    except:
+        queue.put((False, sys.exc_info()))
+        return
+    queue.put(None)
+
+##---MAIN
+
+if __name__ == '__main__':
+    pass
@@ -90,9 +90,16 @@ class BaseTimeSeriesCovarianceEstimator(object):
         self._is_initialised = False
         self._n_upd = 0
         self._n_upd_smpl = 0
+        self._version = 0
 
     ## getter and setter methods
 
+    def get_version(self):
+        return self._version
+
+    version = property(get_version, doc='modification counter, incremented '
+                                        'whenever the estimate changes')
+
     def get_cmx(self, **kwargs):
         if self._is_initialised is False:
             raise RuntimeError('Estimator has not been initialised!')
@@ -166,6 +173,7 @@ class BaseTimeSeriesCovarianceEstimator(object):
         self._is_initialised = False
         self._n_upd = 0
         self._n_upd_smpl = 0
+        self._version += 1
         self._reset()
 
     def update(self, data, **kwargs):
@@ -188,6 +196,7 @@ class BaseTimeSeriesCovarianceEstimator(object):
         if n_smpl > 0:
             self._n_upd += 1
             self._n_upd_smpl += n_smpl
+            self._version += 1
 
     ## private methods
 
@@ -389,10 +398,12 @@ class TimeSeriesCovE(BaseTimeSeriesCovarianceEstimator):
         if cs_new in self._chan_set:
             raise ValueError('channel set already included!')
         self._chan_set.append(tuple(sorted(cs_new)))
+        self._version += 1
 
     def rm_chan_set(self, cs_rm):
         if tuple(cs_rm) in self._chan_set:
             self._chan_set.remove(tuple(cs_rm))
+            self._version += 1
         else:
             raise ValueError('channel set not included!')
 
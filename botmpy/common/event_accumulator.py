@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+#_____________________________________________________________________________
+#
+# Copyright (c) 2012 Berlin Institute of Technology
+# All rights reserved.
+#
+# Developed by:	Philipp Meier <pmeier82@gmail.com>
+#               Neural Information Processing Group (NI)
+#               School for Electrical Engineering and Computer Science
+#               Berlin Institute of Technology
+#               MAR 5-6, Marchstr. 23, 10587 Berlin, Germany
+#               http://www.ni.tu-berlin.de/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal with the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimers.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimers in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the names of Neural Information Processing Group (NI), Berlin
+#   Institute of Technology, nor the names of its contributors may be used to
+#   endorse or promote products derived from this Software without specific
+#   prior written permission.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# CONTRIBUTORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# WITH THE SOFTWARE.
+#_____________________________________________________________________________
+#
+# Acknowledgements:
+#   Philipp Meier <pmeier82@gmail.com>
+#_____________________________________________________________________________
+#
+
+"""growable event array for the results of spike sorting"""
+__docformat__ = 'restructuredtext'
+__all__ = ['EventAccumulator']
+
+##---IMPORTS
+
+import scipy as sp
+from .util import INDEX_DTYPE
+
+##---CLASSES
+
+class EventAccumulator(object):
+    """growable array of spike events
+
+    The events are stored as rows [time, unit] of a preallocated INDEX_DTYPE
+    array. The capacity is doubled when the array is full, so appending
+    takes amortised constant time and no python object is kept per event.
+
+    The events are kept in the order they were added. `sorted_events`
+    yields the event stream sorted by time and `spike_trains` the time
+    sorted spike train per unit. Events with equal times keep the order they
+    were added in. `version` changes whenever events are added or removed,
+    results derived from the events can be cached on it.
+    """
+
+    ## constructor
+
+    def __init__(self, capacity=1024):
+        """
+        :type capacity: int
+        :param capacity: initial capacity (events)
+            Default=1024
+        """
+
+        # checks
+        if capacity < 1:
+            raise ValueError('capacity < 1')
+
+        # members
+        self._data = sp.empty((int(capacity), 2), dtype=INDEX_DTYPE)
+        self._n = 0
+        self._version = 0
+
+    ## properties
+
+    def get_capacity(self):
+        return self._data.shape[0]
+
+    capacity = property(get_capacity, doc='capacity (events)')
+
+    def get_version(self):
+        return self._version
+
+    version = property(get_version, doc='modification counter')
+
+    def get_events(self):
+        return self._data[:self._n]
+
+    events = property(get_events,
+                      doc='view on the events [[time, unit]] in the order '
+                          'they were added')
+
+    ## methods interface
+
+    def append(self, time, unit):
+        """add one event
+
+        :type time: int
+        :param time: event time [sample]
+        :type unit: int
+        :param unit: unit id
+        """
+
+        if self._n == self._data.shape[0]:
+            self._grow(self._n + 1)
+        self._data[self._n] = time, unit
+        self._n += 1
+        self._version += 1
+
+    def extend(self, times, units):
+        """add several events
+
+        :type times: ndarray
+        :param times: event times [sample]
+        :type units: ndarray or int
+        :param units: unit ids, one per event or one for all events
+        """
+
+        times = sp.asarray(times, dtype=INDEX_DTYPE).ravel()
+        m = times.size
+        if m == 0:
+            return
+        if self._n + m > self._data.shape[0]:
+            self._grow(self._n + m)
+        self._data[self._n:self._n + m, 0] = times
+        self._data[self._n:self._n + m, 1] = units
+        self._n += m
+        self._version += 1
+
+    def clear(self):
+        """remove all events, the capacity is kept"""
+
+        self._n = 0
+        self._version += 1
+
+    def sorted_events(self, offset=0):
+        """event stream sorted by time
+
+        :type offset: int
+        :param offset: offset added to the event times
+            Default=0
+        :rtype: ndarray
+        :returns: events [[time, unit]] sorted by time
+        """
+
+        ev = self._data[:self._n]
+        rval = ev[sp.argsort(ev[:, 0], kind='mergesort')]
+        if offset:
+            rval[:, 0] += offset
+        return rval
+
+    def spike_trains(self, units=None, offset=0):
+        """time sorted spike trains per unit
+
+        :type units: list
+        :param units: units to return spike trains for, units without events
+            get an empty spike train. If None, all units with events.
+            Default=None
+        :type offset: int
+        :param offset: offset added to the event times
+            Default=0
+        :rtype: dict
+        :returns: spike trains keyed by unit
+        """
+
+        ev = self.sorted_events(offset=offset)
+        ev = ev[sp.argsort(ev[:, 1], kind='mergesort')]
+        if units is None:
+            units = sp.unique(ev[:, 1]).tolist()
+        bounds = sp.searchsorted(ev[:, 1], units, side='left'), \
+                 sp.searchsorted(ev[:, 1], units, side='right')
+        return dict((u, ev[a:b, 0].copy())
+                    for u, a, b in zip(units, bounds[0], bounds[1]))
+
+    def _grow(self, size):
+        data = sp.empty((max(size, 2 * self._data.shape[0]), 2),
+                        dtype=INDEX_DTYPE)
+        data[:self._n] = self._data[:self._n]
+        self._data = data
+
+    ## special methods
+
+    def __len__(self):
+        return self._n
+
+    def __str__(self):
+        return '%s(events=%s,capacity=%s)' % (self.__class__.__name__,
+                                               self._n, self.capacity)
+
+##---MAIN
+
+if __name__ == '__main__':
+    pass
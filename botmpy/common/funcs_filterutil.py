@@ -55,9 +55,7 @@ __all__ = ['xi_vs_f', 'kteo', 'mteo']
 ##---IMPORTS
 
 import scipy as sp
-from .funcs_general import mcvec_from_conc
-from .funcs_spike import get_cut
-from .mcfilter import mcfilter
+from numpy.fft import rfft, irfft
 from .util import log
 
 ##---FUNCTIONS
@@ -67,7 +65,13 @@ def xi_vs_f(xi, f, nc=4):
 
     The xcorr-tensor for a set of patterns (xi) and their matched filters (f)
     with a certain lag is returned as ndarray with dimensions [xi, f, tau].
-    All multichanneled vectors are presented in their concatenated form.
+    All multichanneled vectors are presented in their concatenated form. The
+    number of patterns and filters may differ, to compute a subset of rows or
+    columns of the tensor.
+
+    All cross-correlations are computed at once in the frequency domain: the
+    spectra of all patterns and filters are computed per channel, multiplied
+    pairwise and summed over the channels. The zero lag is at index tf-1.
 
     :type xi: ndarray
     :param xi: The patterns, one concatenated pattern per row.
@@ -82,29 +86,27 @@ def xi_vs_f(xi, f, nc=4):
     """
 
     # init and checks
-    xi = sp.asarray(xi)
-    f = sp.asarray(f)
-    if xi.shape[0] != f.shape[0]:
-        raise ValueError('count of xi and f does not match: xi(%s), f(%s)'
-                         % (xi.shape[0], f.shape[0]))
+    xi = sp.atleast_2d(xi)
+    f = sp.atleast_2d(f)
     if xi.shape[1] != f.shape[1]:
         raise ValueError('sample count mismatch: xi(%s), f(%s)'
                          % (xi.shape[1], f.shape[1]))
-    n = xi.shape[0]
+    n_xi, n_f = xi.shape[0], f.shape[0]
     tf = int(xi.shape[1] / nc)
     if tf != round(float(xi.shape[1]) / float(nc)):
         raise ValueError('sample count does not match to nc: xi(%s), nc(%s)' %
                          (xi.shape[1], nc))
-    pad_len = get_cut(tf)[0]
-    pad = sp.zeros((pad_len, nc))
-    rval = sp.zeros((n, n, 2 * tf - 1))
+    if n_xi == 0 or n_f == 0:
+        return sp.zeros((n_xi, n_f, 2 * tf - 1))
+    nfft = int(2 ** sp.ceil(sp.log2(2 * tf - 1)))
 
     # calc xcorrs
-    for i in xrange(n):
-        xi_i = sp.vstack((pad, mcvec_from_conc(xi[i], nc=nc), pad))
-        for j in xrange(n):
-            f_j = sp.vstack((pad, mcvec_from_conc(f[j], nc=nc), pad))
-            rval[i, j] = mcfilter(xi_i, f_j)
+    xi_spec = rfft(xi.reshape(n_xi, nc, tf), nfft, axis=2)
+    f_spec = rfft(f.reshape(n_f, nc, tf), nfft, axis=2).conj()
+    rval = irfft(sp.einsum('icf,jcf->ijf', xi_spec, f_spec), nfft, axis=2)
+    # reorder the circular lags, so that the lags run from -(tf-1) to tf-1
+    rval = sp.concatenate((rval[..., nfft - tf + 1:], rval[..., :tf]),
+                          axis=2)
 
     # return
     return rval
@@ -49,7 +49,8 @@ __all__ = [
     'threshold_detection', 'merge_epochs', 'invert_epochs',
     'epochs_from_binvec', 'epochs_from_spiketrain',
     'epochs_from_spiketrain_set', 'chunk_data', 'extract_spikes',
-    'get_cut', 'snr_maha', 'snr_peak', 'snr_power', 'overlaps']
+    'get_cut', 'snr_maha', 'snr_peak', 'snr_power', 'overlaps',
+    'event_overlaps', 'overlap_mask']
 
 ##--- IMPORTS
 
@@ -231,11 +232,14 @@ def epochs_from_binvec(binvec):
     if not binvec.any():
         return sp.zeros((0, 2))
 
-    # calculate
-    output = sp.correlate(sp.concatenate(([0], binvec, [0])), [-1, 1], 'same')
+    # calculate, the edges of the runs are the sign changes of the padded
+    # binvec, int8 to keep the temporaries small
+    padded = sp.zeros(len(binvec) + 2, dtype=sp.int8)
+    padded[1:-1] = binvec
+    output = sp.diff(padded)
     return sp.vstack((
-        (output > 0).nonzero()[0] - 1,
-        (output < 0).nonzero()[0] - 2)).T
+        (output > 0).nonzero()[0],
+        (output < 0).nonzero()[0] - 1)).T
 
 
 def epochs_from_spiketrain(st, cut, end=None, with_corrected_st=False):
@@ -498,6 +502,11 @@ def overlaps(sts, window):
     """produces dict of boolean sequences indicating for all spikes in all
     spike trains in :sts: if it participates in an overlap event.
 
+    A spike participates in an overlap event if a spike of another spike
+    train is closer than `window` samples. The spike trains are merged into
+    one event stream and sorted, so the overlaps of all spike trains are
+    found in a single pass.
+
     :type sts: dict
     :param sts: spike train set
     :type window: int
@@ -506,40 +515,92 @@ def overlaps(sts, window):
     """
 
     # inits
-    n = len(sts)
+    keys = sts.keys()
+    trains = [sp.asarray(sts[k]).ravel() for k in keys]
+    lens = [st.size for st in trains]
     ovlp, ovlp_nums = {}, {}
-    for k in sts.keys():
-        ovlp[k] = sp.zeros(sts[k].shape, dtype=bool)
-        ovlp_nums[k] = 0
-
-    # run over all pairs of spike trains in sts
-    for i in xrange(n):
-        i_ = sts.keys()[i]
-        trainI = sts[i_]
-        for j in xrange(i + 1, n):
-            # for every pair run over all spikes in i and check if a spike
-            # in j overlaps
-            j_ = sts.keys()[j]
-            trainJ = sts[j_]
-            idxI = 0
-            idxJ = 0
-            while idxI < len(trainI) and idxJ < len(trainJ):
-                # Overlapping?
-                if abs(trainI[idxI] - trainJ[idxJ]) < window:
-                    # single spike can participate in up to a single overlap
-                    # event! prevents triple counting
-                    if ovlp[i_][idxI] == False:
-                        ovlp[i_][idxI] = True
-                        ovlp_nums[i_] += 1
-                    if ovlp[j_][idxJ] == False:
-                        ovlp[j_][idxJ] = True
-                        ovlp_nums[j_] += 1
-                if trainI[idxI] < trainJ[idxJ]:
-                    idxI += 1
-                else:
-                    idxJ += 1
+    if sum(lens) == 0:
+        for k, st in zip(keys, trains):
+            ovlp[k] = sp.zeros(st.shape, dtype=bool)
+            ovlp_nums[k] = 0
+        return ovlp, ovlp_nums
+
+    # merged event stream
+    times = sp.concatenate(trains)
+    units = sp.repeat(sp.arange(len(keys)), lens)
+    order = sp.argsort(times, kind='mergesort')
+    mask = sp.empty(times.size, dtype=bool)
+    mask[order] = event_overlaps(times[order], units[order], window)
+
+    # split per spike train
+    for k, m in zip(keys, sp.split(mask, sp.cumsum(lens)[:-1])):
+        ovlp[k] = m
+        ovlp_nums[k] = int(m.sum())
     return ovlp, ovlp_nums
 
+
+def event_overlaps(times, units, window):
+    """produces a boolean sequence indicating for all events in a time sorted
+    event stream if it participates in an overlap event.
+
+    :type times: ndarray
+    :param times: event times, sorted
+    :type units: ndarray
+    :param units: unit ids of the events
+    :type window: int
+    :param window: overlap window size
+    :returns: ndarray - boolean sequence
+    """
+
+    # checks
+    times = sp.asarray(times)
+    units = sp.asarray(units)
+    n = times.size
+    if n == 0:
+        return sp.zeros(0, dtype=bool)
+
+    # the nearest event of another unit is the event before/after the run
+    # of events of the same unit the event belongs to
+    brk = sp.nonzero(units[1:] != units[:-1])[0] + 1
+    run_len = sp.diff(sp.r_[0, brk, n])
+    prev = sp.repeat(sp.r_[0, brk], run_len) - 1
+    nxt = sp.repeat(sp.r_[brk, n], run_len)
+    rval = sp.zeros(n, dtype=bool)
+    has = prev >= 0
+    rval[has] = times[has] - times[prev[has]] < window
+    has = nxt < n
+    rval[has] |= times[nxt[has]] - times[has] < window
+    return rval
+
+
+def overlap_mask(st, ref, window):
+    """produces a boolean sequence indicating for all spikes in :st: if a
+    spike of :ref: is closer than `window` samples.
+
+    :type st: ndarray
+    :param st: spike train
+    :type ref: ndarray
+    :param ref: reference spike train, sorted
+    :type window: int
+    :param window: overlap window size
+    :returns: ndarray - boolean sequence
+    """
+
+    # checks
+    st = sp.asarray(st)
+    ref = sp.asarray(ref)
+    rval = sp.zeros(st.shape, dtype=bool)
+    if st.size == 0 or ref.size == 0:
+        return rval
+
+    # nearest reference spike left and right of every spike
+    idx = sp.searchsorted(ref, st)
+    left = idx > 0
+    rval[left] = st[left] - ref[idx[left] - 1] < window
+    right = idx < ref.size
+    rval[right] |= ref[idx[right]] - st[right] < window
+    return rval
+
 ##--- MAIN
 
 if __name__ == '__main__':
@@ -41,8 +41,6 @@
 #   Philipp Meier <pmeier82@gmail.com>
 #_____________________________________________________________________________
 #
-
-
 """implementation of mc filter application with time domain FIR filters
 
 There is a general implementation suitable for larger chunks of data and batch
@@ -54,36 +52,251 @@ chunk is passed on as the so called history item.
 
 Implementations are given in Python and alternatively as in Cython. On
 import the Cython function is being tried to load, on failure the python
-version is loaded as a fallback.
+version is loaded as a fallback. The python kernels correlate per channel
+with numpy and are faster than the serial Cython kernels, so for a single
+filter the Cython kernels are only used with more than one thread.
+
+Instead of the history item a `FilterWorkspace` can be passed. The
+workspace is a preallocated buffer that carries the history at its head, so
+that repeated calls for consecutive chunks do not allocate or copy the
+chunk data, apart from writing it into the buffer once. The filter bank
+functions can write their output to a passed `out` array, e.g. a buffer of
+a `WorkspaceArena` that keeps the per chunk buffers for reuse.
+
+For long filters an FFT implementation using the overlap-save method is
+available. By default the implementation is selected per call, depending on
+the filter length, the chunk length and the dtype of the data.
+
+Raw int16 recordings can be filtered with `mcfilter_hist` directly, the
+samples are accumulated per channel and a per channel gain is applied to
+the accumulated values, so no float copy of the data is needed. The FFT
+kernels convert the data blocks batch by batch, so only a bounded part of
+the data is held as float at any time.
+
+Filter banks with many channels can be applied as a low-rank spatio-temporal
+approximation, see `LowRankFilterBank`.
 """
 __docformat__ = 'restructuredtext'
-__all__ = ['mcfilter', 'mcfilter_hist', 'USE_CYTHON']
+__all__ = ['mcfilter', 'mcfilter_hist', 'mcfilter_hist_bank',
+           'mcfilter_valid_bank', 'FilterWorkspace', 'WorkspaceArena',
+           'LowRankFilterBank', 'USE_CYTHON']
 
 ##---IMPORTS
 
+import logging
 import scipy as sp
+import time
 import warnings
+from multiprocessing import cpu_count
+from .mcfilter_fft import (
+    _mcfilter_fft, _mcfilter_hist_fft, _mcfilter_hist_bank_fft, _fft_len,
+    _overlap_save)
+from .mcfilter_py import (
+    _mcfilter_py, _mcfilter_hist_py, _mcfilter_hist_bank_py,
+    _mcfilter_valid_py, _mcfilter_valid_bank_py, _mcfilter_valid_gain_py)
+from .workspace import FilterWorkspace, WorkspaceArena
+from .lowrank import LowRankFilterBank
 
 warnings.simplefilter('once')
 
 ##---USE_CYTHON
 
+_CYTHON_ERROR = None
 try:
     from .mcfilter_cy import (
-        _mcfilter_cy32, _mcfilter_cy64, _mcfilter_hist_cy32,
-        _mcfilter_hist_cy64)
+        _mcfilter_cy32_mt, _mcfilter_cy64_mt, _mcfilter_hist_cy32_mt,
+        _mcfilter_hist_cy64_mt, _mcfilter_hist_bank_cy32_mt,
+        _mcfilter_hist_bank_cy64_mt, _mcfilter_valid_cy32,
+        _mcfilter_valid_cy64, _mcfilter_valid_bank_cy32,
+        _mcfilter_valid_bank_cy64, _mcfilter_valid_cy16)
 
     USE_CYTHON = True
 except ImportError, ex:
-    from .mcfilter_py import _mcfilter_py, _mcfilter_hist_py
-
-    warnings.warn('Cython implementation not found! Falling back to Python!',
-                  ImportWarning)
+    # logged with the throughput when a numpy kernel is first used
+    _CYTHON_ERROR = str(ex)
     USE_CYTHON = False
 
+##---CONSTANTS
+
+# relative cost of one multiply-accumulate in the direct (time domain) kernels
+DIRECT_MAC_COST = {sp.dtype(sp.float32): 1.0, sp.dtype(sp.float64): 1.1}
+# relative cost of one multiply-accumulate in the numpy correlate kernels,
+# these beat the serial compiled kernels
+PY_MAC_COST = 0.5
+# relative cost of one multiply-accumulate in the im2col GEMM of the bank
+GEMM_MAC_COST = 0.15
+# relative cost of copying one data element into the im2col buffer
+GEMM_COPY_COST = 0.4
+# relative cost of one butterfly operation in the forward/inverse fft
+FFT_FWD_COST = 1.3
+FFT_INV_COST = 3.0
+# relative cost of one complex multiply-accumulate in the spectral domain
+FFT_SPEC_COST = 5.0
+# fixed per block and transform overhead of the fft kernels [butterflies]
+FFT_BLOCK_OVERHEAD = 200
+# shortest chunk [samples] for which the fft kernels are considered at all
+FFT_MIN_SAMPLES = 256
+# set once the throughput of the numpy fallback has been reported
+_PY_FALLBACK_REPORTED = False
+
 ##---FUNCTIONS
 
-def mcfilter(mc_data, mc_filt):
+def _get_num_threads(num_threads):
+    """resolve the number of threads for the parallel kernels
+
+    :type num_threads: int
+    :param num_threads: number of threads, if None or < 1 all cpus are used
+    :rtype: int
+    :returns: number of threads
+    """
+
+    if num_threads is None or num_threads < 1:
+        return cpu_count()
+    return int(num_threads)
+
+
+def _py_fallback(func, mc_data, *args):
+    """call a numpy correlate kernel
+
+    If the Cython extension is missing, the throughput of the first call is
+    logged once as info, as num_threads has no effect then.
+
+    :type func: callable
+    :param func: numpy kernel, called as func(mc_data, *args)
+    """
+
+    global _PY_FALLBACK_REPORTED
+    if USE_CYTHON is True or _PY_FALLBACK_REPORTED is True:
+        return func(mc_data, *args)
+    tic = time.time()
+    rval = func(mc_data, *args)
+    toc = max(time.time() - tic, 1e-9)
+    _PY_FALLBACK_REPORTED = True
+    logging.info('Cython implementation of mcfilter not found (%s), using '
+                 'the numpy kernels, num_threads has no effect: filtered %d '
+                 'samples x %d channels in %.4fs (%.2f Msamples/s)' %
+                 (_CYTHON_ERROR, mc_data.shape[0], mc_data.shape[1], toc,
+                  mc_data.shape[0] / toc / 1e6))
+    return rval
+
+
+def _get_gain(gain, nc):
+    """resolve the per channel gain
+
+    :type gain: float or ndarray
+    :param gain: gain per channel or for all channels, None for unit gain
+    :rtype: ndarray
+    :returns: gain [channels]
+    """
+
+    if gain is None:
+        return sp.ones(nc, dtype=sp.float32)
+    rval = sp.ones(nc, dtype=sp.float32) * sp.asarray(gain, dtype=sp.float32)
+    if rval.shape != (nc,):
+        raise ValueError('gain does not match the channel count')
+    return rval
+
+
+def _mcfilter_int16(data, mc_filt, gain, td, method, num_threads):
+    """filter int16 data including the history with a single filter
+
+    :type data: ndarray
+    :param data: history and signal data [hist_samples + data_samples,
+        channels] as int16
+    :type mc_filt: ndarray
+    :param mc_filt: FIR filter [filter_samples, channels]
+    :type gain: ndarray
+    :param gain: gain per channel, applied after the accumulation
+    :type td: int
+    :param td: number of output samples
+    :rtype: ndarray
+    :returns: filtered signal [data_samples] as float32
+    """
+
+    tf, nc = mc_filt.shape
+    gain = _get_gain(gain, nc)
+    method = _select_method(method, td, tf, nc, sp.float32,
+                            num_threads=num_threads)
+    if method == 'fft':
+        # the gain commutes with the filter, the blocks are converted and
+        # transformed in bounded batches, so there is no float copy of the
+        # whole data either
+        filt = (mc_filt * gain)[None].astype(sp.float32)
+        return _overlap_save(data, filt, td)[:, 0].astype(sp.float32)
+    mc_filt = sp.ascontiguousarray(mc_filt, dtype=sp.float32)
+    fout = sp.empty(td, dtype=sp.float32)
+    if method == 'correlate':
+        return _py_fallback(_mcfilter_valid_gain_py, data, mc_filt, gain,
+                            fout)
+    return _mcfilter_valid_cy16(sp.ascontiguousarray(data), mc_filt, gain,
+                                fout, num_threads)
+
+
+def _direct_bank_cost(td, tf, nc, nf, num_threads):
+    """cost of the direct filter bank kernels
+
+    :rtype: tuple(float,float)
+    :returns: cost of the im2col GEMM, cost of the parallel compiled kernel
+    """
+
+    cost_gemm = td * tf * nc * (nf * GEMM_MAC_COST + GEMM_COPY_COST)
+    cost_par = sp.inf
+    if USE_CYTHON is True and num_threads > 1:
+        cost_par = td * tf * nc * nf * DIRECT_MAC_COST[sp.dtype(sp.float64)]
+        cost_par /= float(num_threads)
+    return cost_gemm, cost_par
+
+
+def _select_method(method, td, tf, nc, dtype, nf=None, num_threads=1):
+    """resolve the filtering method for a call
+
+    The choice for 'auto' is based on a rough cost model of the kernels. If
+    `nf` is given, the costs for the filter bank kernels are compared. The
+    fft kernels are single threaded, the direct kernels scale with
+    `num_threads`.
+
+    For a single filter the direct method resolves to 'correlate', the
+    vectorised numpy kernels, unless the compiled kernels are available and
+    run on more than one thread. Serially, the numpy kernels are faster.
+
+    :type method: str
+    :param method: one of 'auto', 'direct' or 'fft'
+    :type nf: int
+    :param nf: number of filters for the filter bank kernels
+        Default=None
+    :type num_threads: int
+    :param num_threads: number of threads for the direct kernels
+        Default=1
+    :rtype: str
+    :returns: 'direct', 'correlate' or 'fft'
+    """
+
+    if method not in ['auto', 'direct', 'fft']:
+        raise ValueError('unknown method \'%s\', use one of \'auto\', '
+                         '\'direct\' or \'fft\'' % method)
+    correlate = nf is None and (USE_CYTHON is False or num_threads == 1)
+    if method == 'auto' and td >= FFT_MIN_SAMPLES:
+        nfft = _fft_len(tf)
+        nblk = sp.ceil(td / float(nfft - tf + 1))
+        cost_fft = nblk * (
+            ((nc * FFT_FWD_COST + (nf or 1) * FFT_INV_COST) *
+             (nfft * sp.log2(nfft) + FFT_BLOCK_OVERHEAD)) +
+            (nf or 1) * nc * (nfft / 2 + 1) * FFT_SPEC_COST)
+        if correlate is True:
+            cost_direct = td * tf * nc * PY_MAC_COST
+        elif nf is None:
+            cost_direct = td * tf * nc * DIRECT_MAC_COST.get(sp.dtype(dtype),
+                                                             1.0)
+            cost_direct /= float(num_threads)
+        else:
+            cost_direct = min(_direct_bank_cost(td, tf, nc, nf, num_threads))
+        method = 'fft' if cost_fft < cost_direct else 'direct'
+    if method == 'fft':
+        return method
+    return 'correlate' if correlate is True else 'direct'
+
+
+def mcfilter(mc_data, mc_filt, method='auto', num_threads=1):
     """filter a multichanneled signal with a multichanneled filter
 
     This is the Python implementation for batch mode filtering. The signal
@@ -93,69 +306,346 @@ def mcfilter(mc_data, mc_filt):
     :param mc_data: signal data [data_samples, channels]
     :type mc_filt: ndarray
     :param mc_filt: FIR filter [filter_samples, channels]
+    :type method: str
+    :param method: one of 'direct' for the time domain kernels, 'fft' for the
+        overlap-save kernels or 'auto' to select the faster one.
+        Default='auto'
+    :type num_threads: int
+    :param num_threads: number of threads for the direct kernels, if None or
+        < 1 all cpus are used.
+        Default=1
     :rtype: ndarray
     :returns: filtered signal [data_samples]
     """
 
-    if USE_CYTHON is True:
-        dtype = mc_data.dtype
-        if dtype not in [sp.float32, sp.float64]:
-            dtype = sp.float32
-        if mc_data.shape[1] != mc_filt.shape[1]:
-            raise ValueError('channel count does not match')
-        mc_data, mc_filt = (sp.ascontiguousarray(mc_data, dtype=dtype),
-                            sp.ascontiguousarray(mc_filt, dtype=dtype))
-        if dtype == sp.float32:
-            return _mcfilter_cy32(mc_data, mc_filt)
-        elif dtype == sp.float64:
-            return _mcfilter_cy64(mc_data, mc_filt)
-        else:
-            raise TypeError('dtype is not float32 or float64: %s' % dtype)
-    else:
-        return _mcfilter_py(mc_data, mc_filt)
+    dtype = mc_data.dtype
+    if dtype not in [sp.float32, sp.float64]:
+        dtype = sp.float32
+    if mc_data.shape[1] != mc_filt.shape[1]:
+        raise ValueError('channel count does not match')
+    num_threads = _get_num_threads(num_threads)
+    method = _select_method(method, mc_data.shape[0], mc_filt.shape[0],
+                            mc_data.shape[1], dtype, num_threads=num_threads)
+    if method == 'fft':
+        return _mcfilter_fft(sp.asarray(mc_data, dtype=dtype),
+                             sp.asarray(mc_filt, dtype=dtype))
+    mc_data, mc_filt = (sp.ascontiguousarray(mc_data, dtype=dtype),
+                        sp.ascontiguousarray(mc_filt, dtype=dtype))
+    if method == 'correlate':
+        return _py_fallback(_mcfilter_py, mc_data, mc_filt)
+    if dtype == sp.float32:
+        return _mcfilter_cy32_mt(mc_data, mc_filt, num_threads)
+    return _mcfilter_cy64_mt(mc_data, mc_filt, num_threads)
 
 
-def mcfilter_hist(mc_data, mc_filt, mc_hist=None):
+def mcfilter_hist(mc_data, mc_filt, mc_hist=None, method='auto',
+                  num_threads=1, gain=None):
     """filter a multichanneled signal with a multichanneled fir filter
 
     This is the Python implementation for online mode filtering with a
     chunk-wise history item, holding the last samples of tha preceding chunk.
 
+    Signal data of dtype int16 (raw samples) is filtered without converting
+    it to float, the history is kept as int16 as well and the output is
+    float32.
+
     :type mc_data: ndarray
     :param mc_data: signal data [data_samples, channels]
     :type mc_filt: ndarray
     :param mc_filt: FIR filter [filter_samples, channels]
-    :type mc_hist:
+    :type mc_hist: ndarray or FilterWorkspace
     :param mc_hist: history [hist_samples, channels]. the history is of size
         ´filter_samples - 1´. If None, this will be substituted with zeros.
+        If a FilterWorkspace is passed, it will be used and returned instead.
+    :type method: str
+    :param method: one of 'direct' for the time domain kernels, 'fft' for the
+        overlap-save kernels or 'auto' to select the faster one.
+        Default='auto'
+    :type num_threads: int
+    :param num_threads: number of threads for the direct kernels, if None or
+        < 1 all cpus are used.
+        Default=1
+    :type gain: float or ndarray
+    :param gain: gain per channel [channels] or for all channels. For int16
+        data the gain is applied per channel after the accumulation, else it
+        is applied to the filter. If None, the gain is one.
+        Default=None
     :rtype: tuple(ndarray,ndarray)
     :returns: filter output [data_samples], history item [hist_samples,
         channels]
     """
 
+    if isinstance(mc_hist, FilterWorkspace):
+        return _mcfilter_ws(mc_data, mc_filt[None], mc_hist, method,
+                            num_threads, bank=False, gain=gain)
     if mc_hist is None:
-        mc_hist = sp.zeros((mc_filt.shape[0] - 1, mc_data.shape[0]))
+        mc_hist = sp.zeros((mc_filt.shape[0] - 1, mc_data.shape[1]))
     if mc_hist.shape[0] + 1 != mc_filt.shape[0]:
         raise ValueError('len(history)+1[%d] != len(filter)[%d]' %
                          ( mc_hist.shape[0] + 1, mc_filt.shape[0]))
-    if USE_CYTHON is True:
-        dtype = mc_data.dtype
-        if dtype not in [sp.float32, sp.float64]:
-            dtype = sp.float32
-        if mc_data.shape[1] != mc_filt.shape[1]:
-            raise ValueError('channel count does not match')
-        mc_data, mc_filt, mc_hist = (
-            sp.ascontiguousarray(mc_data, dtype=dtype),
-            sp.ascontiguousarray(mc_filt, dtype=dtype),
-            sp.ascontiguousarray(mc_hist, dtype=dtype))
+    dtype = mc_data.dtype
+    if dtype not in [sp.float32, sp.float64]:
+        dtype = sp.float32
+    if mc_data.shape[1] != mc_filt.shape[1]:
+        raise ValueError('channel count does not match')
+    num_threads = _get_num_threads(num_threads)
+    if mc_data.dtype == sp.int16:
+        td, th = mc_data.shape[0], mc_hist.shape[0]
+        mc_hist = sp.ascontiguousarray(mc_hist, dtype=sp.int16)
+        data = sp.vstack((mc_hist, mc_data))
+        fout = _mcfilter_int16(data, mc_filt, gain, td, method, num_threads)
+        mc_hist[:] = data[td:td + th]
+        return fout, mc_hist
+    if gain is not None:
+        mc_filt = mc_filt * _get_gain(gain, mc_filt.shape[1])
+    method = _select_method(method, mc_data.shape[0], mc_filt.shape[0],
+                            mc_data.shape[1], dtype, num_threads=num_threads)
+    if method == 'fft':
+        return _mcfilter_hist_fft(sp.asarray(mc_data, dtype=dtype),
+                                  sp.asarray(mc_filt, dtype=dtype),
+                                  sp.asarray(mc_hist, dtype=dtype))
+    mc_data, mc_filt, mc_hist = (
+        sp.ascontiguousarray(mc_data, dtype=dtype),
+        sp.ascontiguousarray(mc_filt, dtype=dtype),
+        sp.ascontiguousarray(mc_hist, dtype=dtype))
+    if method == 'correlate':
+        return _py_fallback(_mcfilter_hist_py, mc_data, mc_filt, mc_hist)
+    if dtype == sp.float32:
+        return _mcfilter_hist_cy32_mt(mc_data, mc_filt, mc_hist, num_threads)
+    return _mcfilter_hist_cy64_mt(mc_data, mc_filt, mc_hist, num_threads)
+
+
+def mcfilter_hist_bank(mc_data, mc_filt, mc_hist=None, method='auto',
+                       num_threads=1, out=None):
+    """filter a multichanneled signal with a bank of multichanneled filters
+
+    All filters of the bank are applied in a single pass over the data and
+    share one history item. The direct method applies the filter bank as one
+    matrix product over sliding windows of the data (im2col), the fft method
+    computes the spectrum of each data block once for all filters. With more
+    than one thread the direct method may use a parallel compiled kernel
+    that splits the time range across the threads.
+
+    :type mc_data: ndarray
+    :param mc_data: signal data [data_samples, channels]
+    :type mc_filt: ndarray
+    :param mc_filt: FIR filter bank [filters, filter_samples, channels]
+    :type mc_hist: ndarray or FilterWorkspace
+    :param mc_hist: history [hist_samples, channels]. the history is of size
+        ´filter_samples - 1´. If None, this will be substituted with zeros.
+        If a FilterWorkspace is passed, it will be used and returned instead.
+    :type method: str
+    :param method: one of 'direct' for the im2col kernel, 'fft' for the
+        overlap-save kernel or 'auto' to select the faster one.
+        Default='auto'
+    :type num_threads: int
+    :param num_threads: number of threads for the direct kernels, if None or
+        < 1 all cpus are used.
+        Default=1
+    :type out: ndarray
+    :param out: if not None, the filter output is written to this array
+        [data_samples, filters] and returned.
+        Default=None
+    :rtype: tuple(ndarray,ndarray)
+    :returns: filter output [data_samples, filters], history item
+        [hist_samples, channels]
+    """
+
+    if mc_filt.ndim != 3:
+        raise ValueError('filter bank has to be [filters, samples, channels]')
+    if isinstance(mc_hist, FilterWorkspace):
+        return _mcfilter_ws(mc_data, mc_filt, mc_hist, method, num_threads,
+                            bank=True, out=out)
+    fout, mc_hist = _mcfilter_hist_bank(mc_data, mc_filt, mc_hist, method,
+                                        num_threads)
+    return _to_out(fout, out), mc_hist
+
+
+def _mcfilter_hist_bank(mc_data, mc_filt, mc_hist, method, num_threads):
+    if mc_hist is None:
+        mc_hist = sp.zeros((mc_filt.shape[1] - 1, mc_data.shape[1]))
+    if mc_hist.shape[0] + 1 != mc_filt.shape[1]:
+        raise ValueError('len(history)+1[%d] != len(filter)[%d]' %
+                         ( mc_hist.shape[0] + 1, mc_filt.shape[1]))
+    dtype = mc_data.dtype
+    if dtype not in [sp.float32, sp.float64]:
+        dtype = sp.float32
+    if mc_data.shape[1] != mc_filt.shape[2]:
+        raise ValueError('channel count does not match')
+    mc_data, mc_filt, mc_hist = (
+        sp.ascontiguousarray(mc_data, dtype=dtype),
+        sp.ascontiguousarray(mc_filt, dtype=dtype),
+        sp.ascontiguousarray(mc_hist, dtype=dtype))
+    if mc_filt.shape[0] == 0:
+        method = 'direct'
+    num_threads = _get_num_threads(num_threads)
+    td, nf, tf, nc = (mc_data.shape[0],) + mc_filt.shape
+    method = _select_method(method, td, tf, nc, dtype, nf=nf,
+                            num_threads=num_threads)
+    if method == 'fft':
+        return _mcfilter_hist_bank_fft(mc_data, mc_filt, mc_hist)
+    cost_gemm, cost_par = _direct_bank_cost(td, tf, nc, nf, num_threads)
+    if cost_par < cost_gemm:
         if dtype == sp.float32:
-            return _mcfilter_hist_cy32(mc_data, mc_filt, mc_hist)
+            return _mcfilter_hist_bank_cy32_mt(mc_data, mc_filt, mc_hist,
+                                               num_threads)
         elif dtype == sp.float64:
-            return _mcfilter_hist_cy64(mc_data, mc_filt, mc_hist)
+            return _mcfilter_hist_bank_cy64_mt(mc_data, mc_filt, mc_hist,
+                                               num_threads)
+    return _mcfilter_hist_bank_py(mc_data, mc_filt, mc_hist)
+
+
+def mcfilter_valid_bank(data, mc_filt, method='auto', num_threads=1,
+                        out=None):
+    """filter a multichanneled signal with a bank of filters, valid part only
+
+    Only the samples where the filters fully overlap the data are returned,
+    i.e. for data holding the history item and a chunk, the filter output
+    for the chunk. The data is not changed, so several filter banks can be
+    applied to the same data concurrently.
+
+    :type data: ndarray
+    :param data: signal data [data_samples, channels], float32 or float64
+    :type mc_filt: ndarray
+    :param mc_filt: FIR filter bank [filters, filter_samples, channels]
+    :type method: str
+    :param method: one of 'direct' for the im2col kernel, 'fft' for the
+        overlap-save kernel or 'auto' to select the faster one.
+        Default='auto'
+    :type num_threads: int
+    :param num_threads: number of threads for the direct kernels, if None or
+        < 1 all cpus are used.
+        Default=1
+    :type out: ndarray
+    :param out: if not None, the filter output is written to this array
+        [data_samples - filter_samples + 1, filters] and returned. It may be
+        a strided view, e.g. a block of columns of a larger output.
+        Default=None
+    :rtype: ndarray
+    :returns: filter output [data_samples - filter_samples + 1, filters]
+    """
+
+    # checks
+    if mc_filt.ndim != 3:
+        raise ValueError('filter bank has to be [filters, samples, channels]')
+    nf, tf, nc = mc_filt.shape
+    if data.shape[1] != nc:
+        raise ValueError('channel count does not match')
+    if data.shape[0] < tf - 1:
+        raise ValueError('data is shorter than len(filter)-1')
+    dtype = data.dtype
+    if dtype not in [sp.float32, sp.float64]:
+        raise TypeError('dtype is not float32 or float64: %s' % dtype)
+    td = data.shape[0] - tf + 1
+    if out is not None and out.shape != (td, nf):
+        raise ValueError('out has to be [%d, %d]' % (td, nf))
+
+    # inits
+    data = sp.ascontiguousarray(data)
+    mc_filt = sp.ascontiguousarray(mc_filt, dtype=dtype)
+    num_threads = _get_num_threads(num_threads)
+    if nf == 0:
+        method = 'direct'
+    method = _select_method(method, td, tf, nc, dtype, nf=nf,
+                            num_threads=num_threads)
+
+    # filter, the kernels write to strided views of `out` directly
+    fout = out
+    if fout is None or fout.dtype != dtype:
+        fout = sp.empty((td, nf), dtype=dtype)
+    if method == 'fft':
+        return _to_out(_overlap_save(data, mc_filt, td, out=fout), out)
+    cost_gemm, cost_par = _direct_bank_cost(td, tf, nc, nf, num_threads)
+    if cost_par < cost_gemm:
+        if dtype == sp.float32:
+            _mcfilter_valid_bank_cy32(data, mc_filt, fout, num_threads)
         else:
-            raise TypeError('dtype is not float32 or float64: %s' % dtype)
+            _mcfilter_valid_bank_cy64(data, mc_filt, fout, num_threads)
+    else:
+        _mcfilter_valid_bank_py(data, mc_filt, fout)
+    return _to_out(fout, out)
+
+
+def _to_out(fout, out):
+    """copy the filter output to `out`, unless it has been written there"""
+
+    if out is None or out is fout:
+        return fout
+    if out.shape != fout.shape:
+        raise ValueError('out has to be %s' % (fout.shape,))
+    out[:] = fout
+    return out
+
+
+def _mcfilter_ws(mc_data, mc_filt, ws, method, num_threads, bank,
+                 gain=None, out=None):
+    """filter a chunk using a workspace that carries the history
+
+    :type mc_data: ndarray
+    :param mc_data: signal data [data_samples, channels]
+    :type mc_filt: ndarray
+    :param mc_filt: FIR filter bank [filters, filter_samples, channels]
+    :type ws: FilterWorkspace
+    :param ws: workspace, advanced to hold the new history
+    :type bank: bool
+    :param bank: if True, return the [data_samples, filters] output of the
+        filter bank, else the [data_samples] output of the only filter
+    :type out: ndarray
+    :param out: output array for the filter bank output, or None
+    :rtype: tuple(ndarray,FilterWorkspace)
+    :returns: filter output, workspace
+    """
+
+    # checks
+    nf, tf, nc = mc_filt.shape
+    if ws.tf != tf:
+        raise ValueError('workspace tf[%d] != len(filter)[%d]' % (ws.tf, tf))
+    if ws.nc != nc:
+        raise ValueError('channel count does not match')
+
+    if bank is True and sp.int16 in [ws.dtype, mc_data.dtype]:
+        raise TypeError('int16 data is not supported for filter banks')
+
+    # inits
+    data = ws.load(mc_data)
+    td, dtype = mc_data.shape[0], ws.dtype
+    num_threads = _get_num_threads(num_threads)
+    if dtype == sp.int16:
+        fout = _mcfilter_int16(data, mc_filt[0], gain, td, method,
+                               num_threads)
+        ws.advance()
+        return fout, ws
+    if bank is True:
+        fout = mcfilter_valid_bank(data, mc_filt, method, num_threads,
+                                   out=out)
+        ws.advance()
+        return fout, ws
+    if gain is not None:
+        mc_filt = mc_filt * _get_gain(gain, nc)
+    mc_filt = sp.ascontiguousarray(mc_filt, dtype=dtype)
+    method = _select_method(method, td, tf, nc, dtype,
+                            num_threads=num_threads)
+
+    # filter
+    if method == 'fft':
+        fout = _overlap_save(data, mc_filt, td).astype(dtype)
     else:
-        return _mcfilter_hist_py(mc_data, mc_filt, mc_hist)
+        fout = sp.empty((td, nf), dtype=dtype)
+        # on the loaded workspace the compiled valid kernel beats the numpy
+        # kernel also serially, so 'correlate' only applies without it
+        if USE_CYTHON is True:
+            if dtype == sp.float32:
+                _mcfilter_valid_bank_cy32(data, mc_filt, fout, num_threads)
+            else:
+                _mcfilter_valid_bank_cy64(data, mc_filt, fout, num_threads)
+        else:
+            _py_fallback(_mcfilter_valid_py, data, mc_filt[0], fout[:, 0])
+    ws.advance()
+
+    # return
+    if bank is False:
+        fout = fout[:, 0]
+    return fout, ws
 
 ##---MAIN
 
@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+#_____________________________________________________________________________
+#
+# Copyright (c) 2012 Berlin Institute of Technology
+# All rights reserved.
+#
+# Developed by:	Philipp Meier <pmeier82@gmail.com>
+#               Neural Information Processing Group (NI)
+#               School for Electrical Engineering and Computer Science
+#               Berlin Institute of Technology
+#               MAR 5-6, Marchstr. 23, 10587 Berlin, Germany
+#               http://www.ni.tu-berlin.de/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal with the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimers.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimers in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the names of Neural Information Processing Group (NI), Berlin
+#   Institute of Technology, nor the names of its contributors may be used to
+#   endorse or promote products derived from this Software without specific
+#   prior written permission.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# CONTRIBUTORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# WITH THE SOFTWARE.
+#_____________________________________________________________________________
+#
+# Acknowledgements:
+#   Philipp Meier <pmeier82@gmail.com>
+#_____________________________________________________________________________
+#
+"""low-rank spatio-temporal approximation of a filter bank"""
+__docformat__ = 'restructuredtext'
+__all__ = ['LowRankFilterBank']
+
+##---IMPORTS
+
+import scipy as sp
+import scipy.linalg as sp_la
+from .workspace import FilterWorkspace
+
+##---CLASSES
+
+class LowRankFilterBank(object):
+    """rank-k separable approximation of a bank of multichanneled filters
+
+    Each filter f [tf, nc] of the bank is approximated by the leading terms of
+    its singular value decomposition f ~ sum_k s_k * u_k * v_k^T. Applying the
+    approximation amounts to a projection of the data onto the spatial
+    components v_k (one matrix product for the whole bank), followed by a
+    single channel temporal FIR filter u_k per component. Per sample this
+    costs R * (nc + tf) multiply-accumulates for R components in total,
+    compared to nf * tf * nc for the dense filter bank.
+
+    The number of components per filter is given by a fixed rank, by a
+    budget for the relative reconstruction error, or both (the rank is then
+    the upper bound).
+    """
+
+    ## constructor
+
+    def __init__(self, rank=None, tol=None):
+        """
+        :type rank: int
+        :param rank: number of components per filter. If `tol` is given as
+            well, this is the upper bound for the number of components.
+            Default=None
+        :type tol: float
+        :param tol: budget for the relative reconstruction error
+            |f - f_k| / |f| (frobenius norm) per filter, the least number of
+            components meeting the budget is used.
+            Default=None
+        """
+
+        # checks
+        if rank is None and tol is None:
+            raise ValueError('one of \'rank\' or \'tol\' is required')
+        if rank is not None and rank < 1:
+            raise ValueError('rank < 1')
+        if tol is not None and not 0.0 <= tol < 1.0:
+            raise ValueError('tol has to be in [0.0, 1.0)')
+
+        # members
+        self._rank = None if rank is None else int(rank)
+        self._tol = None if tol is None else float(tol)
+        self._filt = None
+        self._spatial = None
+        self._temporal = None
+        self._comp = None
+        self._ranks = None
+        self._error = None
+
+    ## properties
+
+    def get_nf(self):
+        return 0 if self._filt is None else self._filt.shape[0]
+
+    nf = property(get_nf, doc='number of filters')
+
+    def get_tf(self):
+        return None if self._filt is None else self._filt.shape[1]
+
+    tf = property(get_tf, doc='filter length [samples]')
+
+    def get_nc(self):
+        return None if self._filt is None else self._filt.shape[2]
+
+    nc = property(get_nc, doc='number of channels')
+
+    def get_ranks(self):
+        return self._ranks
+
+    ranks = property(get_ranks, doc='number of components per filter')
+
+    def get_error(self):
+        return self._error
+
+    error = property(get_error,
+                     doc='relative reconstruction error per filter')
+
+    def get_flops(self):
+        if self._filt is None:
+            return 0, 0
+        nf, tf, nc = self._filt.shape
+        return nf * tf * nc, int(self._ranks.sum()) * (tf + nc)
+
+    flops = property(get_flops, doc='multiply-accumulates per sample for the '
+                                    'dense and the low-rank filter bank')
+
+    ## methods interface
+
+    def fit(self, mc_filt):
+        """factorise a filter bank
+
+        :type mc_filt: ndarray
+        :param mc_filt: FIR filter bank [filters, filter_samples, channels]
+        :rtype: LowRankFilterBank
+        :returns: self
+        """
+
+        # checks
+        mc_filt = sp.asarray(mc_filt)
+        if mc_filt.ndim != 3:
+            raise ValueError('filter bank has to be [filters, samples, '
+                             'channels]')
+
+        # factorise
+        nf, tf, nc = mc_filt.shape
+        spatial, temporal, comp = [], [], [0]
+        self._ranks = sp.zeros(nf, dtype=int)
+        self._error = sp.zeros(nf)
+        for i in xrange(nf):
+            u, s, vt = sp_la.svd(mc_filt[i].astype(sp.float64),
+                                 full_matrices=False)
+            k = self._select_rank(s)
+            spatial.append(vt[:k].T * s[:k])
+            temporal.append(u[:, :k])
+            comp.append(comp[-1] + k)
+            self._ranks[i] = k
+            energy = (s ** 2).sum()
+            if energy > 0.0:
+                self._error[i] = sp.sqrt((s[k:] ** 2).sum() / energy)
+        if nf > 0:
+            self._spatial = sp.hstack(spatial)
+            self._temporal = sp.ascontiguousarray(sp.hstack(temporal).T)
+        else:
+            self._spatial = sp.zeros((nc, 0))
+            self._temporal = sp.zeros((0, tf))
+        self._comp = comp
+        self._filt = mc_filt.copy()
+        return self
+
+    def update(self, mc_filt):
+        """factorise a filter bank if it differs from the current one
+
+        :type mc_filt: ndarray
+        :param mc_filt: FIR filter bank [filters, filter_samples, channels]
+        :rtype: bool
+        :returns: True if the filter bank was factorised again
+        """
+
+        mc_filt = sp.asarray(mc_filt)
+        if self._filt is not None and \
+                self._filt.shape == mc_filt.shape and \
+                sp.all(self._filt == mc_filt):
+            return False
+        self.fit(mc_filt)
+        return True
+
+    def reconstruct(self):
+        """the approximated filter bank
+
+        :rtype: ndarray
+        :returns: FIR filter bank [filters, filter_samples, channels]
+        """
+
+        if self._filt is None:
+            raise ValueError('no filter bank has been fitted')
+        rval = sp.zeros(self._filt.shape)
+        for i in xrange(self.nf):
+            sl = slice(self._comp[i], self._comp[i + 1])
+            rval[i] = sp.dot(self._temporal[sl].T, self._spatial[:, sl].T)
+        return rval
+
+    def mcfilter_hist(self, mc_data, mc_hist=None, out=None):
+        """filter a multichanneled signal with the approximated filter bank
+
+        Works like `mcfilter_hist_bank` for the approximated filters.
+
+        :type mc_data: ndarray
+        :param mc_data: signal data [data_samples, channels]
+        :type mc_hist: ndarray or FilterWorkspace
+        :param mc_hist: history [hist_samples, channels]. the history is of
+            size ´filter_samples - 1´. If None, this will be substituted with
+            zeros. If a FilterWorkspace is passed, it will be used and returned
+            instead.
+        :type out: ndarray
+        :param out: if not None, the filter output is written to this array
+            [data_samples, filters] and returned.
+            Default=None
+        :rtype: tuple(ndarray,ndarray)
+        :returns: filter output [data_samples, filters], history item
+            [hist_samples, channels]
+        """
+
+        # checks
+        if self._filt is None:
+            raise ValueError('no filter bank has been fitted')
+        nf, tf, nc = self._filt.shape
+        th, td = tf - 1, mc_data.shape[0]
+        if out is not None and out.shape != (td, nf):
+            raise ValueError('out has to be [%d, %d]' % (td, nf))
+
+        # inits
+        if isinstance(mc_hist, FilterWorkspace):
+            if mc_hist.tf != tf or mc_hist.nc != nc:
+                raise ValueError('workspace does not match the filter bank')
+            data = mc_hist.load(mc_data)
+            dtype = mc_hist.dtype
+        else:
+            if mc_data.shape[1] != nc:
+                raise ValueError('channel count does not match')
+            if mc_hist is None:
+                mc_hist = sp.zeros((th, nc))
+            if mc_hist.shape[0] != th:
+                raise ValueError('len(history)+1[%d] != len(filter)[%d]' %
+                                 (mc_hist.shape[0] + 1, tf))
+            dtype = mc_data.dtype
+            if dtype not in [sp.float32, sp.float64]:
+                dtype = sp.float32
+            data = sp.vstack((mc_hist, mc_data)).astype(dtype, copy=False)
+
+        # filter: spatial projection for all components, temporal per component
+        if out is None:
+            fout = sp.zeros((td, nf), dtype=dtype)
+        else:
+            fout = out
+            fout[:] = 0.0
+        proj = sp.dot(self._spatial.T.astype(dtype), data.T)
+        temporal = self._temporal.astype(dtype)
+        for i in xrange(nf):
+            for k in xrange(self._comp[i], self._comp[i + 1]):
+                fout[:, i] += sp.correlate(proj[k], temporal[k], 'valid')
+
+        # history
+        if isinstance(mc_hist, FilterWorkspace):
+            mc_hist.advance()
+        else:
+            mc_hist = data[td:td + th].copy()
+        return fout, mc_hist
+
+    ## internals
+
+    def _select_rank(self, s):
+        """number of components for the singular values `s`"""
+
+        k_max = len(s) if self._rank is None else min(self._rank, len(s))
+        if self._tol is None:
+            return k_max
+        energy = (s ** 2).sum()
+        if energy == 0.0:
+            return 1
+        # residual[k] is the relative error when keeping k components
+        residual = sp.sqrt(
+            sp.concatenate((sp.cumsum((s ** 2)[::-1])[::-1], [0.0])) / energy)
+        k = int(sp.nonzero(residual <= self._tol)[0][0])
+        return min(max(k, 1), k_max)
+
+    ## special methods
+
+    def __str__(self):
+        return '%s(rank=%s,tol=%s,nf=%s)' % (self.__class__.__name__,
+                                             self._rank, self._tol, self.nf)
+
+##---MAIN
+
+if __name__ == '__main__':
+    pass
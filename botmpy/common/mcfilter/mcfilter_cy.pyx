@@ -56,6 +56,7 @@ import numpy as np
 
 cimport cython
 cimport numpy as np
+from cython.parallel cimport prange
 
 ##---FUNCTIONS
 
@@ -97,7 +98,7 @@ def _mcfilter_cy64(
         np.ndarray[np.float64_t, ndim=1] fout
         np.ndarray[np.float64_t, ndim=2] data
         np.ndarray[np.float64_t, ndim=2] pad
-        np.float32_t value
+        np.float64_t value
         unsigned int t, tau, c
     pad = np.zeros((np.floor(tf / 2), nc), dtype=np.float64)
     data = np.vstack((pad, mc_data, pad))
@@ -169,6 +170,222 @@ def _mcfilter_hist_cy64(
                 mc_hist[t, c] = data[td + t, c]
     return fout, mc_hist
 
+##---PARALLEL
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def _mcfilter_valid_cy32(
+        np.ndarray[np.float32_t, ndim=2, mode='c'] data,
+        np.ndarray[np.float32_t, ndim=2, mode='c'] mc_filt,
+        np.ndarray[np.float32_t, ndim=1] fout,
+        int num_threads):
+    cdef:
+        Py_ssize_t nc = data.shape[1]
+        Py_ssize_t td = fout.shape[0]
+        Py_ssize_t tf = mc_filt.shape[0]
+        np.float32_t * data_ptr = <np.float32_t *> data.data
+        np.float32_t * filt_ptr = <np.float32_t *> mc_filt.data
+        np.float32_t value
+        Py_ssize_t t, k
+    if data.shape[0] < td + tf - 1:
+        raise ValueError('data too short for %d output samples' % td)
+    with nogil:
+        for t in prange(td, num_threads=num_threads, schedule='static'):
+            value = 0.0
+            for k in range(tf * nc):
+                value = value + data_ptr[t * nc + k] * filt_ptr[k]
+            fout[t] = value
+    return fout
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def _mcfilter_valid_bank_cy32(
+        np.ndarray[np.float32_t, ndim=2, mode='c'] data,
+        np.ndarray[np.float32_t, ndim=3, mode='c'] mc_filt,
+        np.ndarray[np.float32_t, ndim=2] fout,
+        int num_threads):
+    cdef:
+        Py_ssize_t nc = data.shape[1]
+        Py_ssize_t td = fout.shape[0]
+        Py_ssize_t nf = mc_filt.shape[0]
+        Py_ssize_t tf = mc_filt.shape[1]
+        np.float32_t * data_ptr = <np.float32_t *> data.data
+        np.float32_t * filt_ptr = <np.float32_t *> mc_filt.data
+        np.float32_t value
+        Py_ssize_t t, f, k
+    if data.shape[0] < td + tf - 1:
+        raise ValueError('data too short for %d output samples' % td)
+    with nogil:
+        # the time range is split across the threads, every thread applies
+        # all filters to a data window while it is in the cache
+        for t in prange(td, num_threads=num_threads, schedule='static'):
+            for f in range(nf):
+                value = 0.0
+                for k in range(tf * nc):
+                    value = value + data_ptr[t * nc + k] * \
+                                    filt_ptr[f * tf * nc + k]
+                fout[t, f] = value
+    return fout
+
+def _mcfilter_cy32_mt(
+        np.ndarray[np.float32_t, ndim=2] mc_data,
+        np.ndarray[np.float32_t, ndim=2] mc_filt,
+        int num_threads):
+    pad = np.zeros((int(mc_filt.shape[0] / 2), mc_data.shape[1]),
+                   dtype=np.float32)
+    data = np.vstack((pad, mc_data, pad))
+    fout = np.empty(mc_data.shape[0], dtype=np.float32)
+    return _mcfilter_valid_cy32(data, mc_filt, fout, num_threads)
+
+def _mcfilter_hist_cy32_mt(
+        np.ndarray[np.float32_t, ndim=2] mc_data,
+        np.ndarray[np.float32_t, ndim=2] mc_filt,
+        np.ndarray[np.float32_t, ndim=2] mc_hist,
+        int num_threads):
+    td, th = mc_data.shape[0], mc_hist.shape[0]
+    data = np.vstack((mc_hist, mc_data))
+    fout = np.empty(td, dtype=np.float32)
+    _mcfilter_valid_cy32(data, mc_filt, fout, num_threads)
+    mc_hist[:] = data[td:td + th]
+    return fout, mc_hist
+
+def _mcfilter_hist_bank_cy32_mt(
+        np.ndarray[np.float32_t, ndim=2] mc_data,
+        np.ndarray[np.float32_t, ndim=3] mc_filt,
+        np.ndarray[np.float32_t, ndim=2] mc_hist,
+        int num_threads):
+    td, th = mc_data.shape[0], mc_hist.shape[0]
+    data = np.vstack((mc_hist, mc_data))
+    fout = np.empty((td, mc_filt.shape[0]), dtype=np.float32)
+    _mcfilter_valid_bank_cy32(data, mc_filt, fout, num_threads)
+    mc_hist[:] = data[td:td + th]
+    return fout, mc_hist
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def _mcfilter_valid_cy64(
+        np.ndarray[np.float64_t, ndim=2, mode='c'] data,
+        np.ndarray[np.float64_t, ndim=2, mode='c'] mc_filt,
+        np.ndarray[np.float64_t, ndim=1] fout,
+        int num_threads):
+    cdef:
+        Py_ssize_t nc = data.shape[1]
+        Py_ssize_t td = fout.shape[0]
+        Py_ssize_t tf = mc_filt.shape[0]
+        np.float64_t * data_ptr = <np.float64_t *> data.data
+        np.float64_t * filt_ptr = <np.float64_t *> mc_filt.data
+        np.float64_t value
+        Py_ssize_t t, k
+    if data.shape[0] < td + tf - 1:
+        raise ValueError('data too short for %d output samples' % td)
+    with nogil:
+        for t in prange(td, num_threads=num_threads, schedule='static'):
+            value = 0.0
+            for k in range(tf * nc):
+                value = value + data_ptr[t * nc + k] * filt_ptr[k]
+            fout[t] = value
+    return fout
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def _mcfilter_valid_bank_cy64(
+        np.ndarray[np.float64_t, ndim=2, mode='c'] data,
+        np.ndarray[np.float64_t, ndim=3, mode='c'] mc_filt,
+        np.ndarray[np.float64_t, ndim=2] fout,
+        int num_threads):
+    cdef:
+        Py_ssize_t nc = data.shape[1]
+        Py_ssize_t td = fout.shape[0]
+        Py_ssize_t nf = mc_filt.shape[0]
+        Py_ssize_t tf = mc_filt.shape[1]
+        np.float64_t * data_ptr = <np.float64_t *> data.data
+        np.float64_t * filt_ptr = <np.float64_t *> mc_filt.data
+        np.float64_t value
+        Py_ssize_t t, f, k
+    if data.shape[0] < td + tf - 1:
+        raise ValueError('data too short for %d output samples' % td)
+    with nogil:
+        # the time range is split across the threads, every thread applies
+        # all filters to a data window while it is in the cache
+        for t in prange(td, num_threads=num_threads, schedule='static'):
+            for f in range(nf):
+                value = 0.0
+                for k in range(tf * nc):
+                    value = value + data_ptr[t * nc + k] * \
+                                    filt_ptr[f * tf * nc + k]
+                fout[t, f] = value
+    return fout
+
+def _mcfilter_cy64_mt(
+        np.ndarray[np.float64_t, ndim=2] mc_data,
+        np.ndarray[np.float64_t, ndim=2] mc_filt,
+        int num_threads):
+    pad = np.zeros((int(mc_filt.shape[0] / 2), mc_data.shape[1]),
+                   dtype=np.float64)
+    data = np.vstack((pad, mc_data, pad))
+    fout = np.empty(mc_data.shape[0], dtype=np.float64)
+    return _mcfilter_valid_cy64(data, mc_filt, fout, num_threads)
+
+def _mcfilter_hist_cy64_mt(
+        np.ndarray[np.float64_t, ndim=2] mc_data,
+        np.ndarray[np.float64_t, ndim=2] mc_filt,
+        np.ndarray[np.float64_t, ndim=2] mc_hist,
+        int num_threads):
+    td, th = mc_data.shape[0], mc_hist.shape[0]
+    data = np.vstack((mc_hist, mc_data))
+    fout = np.empty(td, dtype=np.float64)
+    _mcfilter_valid_cy64(data, mc_filt, fout, num_threads)
+    mc_hist[:] = data[td:td + th]
+    return fout, mc_hist
+
+def _mcfilter_hist_bank_cy64_mt(
+        np.ndarray[np.float64_t, ndim=2] mc_data,
+        np.ndarray[np.float64_t, ndim=3] mc_filt,
+        np.ndarray[np.float64_t, ndim=2] mc_hist,
+        int num_threads):
+    td, th = mc_data.shape[0], mc_hist.shape[0]
+    data = np.vstack((mc_hist, mc_data))
+    fout = np.empty((td, mc_filt.shape[0]), dtype=np.float64)
+    _mcfilter_valid_bank_cy64(data, mc_filt, fout, num_threads)
+    mc_hist[:] = data[td:td + th]
+    return fout, mc_hist
+
+##---INT16
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def _mcfilter_valid_cy16(
+        np.ndarray[np.int16_t, ndim=2, mode='c'] data,
+        np.ndarray[np.float32_t, ndim=2, mode='c'] mc_filt,
+        np.ndarray[np.float32_t, ndim=1] gain,
+        np.ndarray[np.float32_t, ndim=1] fout,
+        int num_threads):
+    cdef:
+        Py_ssize_t nc = data.shape[1]
+        Py_ssize_t td = fout.shape[0]
+        Py_ssize_t tf = mc_filt.shape[0]
+        np.int16_t * data_ptr = <np.int16_t *> data.data
+        np.float32_t * filt_ptr = <np.float32_t *> mc_filt.data
+        np.float32_t value, acc
+        Py_ssize_t t, tau, c
+    if data.shape[0] < td + tf - 1:
+        raise ValueError('data too short for %d output samples' % td)
+    if gain.shape[0] != nc:
+        raise ValueError('gain does not match the channel count')
+    with nogil:
+        # the raw samples are accumulated per channel, the gain of the
+        # channel is applied once to the accumulated value
+        for t in prange(td, num_threads=num_threads, schedule='static'):
+            value = 0.0
+            for c in range(nc):
+                acc = 0.0
+                for tau in range(tf):
+                    acc = acc + data_ptr[(t + tau) * nc + c] * \
+                                filt_ptr[tau * nc + c]
+                value = value + gain[c] * acc
+            fout[t] = value
+    return fout
+
 def lib_info():
     pass
 
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+#_____________________________________________________________________________
+#
+# Copyright (c) 2012 Berlin Institute of Technology
+# All rights reserved.
+#
+# Developed by:	Philipp Meier <pmeier82@gmail.com>
+#               Neural Information Processing Group (NI)
+#               School for Electrical Engineering and Computer Science
+#               Berlin Institute of Technology
+#               MAR 5-6, Marchstr. 23, 10587 Berlin, Germany
+#               http://www.ni.tu-berlin.de/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal with the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimers.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimers in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the names of Neural Information Processing Group (NI), Berlin
+#   Institute of Technology, nor the names of its contributors may be used to
+#   endorse or promote products derived from this Software without specific
+#   prior written permission.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# CONTRIBUTORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# WITH THE SOFTWARE.
+#_____________________________________________________________________________
+#
+# Acknowledgements:
+#   Philipp Meier <pmeier82@gmail.com>
+#_____________________________________________________________________________
+#
+
+"""multichanneled filter application for time domain FIR filters
+
+FFT IMPLEMENTATIONS USING OVERLAP-SAVE
+"""
+__docformat__ = 'restructuredtext'
+__all__ = ['_mcfilter_fft', '_mcfilter_hist_fft', '_mcfilter_hist_bank_fft',
+           '_fft_len', ]
+
+##---IMPORTS
+
+import scipy as sp
+from numpy.fft import rfft, irfft
+from numpy.lib.stride_tricks import as_strided
+
+##---CONSTANTS
+
+# the fft block length is the smallest power of two holding this many filters
+FFT_LEN_FACTOR = 4
+# number of data elements (block samples x channels) transformed at once, the
+# temporary spectra of a batch are of this size
+FFT_BATCH_SIZE = 2 ** 18
+
+##---FUNCTIONS
+
+def _fft_len(tf):
+    """fft block length for the overlap-save method
+
+    :type tf: int
+    :param tf: filter length in samples
+    :rtype: int
+    :returns: smallest power of two >= FFT_LEN_FACTOR * tf
+    """
+
+    nfft = 1
+    while nfft < FFT_LEN_FACTOR * tf:
+        nfft <<= 1
+    return nfft
+
+
+def _overlap_save(data, filt, td, out=None):
+    """valid mode multichanneled cross-correlation via overlap-save
+
+    Computes fout[t, f] = sum_c sum_tau data[t + tau, c] * filt[f, tau, c]
+    for t in [0, td). `data` has to hold at least td + tf - 1 samples. The
+    spectrum of every data block is computed once and shared by all filters.
+    The blocks are transformed in batches of about FFT_BATCH_SIZE elements,
+    so there is no float copy of the whole data.
+
+    :type data: ndarray
+    :param data: signal data [data_samples, channels]
+    :type filt: ndarray
+    :param filt: FIR filter bank [filters, filter_samples, channels]
+    :type td: int
+    :param td: number of output samples
+    :type out: ndarray
+    :param out: if not None, the filter output is written to this array
+        [td, filters], which may be a strided view.
+        Default=None
+    :rtype: ndarray
+    :returns: filter output [td, filters], float64 if `out` is None
+    """
+
+    # inits
+    nf, tf, nc = filt.shape
+    nfft = _fft_len(tf)
+    step = nfft - tf + 1
+    nblk = int(sp.ceil(td / float(step)))
+    fout = out
+    if fout is None:
+        fout = sp.empty((td, nf))
+    filt_spec = rfft(filt, nfft, axis=1).conj()
+
+    # blocks that lie completely inside the data are strided views
+    nfull = max(0, min(nblk, (data.shape[0] - nfft) // step + 1))
+    if nfull > 0:
+        blocks = as_strided(data, shape=(nfull, nfft, nc),
+                            strides=(step * data.strides[0],) + data.strides)
+        _batch_output(blocks, filt_spec, nfft, step, fout[:nfull * step])
+
+    # remaining blocks run over the end of the data and are zero padded
+    if nfull < nblk:
+        tail = sp.zeros(((nblk - nfull - 1) * step + nfft, nc),
+                        dtype=data.dtype)
+        tail_len = data.shape[0] - nfull * step
+        tail[:tail_len] = data[nfull * step:]
+        blocks = as_strided(tail, shape=(nblk - nfull, nfft, nc),
+                            strides=(step * tail.strides[0],) + tail.strides)
+        _batch_output(blocks, filt_spec, nfft, step, fout[nfull * step:])
+
+    # return
+    return fout
+
+
+def _batch_output(blocks, filt_spec, nfft, step, out):
+    """filter output of a stack of data blocks, transformed in batches
+
+    :type blocks: ndarray
+    :param blocks: data blocks [blocks, nfft, channels]
+    :type filt_spec: ndarray
+    :param filt_spec: conjugated filter spectra [filters, nfft/2+1, channels]
+    :type out: ndarray
+    :param out: valid part of the filter output [<= blocks * step, filters],
+        the output of the blocks beyond its end is discarded
+    """
+
+    nb = max(1, FFT_BATCH_SIZE // (nfft * blocks.shape[2]))
+    for b in xrange(0, blocks.shape[0], nb):
+        dst = out[b * step:(b + nb) * step]
+        if dst.shape[0] == 0:
+            break
+        dst[:] = _block_output(blocks[b:b + nb], filt_spec, nfft,
+                               step)[:dst.shape[0]]
+
+
+def _block_output(blocks, filt_spec, nfft, step):
+    """filter output of a stack of data blocks
+
+    :type blocks: ndarray
+    :param blocks: data blocks [blocks, nfft, channels]
+    :type filt_spec: ndarray
+    :param filt_spec: conjugated filter spectra [filters, nfft/2+1, channels]
+    :rtype: ndarray
+    :returns: valid part of the filter output [blocks * step, filters]
+    """
+
+    spec = sp.einsum('bkc,fkc->bfk', rfft(blocks, axis=1), filt_spec)
+    rval = irfft(spec, nfft, axis=2)[:, :, :step]
+    return rval.transpose(0, 2, 1).reshape(-1, filt_spec.shape[0])
+
+
+def _mcfilter_fft(mc_data, mc_filt):
+    if mc_data.ndim != mc_filt.ndim > 2:
+        raise ValueError('wrong dimensions: %s, %s' %
+                         (mc_data.shape, mc_filt.shape))
+    if mc_data.shape[1] != mc_filt.shape[1]:
+        raise ValueError('channel count does not match')
+    td, nc = mc_data.shape
+    tf = mc_filt.shape[0]
+    pad = sp.zeros((int(tf / 2), nc), dtype=mc_data.dtype)
+    data = sp.vstack((pad, mc_data, pad))
+    return _overlap_save(data, mc_filt[None], td)[:, 0].astype(mc_data.dtype)
+
+
+def _mcfilter_hist_fft(mc_data, mc_filt, mc_hist):
+    if mc_data.ndim != mc_filt.ndim > 2:
+        raise ValueError('wrong dimensions: %s, %s' %
+                         (mc_data.shape, mc_filt.shape))
+    if mc_data.shape[1] != mc_filt.shape[1]:
+        raise ValueError('channel count does not match')
+    td, th = mc_data.shape[0], mc_hist.shape[0]
+    data = sp.vstack((mc_hist, mc_data))
+    fout = _overlap_save(data, mc_filt[None], td)[:, 0]
+    fout = fout.astype(mc_data.dtype)
+    mc_hist[:] = data[td:td + th]
+    return fout, mc_hist
+
+
+def _mcfilter_hist_bank_fft(mc_data, mc_filt, mc_hist):
+    if mc_data.ndim != 2 or mc_filt.ndim != 3:
+        raise ValueError('wrong dimensions: %s, %s' %
+                         (mc_data.shape, mc_filt.shape))
+    if mc_data.shape[1] != mc_filt.shape[2]:
+        raise ValueError('channel count does not match')
+    td, th = mc_data.shape[0], mc_hist.shape[0]
+    data = sp.vstack((mc_hist, mc_data))
+    fout = _overlap_save(data, mc_filt, td).astype(mc_data.dtype)
+    mc_hist[:] = data[td:td + th]
+    return fout, mc_hist
+
+##---MAIN
+
+if __name__ == '__main__':
+    pass
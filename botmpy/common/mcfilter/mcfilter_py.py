@@ -47,11 +47,19 @@
 PYTHON IMPLEMENTATIONS USING SCIPY
 """
 __docformat__ = 'restructuredtext'
-__all__ = ['_mcfilter_py', '_mcfilter_hist_py', ]
+__all__ = ['_mcfilter_py', '_mcfilter_hist_py', '_mcfilter_hist_bank_py',
+           '_mcfilter_valid_py', '_mcfilter_valid_bank_py',
+           '_mcfilter_valid_gain_py', ]
 
 ##---IMPORTS
 
 import scipy as sp
+from numpy.lib.stride_tricks import as_strided
+
+##---CONSTANTS
+
+# size of the im2col data blocks in bytes, should fit into the cache
+IM2COL_BLOCK_BYTES = 2 ** 20
 
 ##---FUNCTIONS
 
@@ -72,13 +80,76 @@ def _mcfilter_hist_py(mc_data, mc_filt, mc_hist):
                          (mc_data.shape, mc_filt.shape))
     if mc_data.shape[1] != mc_filt.shape[1]:
         raise ValueError('channel count does not match')
-    mc_hist_and_data = sp.vstack((mc_hist, mc_data))
-    rval = sp.zeros(mc_data.shape[0], dtype=mc_data.dtype)
-    for t in xrange(mc_data.shape[0]):
-        for c in xrange(mc_hist_and_data.shape[1]):
-            rval[t] += sp.dot(mc_hist_and_data[t:t + mc_filt.shape[0], c],
-                              mc_filt[:, c])
-    return rval, mc_data[t + 1:, :].copy()
+    td, th = mc_data.shape[0], mc_hist.shape[0]
+    data = sp.vstack((mc_hist, mc_data))
+    rval = sp.empty(td, dtype=mc_data.dtype)
+    _mcfilter_valid_py(data, mc_filt, rval)
+    mc_hist[:] = data[td:td + th]
+    return rval, mc_hist
+
+
+def _mcfilter_hist_bank_py(mc_data, mc_filt, mc_hist):
+    if mc_data.ndim != 2 or mc_filt.ndim != 3:
+        raise ValueError('wrong dimensions: %s, %s' %
+                         (mc_data.shape, mc_filt.shape))
+    if mc_data.shape[1] != mc_filt.shape[2]:
+        raise ValueError('channel count does not match')
+    td, th = mc_data.shape[0], mc_hist.shape[0]
+    data = sp.vstack((mc_hist, mc_data))
+    rval = sp.empty((td, mc_filt.shape[0]), dtype=mc_data.dtype)
+    _mcfilter_valid_bank_py(data, mc_filt, rval)
+    mc_hist[:] = data[td:td + th]
+    return rval, mc_hist
+
+
+def _mcfilter_valid_py(data, mc_filt, fout):
+    td, tf = fout.shape[0], mc_filt.shape[0]
+    if data.shape[0] < td + tf - 1:
+        raise ValueError('data too short for %d output samples' % td)
+    # valid mode correlation per channel, summed over the channels
+    fout[:] = 0.0
+    for c in xrange(data.shape[1]):
+        fout += sp.correlate(data[:td + tf - 1, c], mc_filt[:, c],
+                             mode='valid')
+    return fout
+
+
+def _mcfilter_valid_gain_py(data, mc_filt, gain, fout):
+    td, tf = fout.shape[0], mc_filt.shape[0]
+    if data.shape[0] < td + tf - 1:
+        raise ValueError('data too short for %d output samples' % td)
+    # valid mode correlation per channel, scaled by the channel gain
+    fout[:] = 0.0
+    for c in xrange(data.shape[1]):
+        fout += gain[c] * sp.correlate(data[:td + tf - 1, c], mc_filt[:, c],
+                                       mode='valid')
+    return fout
+
+
+def _mcfilter_valid_bank_py(data, mc_filt, fout):
+    td = fout.shape[0]
+    nf, tf, nc = mc_filt.shape
+    if data.shape[0] < td + tf - 1:
+        raise ValueError('data too short for %d output samples' % td)
+    data = sp.ascontiguousarray(data)
+    filt = mc_filt.reshape(nf, tf * nc).T
+    # im2col: each row of the window view is the flattened data patch that
+    # the filters are applied to, so every block is a single GEMM
+    windows = as_strided(data, shape=(td, tf * nc),
+                         strides=(data.strides[0], data.strides[1]))
+    blk = max(1, IM2COL_BLOCK_BYTES // (tf * nc * data.itemsize))
+    if fout.flags.c_contiguous:
+        for t in xrange(0, td, blk):
+            sp.dot(windows[t:t + blk], filt, out=fout[t:t + blk])
+    else:
+        # the GEMM needs a contiguous output, a strided output (e.g. a block
+        # of columns) is written through a buffer of one block
+        buf = sp.empty((min(blk, td), nf), dtype=fout.dtype)
+        for t in xrange(0, td, blk):
+            n = min(blk, td - t)
+            sp.dot(windows[t:t + n], filt, out=buf[:n])
+            fout[t:t + n] = buf[:n]
+    return fout
 
 if __name__ == '__main__':
     pass
@@ -0,0 +1,397 @@
+# -*- coding: utf-8 -*-
+#_____________________________________________________________________________
+#
+# Copyright (c) 2012 Berlin Institute of Technology
+# All rights reserved.
+#
+# Developed by:	Philipp Meier <pmeier82@gmail.com>
+#               Neural Information Processing Group (NI)
+#               School for Electrical Engineering and Computer Science
+#               Berlin Institute of Technology
+#               MAR 5-6, Marchstr. 23, 10587 Berlin, Germany
+#               http://www.ni.tu-berlin.de/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal with the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimers.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimers in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the names of Neural Information Processing Group (NI), Berlin
+#   Institute of Technology, nor the names of its contributors may be used to
+#   endorse or promote products derived from this Software without specific
+#   prior written permission.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# CONTRIBUTORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# WITH THE SOFTWARE.
+#_____________________________________________________________________________
+#
+# Acknowledgements:
+#   Philipp Meier <pmeier82@gmail.com>
+#_____________________________________________________________________________
+#
+"""preallocated data buffers for chunk-wise filtering and sorting"""
+__docformat__ = 'restructuredtext'
+__all__ = ['FilterWorkspace', 'WorkspaceArena']
+
+##---IMPORTS
+
+import scipy as sp
+
+##---CLASSES
+
+class FilterWorkspace(object):
+    """preallocated data buffer for chunk-wise filtering with history
+
+    The buffer holds the history item (the last tf-1 samples of the
+    preceding chunk) at its head, followed by the current chunk, so the
+    filter kernels can operate on the buffer directly. After filtering the
+    tf-1 tail of the chunk is moved to the head of the buffer. The buffer is
+    only reallocated if a chunk exceeds the capacity.
+
+    There are two ways to put a chunk into the buffer. `load` copies a chunk
+    given as an array into the buffer, selecting the channel set in one
+    pass. Producers of the data can avoid this copy: `reserve` returns the
+    region behind the history, the producer writes the chunk there in place
+    (e.g. `ChunkSource.read` with `out`) and passes the region to the filter
+    functions, which then only move the tf-1 tail.
+
+    The dtype of the buffer is fixed once it is allocated. A chunk is only
+    loaded if its dtype can be cast to the buffer dtype without loss, e.g.
+    float32 data into a float64 buffer, else a ValueError is raised.
+    """
+
+    ## constructor
+
+    def __init__(self, tf, nc, chan_set=None, capacity=0, dtype=None):
+        """
+        :type tf: int
+        :param tf: filter length in samples
+        :type nc: int
+        :param nc: channel count of the filters
+        :type chan_set: tuple
+        :param chan_set: tuple of int designating the columns of the input
+            data to load. If None, the input has to have `nc` columns.
+            Default=None
+        :type capacity: int
+        :param capacity: initial capacity of the buffer for chunk data
+            (rows)
+            Default=0
+        :type dtype: dtype resolvable
+        :param dtype: dtype of the buffer, one of float32, float64 or
+            int16. If None, the dtype is taken from the first chunk loaded.
+            Default=None
+        """
+
+        # checks
+        if tf < 1:
+            raise ValueError('tf < 1')
+        if nc < 1:
+            raise ValueError('nc < 1')
+        if chan_set is not None and len(chan_set) != nc:
+            raise ValueError('chan_set does not match the channel count')
+
+        # members
+        self._tf = int(tf)
+        self._nc = int(nc)
+        self._chan_set = None if chan_set is None else tuple(chan_set)
+        self._capacity = int(capacity)
+        self._dtype = None
+        self._buf = None
+        self._td = 0
+        if dtype is not None:
+            self._alloc(dtype)
+
+    def _alloc(self, dtype):
+        dtype = sp.dtype(dtype)
+        if dtype not in [sp.float32, sp.float64, sp.int16]:
+            raise ValueError('dtype is not float32, float64 or int16: %s' %
+                             dtype)
+        self._dtype = dtype
+        self._buf = sp.zeros((self._tf - 1 + self._capacity, self._nc),
+                             dtype=self._dtype)
+
+    ## properties
+
+    def get_tf(self):
+        return self._tf
+
+    tf = property(get_tf, doc='filter length [samples]')
+
+    def get_nc(self):
+        return self._nc
+
+    nc = property(get_nc, doc='number of channels')
+
+    def get_chan_set(self):
+        return self._chan_set
+
+    chan_set = property(get_chan_set, doc='columns of the input to load')
+
+    def get_capacity(self):
+        return self._capacity
+
+    capacity = property(get_capacity, doc='chunk capacity [samples]')
+
+    def get_dtype(self):
+        return self._dtype
+
+    dtype = property(get_dtype, doc='dtype of the buffer')
+
+    def get_hist(self):
+        if self._buf is None:
+            dtype = sp.float64 if self._dtype is None else self._dtype
+            return sp.zeros((self._tf - 1, self._nc), dtype=dtype)
+        return self._buf[:self._tf - 1]
+
+    hist = property(get_hist, doc='history item [tf-1, nc]')
+
+    ## methods interface
+
+    def reserve(self, td, dtype=None):
+        """region of the buffer behind the history for the next chunk
+
+        The chunk is written into the returned region in place. Passing the
+        region to `load` (or the filter functions) does not copy it again.
+        The buffer grows if the chunk exceeds the capacity, keeping the
+        history. The region is valid until the next `advance`.
+
+        :type td: int
+        :param td: chunk length (samples)
+        :type dtype: dtype resolvable
+        :param dtype: dtype of the chunk data. The buffer is allocated with
+            it if that did not happen yet. A ValueError is raised if it can
+            not be cast to the buffer dtype without loss.
+            Default=None
+        :rtype: ndarray
+        :returns: writable view on the chunk region [td, nc]
+        """
+
+        # checks
+        if self._buf is None:
+            if dtype is None:
+                raise ValueError('the buffer dtype is not known yet, pass '
+                                 'the dtype of the chunk')
+            self._alloc(dtype)
+        if dtype is not None and not sp.can_cast(dtype, self._dtype):
+            raise ValueError('data dtype %s can not be loaded into the %s '
+                             'buffer without loss' %
+                             (sp.dtype(dtype), self._dtype))
+
+        # grow if needed, keeping the history
+        th, td = self._tf - 1, int(td)
+        if td > self._capacity:
+            buf = sp.empty((th + td, self._nc), dtype=self._dtype)
+            buf[:th] = self._buf[:th]
+            self._buf = buf
+            self._capacity = td
+        self._td = td
+        return self._buf[th:th + td]
+
+    def load(self, mc_data):
+        """write a chunk of data into the buffer behind the history
+
+        If `mc_data` is the region returned by `reserve`, it is already in
+        place and not copied.
+
+        :type mc_data: ndarray
+        :param mc_data: chunk data [samples, channels]
+        :rtype: ndarray
+        :returns: view on the history and the chunk data [tf-1+samples, nc]
+        """
+
+        # checks
+        if mc_data.ndim != 2:
+            raise ValueError('data has to be [samples, channels]')
+        th, td = self._tf - 1, mc_data.shape[0]
+        if self._is_reserved(mc_data):
+            return self._buf[:th + td]
+        if self._chan_set is None and mc_data.shape[1] != self._nc:
+            raise ValueError('channel count does not match')
+        if self._chan_set is not None and not (
+                    0 <= min(self._chan_set) and
+                    max(self._chan_set) < mc_data.shape[1]):
+            raise ValueError('chan_set does not match the channel count')
+
+        # load
+        region = self.reserve(td, dtype=mc_data.dtype)
+        if self._chan_set is None:
+            region[:] = mc_data
+        else:
+            # the indices are checked, mode 'clip' writes to out unbuffered
+            sp.take(mc_data, self._chan_set, axis=1, out=region, mode='clip')
+        return self._buf[:th + td]
+
+    def advance(self):
+        """move the tail of the loaded chunk to the head of the buffer"""
+
+        th, td = self._tf - 1, self._td
+        if self._buf is not None and td > 0:
+            if td < th:
+                self._buf[:th] = self._buf[td:td + th].copy()
+            else:
+                self._buf[:th] = self._buf[td:td + th]
+        self._td = 0
+
+    def _is_reserved(self, mc_data):
+        """True if `mc_data` is the reserved chunk region of the buffer"""
+
+        if self._buf is None or mc_data.shape != (self._td, self._nc):
+            return False
+        region = self._buf[self._tf - 1:self._tf - 1 + self._td]
+        return (mc_data.dtype == region.dtype and
+                mc_data.strides == region.strides and
+                mc_data.__array_interface__['data'][0] ==
+                region.__array_interface__['data'][0])
+
+    def reset(self):
+        """sets the history to all zeros"""
+
+        if self._buf is not None:
+            self._buf[:self._tf - 1] = 0.0
+        self._td = 0
+
+    ## special methods
+
+    def __str__(self):
+        return '%s(tf=%s,nc=%s,cap=%s)' % (self.__class__.__name__,
+                                           self._tf, self._nc,
+                                           self._capacity)
+
+
+class WorkspaceArena(object):
+    """reusable named buffers for chunk-wise processing
+
+    A buffer is requested by name, shape and dtype. The arena holds one
+    allocation per name and hands out views of its leading rows. The
+    allocation is kept as long as the dtype and the trailing dimensions
+    (e.g. the filter count) of the requests do not change and the requested
+    row count (e.g. the chunk length) fits, else it is replaced. Grown
+    allocations get 25% headroom, so varying chunk lengths settle quickly
+    and steady-state processing does not allocate at all.
+
+    The content of a buffer is undefined when it is handed out, and a view
+    is only valid until the same name is requested again. Buffers are not
+    pickled or copied, a copy of the arena starts empty.
+    """
+
+    ## constructor
+
+    def __init__(self):
+        self._store = {}
+        self._n_alloc = 0
+        self._n_request = 0
+        self._nbytes = 0
+        self._peak_nbytes = 0
+
+    ## properties
+
+    def get_n_alloc(self):
+        return self._n_alloc
+
+    n_alloc = property(get_n_alloc, doc='number of allocations made')
+
+    def get_n_request(self):
+        return self._n_request
+
+    n_request = property(get_n_request, doc='number of buffers handed out')
+
+    def get_nbytes(self):
+        return self._nbytes
+
+    nbytes = property(get_nbytes, doc='bytes currently held')
+
+    def get_peak_nbytes(self):
+        return self._peak_nbytes
+
+    peak_nbytes = property(get_peak_nbytes, doc='maximum of bytes held')
+
+    ## methods interface
+
+    def get(self, name, shape, dtype):
+        """buffer view for a request
+
+        :type name: str
+        :param name: name of the buffer
+        :type shape: int or tuple
+        :param shape: shape of the buffer, the first dimension may vary
+            between requests
+        :type dtype: dtype resolvable
+        :param dtype: dtype of the buffer
+        :rtype: ndarray
+        :returns: C-contiguous view of the buffer with the requested shape,
+            content undefined
+        """
+
+        shape = tuple(int(s) for s in sp.atleast_1d(shape))
+        dtype = sp.dtype(dtype)
+        buf = self._store.get(name)
+        if (buf is None or buf.dtype != dtype or buf.shape[1:] != shape[1:]
+            or buf.shape[0] < shape[0]):
+            rows = shape[0]
+            if (buf is not None and buf.dtype == dtype and
+                    buf.shape[1:] == shape[1:]):
+                rows = max(rows, buf.shape[0] + buf.shape[0] // 4)
+            self._release(name)
+            buf = sp.empty((rows,) + shape[1:], dtype=dtype)
+            self._store[name] = buf
+            self._n_alloc += 1
+            self._nbytes += buf.nbytes
+            self._peak_nbytes = max(self._peak_nbytes, self._nbytes)
+        self._n_request += 1
+        return buf[:shape[0]]
+
+    def clear(self):
+        """release all buffers, the statistics are kept"""
+
+        for name in self._store.keys():
+            self._release(name)
+
+    def reset_stats(self):
+        """reset the statistics to the buffers currently held"""
+
+        self._n_alloc = len(self._store)
+        self._n_request = 0
+        self._peak_nbytes = self._nbytes
+
+    def _release(self, name):
+        buf = self._store.pop(name, None)
+        if buf is not None:
+            self._nbytes -= buf.nbytes
+
+    ## special methods
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_store'] = {}
+        state['_nbytes'] = 0
+        return state
+
+    def __deepcopy__(self, memo):
+        rval = self.__class__.__new__(self.__class__)
+        rval.__setstate__(self.__getstate__())
+        return rval
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+    def __str__(self):
+        return '%s(buffers=%s,nbytes=%s,peak=%s)' % (
+            self.__class__.__name__, len(self._store), self._nbytes,
+            self._peak_nbytes)
+
+##---MAIN
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+#_____________________________________________________________________________
+#
+# Copyright (c) 2012 Berlin Institute of Technology
+# All rights reserved.
+#
+# Developed by:	Philipp Meier <pmeier82@gmail.com>
+#               Neural Information Processing Group (NI)
+#               School for Electrical Engineering and Computer Science
+#               Berlin Institute of Technology
+#               MAR 5-6, Marchstr. 23, 10587 Berlin, Germany
+#               http://www.ni.tu-berlin.de/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal with the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimers.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimers in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the names of Neural Information Processing Group (NI), Berlin
+#   Institute of Technology, nor the names of its contributors may be used to
+#   endorse or promote products derived from this Software without specific
+#   prior written permission.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# CONTRIBUTORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# WITH THE SOFTWARE.
+#_____________________________________________________________________________
+#
+# Acknowledgements:
+#   Philipp Meier <pmeier82@gmail.com>
+#_____________________________________________________________________________
+#
+
+
+"""lifecycle of persistent pools of worker threads or processes"""
+__docformat__ = 'restructuredtext'
+__all__ = ['PersistentPool']
+
+##---IMPORTS
+
+import atexit
+import weakref
+
+##---CONSTANTS
+
+_POOLS = weakref.WeakSet()
+
+##---FUNCTIONS
+
+@atexit.register
+def _close_pools():
+    """stop the workers of all live pools before the interpreter exits"""
+
+    for pool in list(_POOLS):
+        pool.close()
+
+##---CLASSES
+
+class PersistentPool(object):
+    """base class for pools that keep their workers running between calls
+
+    A subclass starts its workers and then calls this constructor, which
+    registers the pool. Live pools are closed before the interpreter shuts
+    down and a pool is closed when it is collected, so the workers must only
+    hold references to their queues or pipes, not to the pool. `close` has
+    to be safe to call more than once.
+    """
+
+    def __init__(self):
+        _POOLS.add(self)
+
+    def close(self):
+        """stop the workers"""
+
+        raise NotImplementedError
+
+    def __del__(self):
+        self.close()
+
+##---MAIN
+
+if __name__ == '__main__':
+    pass
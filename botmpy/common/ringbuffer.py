@@ -58,6 +58,23 @@ class MxRingBuffer(object):
 
     Ringbuffer behavior is archived by cycling though the buffer forward,
     wrapping around to the start upon reaching capacity.
+
+    Every modification of the contents increments the `version` counter, so
+    that values derived from the contents can be checked for staleness.
+
+    A running sum (float64) of the contents is maintained, so the mean over
+    the buffer is available without a pass over the data. The sum is
+    recomputed exactly every time the write position wraps around, to bound
+    the accumulated rounding error. The contents must only be changed with
+    the methods of the ringbuffer for the sum to stay valid.
+
+    Indexing and iteration return copies of the contents. To read without
+    copying, `segments` returns views on the at most two contiguous segments
+    of the buffer holding the contents, in chronological order, and
+    `linearize` rotates the buffer so that the contents are one contiguous
+    block and returns a view on it. These views are only valid until the
+    next modification of the ringbuffer, `clear` zeroes the buffer and
+    appends overwrite the data behind them.
     """
 
     ## constructor
@@ -94,15 +111,8 @@ class MxRingBuffer(object):
                               dtype=self._dtype)
         self._next = 0
         self._full = False
-
-        # mapping prototypes
-        self._idx_belowcap_proto = lambda:range(self._next)
-        self._idx_fullcap_proto =\
-        lambda:range(self._next, self._capacity) + range(self._next)
-
-        # mappings
-        self._idx_append = self._idx_fullcap_proto
-        self._idx_retrieve = self._idx_belowcap_proto
+        self._version = 0
+        self._sum = sp.zeros(self._dimension, dtype=sp.float64)
 
     ## properties
 
@@ -116,6 +126,11 @@ class MxRingBuffer(object):
 
     is_full = property(get_is_full)
 
+    def get_version(self):
+        return self._version
+
+    version = property(get_version, doc='modification counter')
+
     def get_capacity(self):
         return self._capacity
 
@@ -151,25 +166,86 @@ class MxRingBuffer(object):
                              (self._dimension, datum.shape))
 
         # append
-        self._data[self._idx_append()[0], :] = datum
+        idx = self._next
+        if self._full is True:
+            self._sum -= self._data[idx]
+        self._data[idx, :] = datum
+        self._sum += self._data[idx]
 
         # index and capacity status bookkeeping
+        self._version += 1
         self._next += 1
         if self._next == self._capacity:
             self._next = 0
-            if self._full is False:
-                self._idx_retrieve = self._idx_fullcap_proto
-                self._full = True
+            self._full = True
+            self._resum()
 
     def extend(self, iterable):
-        """append iterable at the end of the buffer using multiple append's
+        """append iterable at the end of the buffer
+
+        The items are written with at most two slice assignments. If there
+        are more items than the capacity, only the last items that fit are
+        written, the result is the same as for appending one by one.
 
         :type iterable: iterable
         :param iterable: iterable of objects to be stored in the ringbuffer
         """
 
-        for item in iterable:
-            self.append(item)
+        # checks
+        if not isinstance(iterable, sp.ndarray):
+            iterable = list(iterable)
+        items = sp.asarray(iterable)
+        m = items.shape[0] if items.ndim > 0 else 0
+        if m == 0:
+            return
+        if items.shape[1:] != self._dimension:
+            raise ValueError('items have wrong dimension! expected %s was %s' %
+                             (self._dimension, items.shape[1:]))
+
+        # extend
+        if self._next + m < self._capacity:
+            sl = slice(self._next, self._next + m)
+            if self._full is True:
+                self._sum -= self._data[sl].sum(axis=0, dtype=sp.float64)
+            self._data[sl] = items
+            self._sum += self._data[sl].sum(axis=0, dtype=sp.float64)
+            self._next += m
+        else:
+            # the write position wraps around, the running sum is recomputed
+            k = min(m, self._capacity)
+            items = items[-k:]
+            start = (self._next + m - k) % self._capacity
+            head = min(k, self._capacity - start)
+            self._data[start:start + head] = items[:head]
+            self._data[:k - head] = items[head:]
+            self._next = (self._next + m) % self._capacity
+            self._full = True
+            self._resum()
+        self._version += 1
+
+    def segments(self):
+        """return views on the contents without copying
+
+        :returns: tuple - one or two views on the buffer that, concatenated
+            along the first axis, yield the contents in chronological order.
+        """
+
+        return self._segments(0, len(self))
+
+    def linearize(self):
+        """rotate the buffer in place, so that the contents are contiguous
+
+        Afterwards the oldest datum is at the start of the buffer. The
+        contents and the version do not change.
+
+        :returns: ndarray - view on the contents in chronological order
+        """
+
+        if self._full is True and self._next > 0:
+            self._data[:] = sp.concatenate((self._data[self._next:],
+                                            self._data[:self._next]))
+            self._next = 0
+        return self._data[:len(self)]
 
     def tolist(self):
         """return the buffer as a list
@@ -184,8 +260,9 @@ class MxRingBuffer(object):
 
         self._next = 0
         self._full = False
-        self._idx_retrieve = self._idx_belowcap_proto
+        self._version += 1
         self._data[:] = 0.0
+        self._sum[:] = 0.0
 
     def flush(self):
         """return the buffer as a list and clear the RingBuffer
@@ -213,16 +290,26 @@ class MxRingBuffer(object):
         """
 
         # checks
-        if len(self) == 0:
+        n = len(self)
+        if n == 0:
             # XXX: changed to just zeros(dim, dtype)
             # return sp.mean(sp.zeros(self._dimension, dtype=self._dtype),
             #                axis=0)
             return sp.zeros(self._dimension, dtype=self._dtype)
-        if last is None or last > len(self):
-            last = len(self)
+        if last is None or last > n:
+            last = n
+
+        # sum over the last entries: running sum for all, else sum over the
+        # last or subtract the sum over the first entries, whichever is less
+        if last == n:
+            rval = self._sum
+        elif last <= n - last:
+            rval = self._segments_sum(n - last, n)
+        else:
+            rval = self._sum - self._segments_sum(0, n - last)
 
         # return
-        return sp.mean(self._data[self._idx_retrieve()[-last:], :], axis=0)
+        return (rval / last).astype(self._dtype)
 
     def fill(self, datum):
         """fill all slots of the ringbuffer with the same datum.
@@ -242,10 +329,42 @@ class MxRingBuffer(object):
         self._data *= datum
 
         # index and capacity status bookkeeping
+        self._version += 1
         self._next = 0
+        self._full = True
+        self._resum()
+
+    def _idx_retrieve(self):
+        """buffer positions of the contents in chronological order"""
+
         if self._full is False:
-            self._idx_retrieve = self._idx_fullcap_proto
-            self._full = True
+            return sp.arange(self._next)
+        return (sp.arange(self._capacity) + self._next) % self._capacity
+
+    def _segments(self, start, stop):
+        """views on the contents in the chronological range [start, stop)"""
+
+        offset = self._next if self._full is True else 0
+        start, stop = offset + start, offset + max(start, stop)
+        if stop <= self._capacity:
+            return self._data[start:stop],
+        if start >= self._capacity:
+            return self._data[start - self._capacity:stop - self._capacity],
+        return self._data[start:], self._data[:stop - self._capacity]
+
+    def _segments_sum(self, start, stop):
+        """float64 sum over the contents in the chronological range"""
+
+        rval = sp.zeros(self._dimension, dtype=sp.float64)
+        for seg in self._segments(start, stop):
+            rval += seg.sum(axis=0, dtype=sp.float64)
+        return rval
+
+    def _resum(self):
+        """recompute the running sum exactly"""
+
+        n = self._capacity if self._full is True else self._next
+        self._sum = self._data[:n].sum(axis=0, dtype=sp.float64)
 
     ## special methods
 
@@ -258,17 +377,33 @@ class MxRingBuffer(object):
                                                        str(self._dimension))
 
     def __len__(self):
-        return len(self._idx_retrieve())
+        return self._capacity if self._full is True else self._next
 
     def __getitem__(self, k):
+        n = len(self)
+        if isinstance(k, (int, long, sp.integer)):
+            if k < 0:
+                k += n
+            if not 0 <= k < n:
+                raise IndexError('ringbuffer index out of range')
+            offset = self._next if self._full is True else 0
+            return self._data[(offset + k) % self._capacity].copy()
+        if isinstance(k, slice):
+            start, stop, step = k.indices(n)
+            if step == 1:
+                segs = self._segments(start, stop)
+                if len(segs) == 1:
+                    return segs[0].copy()
+                return sp.concatenate(segs)
+            if self._full is False or self._next == 0:
+                return self._data[:n][k].copy()
         try:
-            idx = self._idx_retrieve()[k]
-            return self._data[idx, ...]
+            return self._data[self._idx_retrieve()[k], ...]
         except IndexError:
             raise IndexError('ringbuffer index out of range')
 
     def __iter__(self):
-        return self._data[self._idx_retrieve(), ...].__iter__()
+        return self[:].__iter__()
 
 ##---MAIN
 
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+#_____________________________________________________________________________
+#
+# Copyright (c) 2012 Berlin Institute of Technology
+# All rights reserved.
+#
+# Developed by:	Philipp Meier <pmeier82@gmail.com>
+#               Neural Information Processing Group (NI)
+#               School for Electrical Engineering and Computer Science
+#               Berlin Institute of Technology
+#               MAR 5-6, Marchstr. 23, 10587 Berlin, Germany
+#               http://www.ni.tu-berlin.de/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal with the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimers.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimers in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the names of Neural Information Processing Group (NI), Berlin
+#   Institute of Technology, nor the names of its contributors may be used to
+#   endorse or promote products derived from this Software without specific
+#   prior written permission.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# CONTRIBUTORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# WITH THE SOFTWARE.
+#_____________________________________________________________________________
+#
+# Acknowledgements:
+#   Philipp Meier <pmeier82@gmail.com>
+#_____________________________________________________________________________
+#
+
+"""subtractive interference cancellation (SIC) on spike epochs
+
+The SIC method of the BOTM sorter resolves a spike epoch iteratively: the
+discriminant maximum is taken as a spike of the filter it belongs to, and
+the expected response of all filters to that spike (the cross-correlation
+of its template with all filters) is subtracted from the discriminants,
+until no discriminant exceeds the noise discriminant anymore or the
+subtraction would not reduce the energy of the filter outputs.
+
+`sic_epoch` updates the epoch discriminants in place. The subtrahend only
+affects a window of 2*tf-1 samples around the spike, so the energy test is
+evaluated on that window only, and the next maximum is found in the same
+pass that applies the subtrahend.
+
+Implementations are given in Python and alternatively in Cython. On import
+the Cython function is being tried to load, on failure the python version
+is loaded as a fallback.
+"""
+__docformat__ = 'restructuredtext'
+__all__ = ['sic_epoch', 'sic_subtrahends']
+
+##---IMPORTS
+
+import logging
+import scipy as sp
+from .sic_py import _sic_epoch_py
+
+##---USE_CYTHON
+
+try:
+    from .sic_cy import _sic_epoch_cy
+
+    USE_CYTHON = True
+except ImportError, ex:
+    logging.info('Cython implementation of sic not found (%s)! Falling '
+                 'back to the numpy implementation.' % ex)
+    USE_CYTHON = False
+
+##---FUNCTIONS
+
+def sic_subtrahends(xcorrs, dtype=None):
+    """subtrahends per filter from the cross-correlation tensor
+
+    :type xcorrs: ndarray
+    :param xcorrs: cross-correlation tensor of the filter bank
+        [nf, nf, 2*tf-1]
+    :type dtype: dtype resolvable
+    :param dtype: dtype of the discriminants. If None, use the dtype of
+        `xcorrs`.
+        Default=None
+    :rtype: ndarray
+    :returns: subtrahends [nf, 2*tf-1, nf], entry [i, j, k] is the
+        response of filter k at lag j to a spike of filter i.
+    """
+
+    if dtype is None:
+        dtype = xcorrs.dtype
+    return sp.ascontiguousarray(sp.swapaxes(xcorrs, 1, 2), dtype=dtype)
+
+
+def sic_epoch(ep_disc, ep_fout, sub, lpr_n, lpr_s, bias=None, extend=0,
+              max_iter=None):
+    """resolve a spike epoch by subtractive interference cancellation
+
+    :type ep_disc: ndarray
+    :param ep_disc: discriminants of the epoch [ns, nf], will be modified
+        in place
+    :type ep_fout: ndarray
+    :param ep_fout: filter outputs of the epoch [ns, nf]
+    :type sub: ndarray
+    :param sub: subtrahends as returned by `sic_subtrahends`
+        [nf, 2*tf-1, nf], in the dtype of `ep_disc`
+    :type lpr_n: float
+    :param lpr_n: noise discriminant
+    :type lpr_s: float
+    :param lpr_s: log prior of a spike, added to the discriminants per
+        subtracted spike
+    :type bias: float
+    :param bias: if not None, subtracted from the discriminant of the
+        filter that spiked, for `extend` samples starting at the spike.
+        Default=None
+    :type extend: int
+    :param extend: extend of the bias in samples
+        Default=0
+    :type max_iter: int
+    :param max_iter: maximum number of iterations. If None, use twice the
+        number of filters.
+        Default=None
+    :rtype: tuple
+    :returns: list of (sample, filter) tuples of the spikes found in the
+        epoch in the order they were found, number of iterations performed.
+    """
+
+    if ep_disc.ndim != 2 or ep_fout.shape != ep_disc.shape:
+        raise ValueError('ep_disc and ep_fout must agree in shape: %s, %s' %
+                         (ep_disc.shape, ep_fout.shape))
+    if sub.ndim != 3 or sub.shape[0] != ep_disc.shape[1] or \
+            sub.shape[2] != ep_disc.shape[1]:
+        raise ValueError('sub does not agree with the filter count: %s' %
+                         (sub.shape,))
+    if max_iter is None:
+        max_iter = 2 * ep_disc.shape[1]
+    if USE_CYTHON is True and \
+            ep_disc.dtype in (sp.float32, sp.float64) and \
+            ep_fout.dtype == sub.dtype == ep_disc.dtype and \
+            ep_disc.flags.c_contiguous and sub.flags.c_contiguous:
+        return _sic_epoch_cy(ep_disc, ep_fout, sub, lpr_n, lpr_s, bias,
+                             int(extend), int(max_iter))
+    return _sic_epoch_py(ep_disc, ep_fout, sub, lpr_n, lpr_s, bias,
+                         int(extend), int(max_iter))
+
+##---MAIN
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+#_____________________________________________________________________________
+#
+# Copyright (c) 2012 Berlin Institute of Technology
+# All rights reserved.
+#
+# Developed by:	Philipp Meier <pmeier82@gmail.com>
+#               Neural Information Processing Group (NI)
+#               School for Electrical Engineering and Computer Science
+#               Berlin Institute of Technology
+#               MAR 5-6, Marchstr. 23, 10587 Berlin, Germany
+#               http://www.ni.tu-berlin.de/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal with the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimers.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimers in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the names of Neural Information Processing Group (NI), Berlin
+#   Institute of Technology, nor the names of its contributors may be used to
+#   endorse or promote products derived from this Software without specific
+#   prior written permission.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# CONTRIBUTORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# WITH THE SOFTWARE.
+#_____________________________________________________________________________
+#
+# Acknowledgements:
+#   Philipp Meier <pmeier82@gmail.com>
+#_____________________________________________________________________________
+#
+
+"""subtractive interference cancellation on spike epochs
+
+CYTHON IMPLEMENTATIONS
+"""
+__docformat__ = 'restructuredtext'
+__all__ = []
+
+##---IMPORTS
+
+cimport cython
+from cython cimport floating
+
+##---FUNCTIONS
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def _sic_epoch_cy(
+        floating[:, ::1] ep_disc,
+        floating[:, :] ep_fout,
+        floating[:, :, ::1] sub,
+        double lpr_n,
+        double lpr_s,
+        bias,
+        Py_ssize_t extend,
+        Py_ssize_t max_iter):
+    cdef:
+        Py_ssize_t ns = ep_disc.shape[0]
+        Py_ssize_t nf = ep_disc.shape[1]
+        Py_ssize_t ns_sub = sub.shape[1]
+        Py_ssize_t tf = (ns_sub + 1) // 2
+        Py_ssize_t r, k, tau, lo, hi, ep_t = 0, ep_c = 0, t_best, c_best
+        Py_ssize_t niter = 0, b_hi = 0
+        floating lps = <floating>lpr_s
+        floating b = 0, v, best = 0, f
+        double e_old, e_new, d
+        bint found = False, has_bias = bias is not None
+    if has_bias:
+        b = <floating>bias
+    events = []
+
+    # first maximum in row major order, NaN is skipped
+    for r in range(ns):
+        for k in range(nf):
+            v = ep_disc[r, k]
+            if v == v and (not found or v > best):
+                best, ep_t, ep_c, found = v, r, k, True
+
+    while found and <double>best > lpr_n:
+        niter += 1
+        if niter > max_iter:
+            break
+
+        # the filter output outside of the window does not change the norm
+        tau = ep_t - tf + 1
+        lo = tau if tau > 0 else 0
+        hi = tau + ns_sub if tau + ns_sub < ns else ns
+        e_old = 0.0
+        e_new = 0.0
+        for r in range(lo, hi):
+            for k in range(nf):
+                f = ep_fout[r, k]
+                e_old += <double>f * f
+                d = <floating>(f - sub[ep_c, r - tau, k])
+                e_new += d * d
+        if e_new >= e_old:
+            break
+        events.append((ep_t, ep_c))
+
+        # apply subtrahend and find the next maximum in one pass
+        if has_bias:
+            b_hi = ep_t + extend if ep_t + extend < ns else ns
+        t_best, c_best = ep_t, ep_c
+        found = False
+        for r in range(ns):
+            for k in range(nf):
+                if lo <= r < hi:
+                    v = ep_disc[r, k] + \
+                        <floating>(lps - sub[c_best, r - tau, k])
+                else:
+                    v = ep_disc[r, k] + lps
+                if has_bias and k == c_best and t_best <= r < b_hi:
+                    v = v - b
+                ep_disc[r, k] = v
+                if v == v and (not found or v > best):
+                    best, ep_t, ep_c, found = v, r, k, True
+    return events, niter
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+#_____________________________________________________________________________
+#
+# Copyright (c) 2012 Berlin Institute of Technology
+# All rights reserved.
+#
+# Developed by:	Philipp Meier <pmeier82@gmail.com>
+#               Neural Information Processing Group (NI)
+#               School for Electrical Engineering and Computer Science
+#               Berlin Institute of Technology
+#               MAR 5-6, Marchstr. 23, 10587 Berlin, Germany
+#               http://www.ni.tu-berlin.de/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal with the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimers.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimers in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the names of Neural Information Processing Group (NI), Berlin
+#   Institute of Technology, nor the names of its contributors may be used to
+#   endorse or promote products derived from this Software without specific
+#   prior written permission.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# CONTRIBUTORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# WITH THE SOFTWARE.
+#_____________________________________________________________________________
+#
+# Acknowledgements:
+#   Philipp Meier <pmeier82@gmail.com>
+#_____________________________________________________________________________
+#
+
+"""subtractive interference cancellation on spike epochs
+
+PYTHON IMPLEMENTATIONS USING SCIPY
+"""
+__docformat__ = 'restructuredtext'
+__all__ = ['_sic_epoch_py']
+
+##---IMPORTS
+
+import scipy as sp
+
+##---FUNCTIONS
+
+def _sic_epoch_py(ep_disc, ep_fout, sub, lpr_n, lpr_s, bias, extend,
+                  max_iter):
+    ns, nf = ep_disc.shape
+    ns_sub = sub.shape[1]
+    tf = (ns_sub + 1) // 2
+    dt = ep_disc.dtype.type
+    lpr_s = dt(lpr_s)
+    events = []
+    niter = 0
+    while ns > 0 and sp.nanmax(ep_disc) > lpr_n:
+        niter += 1
+        if niter > max_iter:
+            break
+
+        # find epoch details, first maximum in row major order
+        ep_t, ep_c = divmod(int(sp.nanargmax(ep_disc)), nf)
+
+        # the subtrahend is nonzero only in a window around ep_t
+        tau = ep_t - tf + 1
+        lo, hi = max(0, tau), min(ns, tau + ns_sub)
+        ep_sub = sub[ep_c, lo - tau:hi - tau]
+
+        # the filter output outside of the window does not change the norm
+        f_old = ep_fout[lo:hi]
+        f_new = (f_old - ep_sub).astype(sp.float64)
+        f_old = f_old.astype(sp.float64)
+        if sp.vdot(f_new, f_new) >= sp.vdot(f_old, f_old):
+            break
+
+        # apply subtrahend
+        ep_disc[:lo] += lpr_s
+        ep_disc[lo:hi] += lpr_s - ep_sub
+        ep_disc[hi:] += lpr_s
+        if bias is not None:
+            ep_disc[ep_t:min(ep_t + extend, ns), ep_c] -= bias
+        events.append((ep_t, ep_c))
+    return events, niter
+
+##---MAIN
+
+if __name__ == '__main__':
+    pass
@@ -55,6 +55,7 @@ from .cluster import *
 from .linear_filter import *
 from .filter_bank import *
 from .prewhiten import *
+from .probe_sorting import *
 from .smoothing import *
 from .spike_detection import *
 from .spike_sorting import *
@@ -55,10 +55,42 @@ __all__ = ['FilterBankError', 'FilterBankNode']
 ##---IMPORTS
 
 import logging
+import sys
 import scipy as sp
 from .base_nodes import Node
 from .linear_filter import FilterNode, REMF
-from ..common import (TimeSeriesCovE, xi_vs_f, VERBOSE)
+from ..common import (TimeSeriesCovE, xi_vs_f, mcfilter_hist_bank,
+                      mcfilter_valid_bank, FilterWorkspace, LowRankFilterBank,
+                      PersistentPool, VERBOSE)
+
+##---FUNCTIONS
+
+def _worker_loop(tasks):
+    """thread target: process tasks from the queue until None is received
+
+    A task is a tuple (func, args, results, k), the outcome of func(*args)
+    is stored as results[k] = (success, return value or exc_info).
+    """
+
+    while True:
+        task = tasks.get()
+        try:
+            if task is None:
+                return
+            func, args, results, k = task
+            try:
+                results[k] = (True, func(*args))
+            except Exception:
+                results[k] = (False, sys.exc_info())
+        finally:
+            tasks.task_done()
+
+
+def _filter_block(data, mc_filt, fout, sl, num_threads):
+    """apply a block of filters, writing into its columns of the output"""
+
+    mcfilter_valid_bank(data, mc_filt[sl], num_threads=num_threads,
+                        out=fout[:, sl])
 
 ##---CLASSES
 
@@ -66,6 +98,52 @@ class FilterBankError(Exception):
     pass
 
 
+class _WorkerPool(PersistentPool):
+    """persistent pool of threads processing tasks from a queue
+
+    The threads only hold a reference to the queue, so the pool is collected
+    with its owner and the threads are stopped by `__del__`.
+    """
+
+    def __init__(self, size):
+        self._tasks = Queue()
+        self._threads = [Thread(target=_worker_loop, args=(self._tasks,))
+                         for _ in xrange(int(size))]
+        for t in self._threads:
+            t.daemon = True
+            t.start()
+        super(_WorkerPool, self).__init__()
+
+    def get_size(self):
+        return len(self._threads)
+
+    size = property(get_size, doc='number of threads')
+
+    def map(self, func, arg_list):
+        """apply func to all argument tuples and wait for the results
+
+        :returns: list - the return values, in the order of `arg_list`
+        """
+
+        results = [None] * len(arg_list)
+        for k, args in enumerate(arg_list):
+            self._tasks.put((func, args, results, k))
+        self._tasks.join()
+        for success, value in results:
+            if success is False:
+                raise value[0], value[1], value[2]
+        return [value for _, value in results]
+
+    def close(self):
+        """stop the threads"""
+
+        for _ in self._threads:
+            self._tasks.put(None)
+        for t in self._threads:
+            t.join()
+        self._threads = []
+
+
 class FilterBankNode(Node):
     """abstract class that handles filter instances and their outputs
 
@@ -75,6 +153,12 @@ class FilterBankNode(Node):
     There are two different index sets. One is abbreviated "idx" and one "key". The "idx" the index
     of filter in `self.bank` and thus a unique, hashable identifier. Where as the "key" an index in a
     subset of idx. Ex.: the index for list(self._idx_active_set) would be a "key".
+
+    Templates and filters are mirrored in contiguous arrays [capacity, tf, nc], the row of a filter
+    is its idx. Rows are refreshed when the version of a template or filter changed. The active
+    filters are tracked by a mask and the ordered array of active idx, so the key order is stable
+    (ascending idx) and key to idx lookups are O(1). The stacked template and filter sets are
+    cached until the bank changes, the returned arrays must not be modified in place.
     """
 
     ## constructor
@@ -101,6 +185,28 @@ class FilterBankNode(Node):
         :keyword rb_cap: capacity of the ringbuffer that stored observations
             for the filters to calculate the mean template.
             Default=350
+        :type num_threads: int
+        :keyword num_threads: number of threads used to apply the filter
+            bank, if None or < 1 all cpus are used.
+            Default=1
+        :type workers: int
+        :keyword workers: if > 1, the filters are split into this many blocks
+            that are applied by a persistent pool of threads, each block
+            writing into its columns of the output. The compiled and BLAS
+            kernels release the GIL, so the blocks run in parallel.
+            `num_threads` applies per block.
+            Default=1
+        :type rank: int
+        :keyword rank: if not None, the filter bank is applied as a low-rank
+            spatio-temporal approximation with at most this many components
+            per filter, see `LowRankFilterBank`.
+            Default=None
+        :type rank_tol: float
+        :keyword rank_tol: if not None, the filter bank is applied as a
+            low-rank spatio-temporal approximation with the least number of
+            components per filter, such that the relative reconstruction error
+            does not exceed this budget, see `LowRankFilterBank`.
+            Default=None
         :type tf: int
         :keyword tf: temporal extend of the filters in the filter bank in
             samples.
@@ -108,6 +214,11 @@ class FilterBankNode(Node):
         :type verbose: int
         :keyword verbose: verbosity level, 0:none, >1: print .. ref `VERBOSE`
             Default=0
+        :type xcorr_check: bool
+        :keyword xcorr_check: if True, the incrementally maintained cross
+            correlation tensor is compared against a full rebuild on every
+            update, a `FilterBankError` is raised if they differ.
+            Default=False
         """
 
         # kwargs
@@ -115,8 +226,13 @@ class FilterBankNode(Node):
         chan_set = kwargs.pop('chan_set', None)
         filter_cls = kwargs.pop('filter_cls', REMF)
         rb_cap = kwargs.pop('rb_cap', 350)
+        num_threads = kwargs.pop('num_threads', 1)
+        rank = kwargs.pop('rank', None)
+        rank_tol = kwargs.pop('rank_tol', None)
         tf = kwargs.pop('tf', 47)
         verbose = kwargs.pop('verbose', 0)
+        workers = kwargs.pop('workers', 1)
+        xcorr_check = kwargs.pop('xcorr_check', False)
         # everything not popped goes to mdp.Node.__init__ via super
 
         # checks
@@ -135,12 +251,29 @@ class FilterBankNode(Node):
         self._nc = None
         self._chan_set = None
         self._xcorrs = None
+        self._xcorrs_idx = []
+        self._xcorrs_stamps = {}
+        self._n_xcorrs = 0
+        self._n_xcorrs_skipped = 0
+        self._hist = None
         self._ce = None
         self._filter_cls = filter_cls
         self._rb_cap = int(rb_cap)
-        self._idx_active_set = set()
+        self.num_threads = num_threads
+        self.workers = int(workers or 1)
+        self._pool = None
+        self._lowrank = None
+        if rank is not None or rank_tol is not None:
+            self._lowrank = LowRankFilterBank(rank=rank, tol=rank_tol)
+        self._idx_active = sp.zeros(0, dtype=sp.intp)
+        self._active_mask = sp.zeros(0, dtype=bool)
+        self._xi_store = None
+        self._f_store = None
+        self._store_stamps = []
+        self._stacks = {}
         self.bank = {}
         self.verbose = VERBOSE(verbose)
+        self.xcorr_check = bool(xcorr_check)
 
         # set members
         self.cs = chan_set
@@ -160,29 +293,25 @@ class FilterBankNode(Node):
 
     def get_nf(self, active=True):
         if active:
-            return len(self._idx_active_set)
+            return len(self._idx_active)
         else:
             return len(self.bank)
 
     nf = property(get_nf, doc='number of filters')
 
+    def get_idx_active_set(self):
+        return self._idx_active.tolist()
+
+    _idx_active_set = property(get_idx_active_set,
+                               doc='idx of the active filters in key order')
+
     def get_template_set(self, active=True, mc=True):
-        key_set = self._idx_active_set if active else set(self.bank.keys())
-        if not key_set:
-            shape = (0, self._tf, self._nc) if mc else (0, self._tf * self._nc)
-            return sp.zeros(shape, dtype=self.dtype)
-        f_list = self._get_idx_set(key_set)
-        return sp.asarray([f.xi if mc else f.xi_conc for f in f_list])
+        return self._get_stack('xi', active, mc)
 
     template_set = property(get_template_set, doc='template set of active filters')
 
     def get_filter_set(self, active=True, mc=True):
-        key_set = self._idx_active_set if active else set(self.bank.keys())
-        if not key_set:
-            shape = (0, self._tf, self._nc) if mc else (0, self._tf * self._nc)
-            return sp.zeros(shape, dtype=self.dtype)
-        f_list = self._get_idx_set(key_set)
-        return sp.asarray([f.f if mc else f.f_conc for f in f_list])
+        return self._get_stack('f', active, mc)
 
     filter_set = property(get_filter_set, doc='filter set of active filters')
 
@@ -191,17 +320,110 @@ class FilterBankNode(Node):
 
     xcorrs = property(get_xcorrs, doc='cross correlation tensor for active filters')
 
+    def get_calc_stats(self):
+        rval = {'performed': 0, 'skipped': 0,
+                'xcorrs_performed': self._n_xcorrs,
+                'xcorrs_skipped': self._n_xcorrs_skipped}
+        for filt in self.bank.values():
+            for k, v in filt.calc_stats.items():
+                rval[k] += v
+        return rval
+
+    calc_stats = property(get_calc_stats,
+                          doc='count of performed and skipped filter and '
+                              'xcorr tensor calculations')
+
+    def get_lowrank(self):
+        return self._lowrank
+
+    lowrank = property(get_lowrank, doc='low-rank approximation of the filter '
+                                        'set, None if not used')
+
+    def get_lowrank_error(self):
+        if self._lowrank is None:
+            return None
+        self._update_lowrank()
+        return self._lowrank.error
+
+    lowrank_error = property(get_lowrank_error,
+                             doc='relative approximation error per active '
+                                 'filter, None if not used')
+
     def get_xcorrs_at(self, idx0, idx1=None, shift=0):
         if self._xcorrs is None:
             return None
         return self._xcorrs[idx0, idx1 or idx0, self._tf - 1 + shift]
 
     def get_idx_for(self, key):
-        return list(self._idx_active_set)[key]
+        return int(self._idx_active[key])
 
     def _get_idx_set(self, key_set):
         return [self.bank[k] for k in key_set]
 
+    def _get_stack(self, name, active, mc):
+        """cached stack of the templates ('xi') or filters ('f')"""
+
+        self._sync_store()
+        key = (name, active, mc)
+        if key not in self._stacks:
+            idx = self._idx_active if active else sp.arange(len(self.bank))
+            store = self._xi_store if name == 'xi' else self._f_store
+            if len(idx) == 0 or store is None:
+                shape = (0, self._tf, self._nc) if mc else \
+                    (0, self._tf * self._nc)
+                rval = sp.zeros(shape, dtype=self.dtype)
+            else:
+                rval = store[idx]
+                if mc is False:
+                    rval = rval.swapaxes(1, 2).reshape(len(idx), -1)
+            self._stacks[key] = rval
+        return self._stacks[key]
+
+    def _sync_store(self):
+        """copy templates and filters that changed into the stores"""
+
+        changed = False
+        for idx in xrange(len(self._store_stamps), len(self.bank)):
+            self._store_stamps.append(None)
+        for idx in xrange(len(self.bank)):
+            filt = self.bank[idx]
+            stamp = (filt.xi_version, filt.f_version)
+            if stamp == self._store_stamps[idx]:
+                continue
+            self._xi_store = self._store_row(self._xi_store, idx, filt.xi)
+            if filt.f is not None:
+                self._f_store = self._store_row(self._f_store, idx, filt.f)
+            self._store_stamps[idx] = stamp
+            changed = True
+        if changed is True:
+            self._stacks = {}
+
+    def _store_row(self, store, idx, value):
+        """write one row of a store, allocating or growing it as needed"""
+
+        if store is None:
+            store = sp.zeros((len(self._active_mask),) + value.shape,
+                             dtype=value.dtype)
+        elif len(store) < len(self._active_mask):
+            grown = sp.zeros((len(self._active_mask),) + store.shape[1:],
+                             dtype=store.dtype)
+            grown[:len(store)] = store
+            store = grown
+        store[idx] = value
+        return store
+
+    def _set_active(self, idx, active):
+        """update the active mask and the ordered active idx"""
+
+        if idx >= len(self._active_mask):
+            mask = sp.zeros(max(2 * len(self._active_mask), idx + 1, 8),
+                            dtype=bool)
+            mask[:len(self._active_mask)] = self._active_mask
+            self._active_mask = mask
+        self._active_mask[idx] = active
+        self._idx_active = sp.flatnonzero(self._active_mask)
+        self._stacks = {}
+
     ## properties public
 
     def get_chan_set(self):
@@ -210,6 +432,7 @@ class FilterBankNode(Node):
     def set_chan_set(self, value):
         self._chan_set = tuple(sorted(value))
         self._nc = len(self._chan_set)
+        self._hist = None
 
     cs = property(get_chan_set, set_chan_set)
 
@@ -237,6 +460,8 @@ class FilterBankNode(Node):
     def reset_history(self):
         """sets the history to all zeros for all filters"""
 
+        if self._hist is not None:
+            self._hist.reset()
         for filt in self.bank.values():
             filt.reset_history()
 
@@ -274,7 +499,7 @@ class FilterBankNode(Node):
         if len(self.bank):
             idx = max(self.bank.keys()) + 1
         self.bank[idx] = new_f
-        self._idx_active_set.add(idx)
+        self._set_active(idx, True)
 
         # return and check internals
         rval = True
@@ -294,7 +519,7 @@ class FilterBankNode(Node):
 
         if idx in self.bank:
             self.bank[idx].active = False
-            self._idx_active_set.discard(idx)
+            self._set_active(idx, False)
             if check is True:
                 self._check_internals()
         else:
@@ -312,7 +537,7 @@ class FilterBankNode(Node):
 
         if idx in self.bank:
             self.bank[idx].active = True
-            self._idx_active_set.add(idx)
+            self._set_active(idx, True)
             if check is True:
                 self._check_internals()
         else:
@@ -331,11 +556,65 @@ class FilterBankNode(Node):
         for i in self._idx_active_set:
             self.bank[i].calc_filter()
 
-        # build cross-correlation tensor
-        self._xcorrs = xi_vs_f(
-            self.get_template_set(mc=False),
-            self.get_filter_set(mc=False),
-            nc=self._nc)
+        # update cross-correlation tensor
+        self._update_xcorrs()
+
+    def _update_xcorrs(self):
+        """update the cross-correlation tensor for the active filters
+
+        Only the rows and columns of filters whose template or filter changed
+        since the last update (or that have been activated) are computed, the
+        remaining entries are taken from the current tensor. Slices of
+        deactivated filters are dropped. Changes are detected by the version
+        counters of the templates and filters.
+        """
+
+        # inits
+        idx_list = list(self._idx_active_set)
+        stamps = dict((idx, (self.bank[idx].xi_version,
+                             self.bank[idx].f_version)) for idx in idx_list)
+        pos_old = dict((idx, p) for p, idx in enumerate(self._xcorrs_idx))
+        keep, changed = [], []
+        for p, idx in enumerate(idx_list):
+            if idx in pos_old and self._xcorrs_stamps.get(idx) == stamps[idx]:
+                keep.append(p)
+            else:
+                changed.append(p)
+        if not changed and idx_list == self._xcorrs_idx and \
+                self._xcorrs is not None and \
+                self.xcorr_check is False:
+            self._n_xcorrs_skipped += 1
+            return
+
+        # build tensor
+        xi = self.get_template_set(mc=False)
+        f = self.get_filter_set(mc=False)
+        n = len(idx_list)
+        rval = sp.zeros((n, n, 2 * self._tf - 1))
+        if keep:
+            src = [pos_old[idx_list[p]] for p in keep]
+            rval[sp.ix_(keep, keep)] = self._xcorrs[sp.ix_(src, src)]
+        if changed:
+            rval[changed] = xi_vs_f(xi[changed], f, nc=self._nc)
+            if keep:
+                rval[sp.ix_(keep, changed)] = xi_vs_f(xi[keep], f[changed],
+                                                      nc=self._nc)
+        self._n_xcorrs += 1
+        if self.verbose.has_print:
+            print '_update_xcorrs: %d of %d filters changed' % (
+                len(changed), n)
+
+        # consistency check
+        if self.xcorr_check is True:
+            full = xi_vs_f(xi, f, nc=self._nc)
+            if not sp.allclose(rval, full, rtol=1e-5, atol=1e-6):
+                raise FilterBankError(
+                    'incremental xcorr tensor differs from the full rebuild')
+
+        # set members
+        self._xcorrs = rval
+        self._xcorrs_idx = idx_list
+        self._xcorrs_stamps = stamps
 
     ## mpd.Node interface
 
@@ -346,13 +625,77 @@ class FilterBankNode(Node):
         return False
 
     def _execute(self, x):
-        if not self._idx_active_set:
-            return sp.zeros((x.shape[0], 0), dtype=self.dtype)
-        rval = sp.empty((x.shape[0], self.nf))
-        for k, i in enumerate(self._idx_active_set):
-            rval[:, k] = self.bank[i](x)
+        return self._filter(x)
+
+    def _filter(self, x, out=None):
+        """apply the filter bank to a chunk
+
+        :type x: ndarray
+        :param x: chunk of data [n, nc]
+        :type out: ndarray
+        :param out: if not None, the filter output is written to this array
+            [n, nf] and returned.
+            Default=None
+        :rtype: ndarray
+        :returns: filter output [n, nf]
+        """
+
+        # DOC: all filters are applied in one pass and share the history
+        if self._hist is None:
+            self._hist = FilterWorkspace(self._tf, self._nc,
+                                         chan_set=self._chan_set,
+                                         dtype=self.dtype)
+        if self._lowrank is not None:
+            self._update_lowrank()
+            rval, self._hist = self._lowrank.mcfilter_hist(x, self._hist,
+                                                           out=out)
+        elif self.workers > 1 and self.nf > 1:
+            rval = self._execute_workers(x, out=out)
+        else:
+            rval, self._hist = mcfilter_hist_bank(
+                x, self.get_filter_set(), self._hist,
+                num_threads=self.num_threads, out=out)
         return rval
 
+    def _execute_workers(self, x, out=None):
+        """apply the filter bank in blocks of filters on the thread pool"""
+
+        # DOC: the chunk is loaded once, all blocks read the same buffer
+        filt = self.get_filter_set()
+        nf = filt.shape[0]
+        n_blocks = min(self.workers, nf)
+        if self._pool is None or self._pool.size != n_blocks:
+            if self._pool is not None:
+                self._pool.close()
+            self._pool = _WorkerPool(n_blocks)
+        data = self._hist.load(x)
+        rval = out
+        if rval is None or rval.dtype != data.dtype:
+            rval = sp.empty((x.shape[0], nf), dtype=data.dtype)
+        bounds = [nf * k // n_blocks for k in xrange(n_blocks + 1)]
+        try:
+            self._pool.map(_filter_block, [
+                (data, filt, rval, slice(bounds[k], bounds[k + 1]),
+                 self.num_threads) for k in xrange(n_blocks)])
+        finally:
+            self._hist.advance()
+        if out is not None and out is not rval:
+            out[:] = rval
+            rval = out
+        return rval
+
+    def _update_lowrank(self):
+        """refactorise the low-rank approximation if the filters changed"""
+
+        if self._lowrank.update(self.get_filter_set()):
+            if self.verbose.has_print:
+                dense, lowrank = self._lowrank.flops
+                print 'low rank filter bank: ranks %s, error %s, ' \
+                      'MACs/sample %d -> %d' % (
+                    self._lowrank.ranks.tolist(),
+                    sp.around(self._lowrank.error, 4).tolist(),
+                    dense, lowrank)
+
     ## plotting methods
 
     def plot_xvft(self, ph=None, show=False):
@@ -463,6 +806,12 @@ class FilterBankNode(Node):
 
     __len__ = get_nf
 
+    def __getstate__(self):
+        # DOC: the thread pool is not picklable, it is restarted on demand
+        state = self.__dict__.copy()
+        state['_pool'] = None
+        return state
+
 ##---MAIN
 
 if __name__ == '__main__':
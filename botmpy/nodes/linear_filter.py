@@ -52,7 +52,7 @@ __all__ = ['FilterError', 'FilterNode', 'MatchedFilterNode',
 import scipy as sp
 from .base_nodes import Node
 from ..common import (mcfilter_hist, mcvec_from_conc, mcvec_to_conc,
-                      TimeSeriesCovE, MxRingBuffer, snr_maha)
+                      TimeSeriesCovE, MxRingBuffer, FilterWorkspace, snr_maha)
 from collections import deque
 
 ##---CLASSES
@@ -70,6 +70,10 @@ class FilterNode(Node):
     classmethod. The template will be averaged from a ringbuffer of
     observations. The covariance matrix is supplied from an external
     covariance estimator.
+
+    The filter is only recalculated if the template buffer or the covariance
+    estimator changed since the last calculation, as tracked by their version
+    counters.
     """
 
     ## constructor
@@ -110,8 +114,12 @@ class FilterNode(Node):
                                     dtype=self.dtype)
         self._ce = None
         self._f = None
-        self._hist = sp.zeros((tf - 1, nc), dtype=self.dtype)
+        self._f_state = None
+        self._n_calc = 0
+        self._n_calc_skipped = 0
         self._chan_set = tuple(sorted(chan_set))
+        self._hist = FilterWorkspace(tf, nc, chan_set=self._chan_set,
+                                     dtype=self.dtype)
         self.ce = ce
         self.active = True
 
@@ -127,6 +135,12 @@ class FilterNode(Node):
 
     xi_conc = property(get_xi_conc, doc='template (concatenated)')
 
+    def get_xi_version(self):
+        return self._xi_buf.version
+
+    xi_version = property(get_xi_version,
+                          doc='template version, incremented on buffer change')
+
     def get_tf(self):
         return self._xi_buf.dimension[0]
 
@@ -147,6 +161,19 @@ class FilterNode(Node):
 
     f_conc = property(get_f_conc, doc='filter (concatenated)')
 
+    def get_f_version(self):
+        return self._n_calc
+
+    f_version = property(get_f_version,
+                         doc='filter version, incremented on recalculation')
+
+    def get_calc_stats(self):
+        return {'performed': self._n_calc, 'skipped': self._n_calc_skipped}
+
+    calc_stats = property(get_calc_stats,
+                          doc='count of performed and skipped filter '
+                              'calculations')
+
     ## properties public
 
     def get_ce(self):
@@ -179,9 +206,14 @@ class FilterNode(Node):
     def _execute(self, x):
         """apply the filter to data"""
 
-        # DOC: ascontiguousarray is here for ctypes/cython purposes
-        x_in = sp.ascontiguousarray(x, dtype=self.dtype)[:, self._chan_set]
-        rval, self._hist = mcfilter_hist(x_in, self._f, self._hist)
+        # DOC: the selected channels are copied once, straight into the
+        # workspace region, and filtered there
+        if self._chan_set[-1] >= x.shape[1]:
+            raise ValueError('data has %d channels, chan_set needs %d' %
+                             (x.shape[1], self._chan_set[-1] + 1))
+        chunk = self._hist.reserve(x.shape[0], dtype=x.dtype)
+        sp.take(x, self._chan_set, axis=1, out=chunk, mode='clip')
+        rval, self._hist = mcfilter_hist(chunk, self._f, self._hist)
         return rval
 
     def is_invertible(self):
@@ -238,7 +270,7 @@ class FilterNode(Node):
     def reset_history(self):
         """sets the history to all zeros"""
 
-        self._hist[:] = 0.0
+        self._hist.reset()
 
     ## plotting methods
 
@@ -277,10 +309,28 @@ class FilterNode(Node):
 
     ## filter calculation
 
-    def calc_filter(self):
-        """initiate a calculation of the filter"""
+    def calc_filter(self, force=False):
+        """initiate a calculation of the filter
+
+        The calculation is skipped if neither the template buffer nor the
+        covariance estimator changed since the last calculation.
+
+        :type force: bool
+        :param force: if True, calculate the filter in any case
+            Default=False
+        :rtype: bool
+        :returns: True if the filter has been calculated
+        """
 
+        # DOC: the estimator itself is part of the state (compared by identity)
+        state = (self._xi_buf.version, self._ce, self._ce.version)
+        if force is False and self._f is not None and state == self._f_state:
+            self._n_calc_skipped += 1
+            return False
         self._f = self.filter_calculation(self.xi, self._ce, self._chan_set)
+        self._f_state = state
+        self._n_calc += 1
+        return True
 
     @classmethod
     def filter_calculation(cls, xi, ce, cs, *args, **kwargs):
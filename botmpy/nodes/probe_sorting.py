@@ -0,0 +1,557 @@
+# -*- coding: utf-8 -*-
+#_____________________________________________________________________________
+#
+# Copyright (c) 2012 Berlin Institute of Technology
+# All rights reserved.
+#
+# Developed by:	Philipp Meier <pmeier82@gmail.com>
+#               Neural Information Processing Group (NI)
+#               School for Electrical Engineering and Computer Science
+#               Berlin Institute of Technology
+#               MAR 5-6, Marchstr. 23, 10587 Berlin, Germany
+#               http://www.ni.tu-berlin.de/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal with the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimers.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimers in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the names of Neural Information Processing Group (NI), Berlin
+#   Institute of Technology, nor the names of its contributors may be used to
+#   endorse or promote products derived from this Software without specific
+#   prior written permission.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# CONTRIBUTORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# WITH THE SOFTWARE.
+#_____________________________________________________________________________
+#
+# Acknowledgements:
+#   Philipp Meier <pmeier82@gmail.com>
+#_____________________________________________________________________________
+#
+"""spike sorting for high-density probes in local channel neighbourhoods
+
+The probe is covered by overlapping neighbourhoods of adjacent channels. Each
+neighbourhood is sorted by its own filter bank sorting node, with a local
+covariance estimator that only spans the neighbourhood channels. Units are
+owned by the neighbourhood centred on their peak channel, duplicate events of
+similar units from different neighbourhoods are resolved when the results
+are merged.
+"""
+__docformat__ = 'restructuredtext'
+__all__ = ['ProbeSortingNode', 'neighbourhoods_from_geometry']
+
+##---IMPORTS
+
+import multiprocessing
+import traceback
+import scipy as sp
+from .base_nodes import Node
+from .spike_sorting import BOTMNode, TRANSIENT_MEMBERS
+from ..common import TimeSeriesCovE, PersistentPool, VERBOSE
+
+##---FUNCTIONS
+
+def neighbourhoods_from_geometry(geometry, radius):
+    """build the channel adjacency map from the channel positions
+
+    :type geometry: ndarray
+    :param geometry: channel positions [channels, dimensions]
+    :type radius: float
+    :param radius: channels within this distance are neighbours
+    :rtype: dict
+    :returns: dict - maps each channel to the sorted tuple of the channels in
+        its neighbourhood, including the channel itself
+    """
+
+    geometry = sp.asarray(geometry, dtype=sp.float64)
+    if geometry.ndim == 1:
+        geometry = geometry[:, sp.newaxis]
+    dist = sp.sqrt(
+        ((geometry[:, sp.newaxis] - geometry[sp.newaxis]) ** 2).sum(axis=2))
+    return dict((c, tuple(sp.flatnonzero(dist[c] <= radius).tolist()))
+                for c in xrange(geometry.shape[0]))
+
+
+def _neighbourhood_result(sorter):
+    """spike trains and templates of the units found by a sorter
+
+    :returns: tuple - (dict of spike trains, dict of templates) by filter idx
+    """
+
+    return (dict(sorter.rval),
+            dict((i, sorter.bank[i].xi) for i in sorter.rval))
+
+
+def _sorter_loop(conn, sorters):
+    """worker process: keep a set of neighbourhood sorters resident
+
+    A message is a tuple (cmd, arg). For 'sort' arg maps centre channels to
+    their data slices and the results of the sorters are sent back, for
+    'fetch' the sorters are sent back without their chunk related members.
+    None stops the loop. Replies are (success, value or formatted traceback).
+    """
+
+    while True:
+        try:
+            msg = conn.recv()
+        except EOFError:
+            return
+        if msg is None:
+            return
+        cmd, arg = msg
+        try:
+            if cmd == 'sort':
+                rval = {}
+                for c in sorted(arg):
+                    sorters[c](arg[c])
+                    rval[c] = _neighbourhood_result(sorters[c])
+            else:
+                rval = {}
+                for c, sorter in sorters.items():
+                    for name in TRANSIENT_MEMBERS:
+                        if hasattr(sorter, name):
+                            setattr(sorter, name, None)
+                    rval[c] = sorter
+            conn.send((True, rval))
+        except Exception:
+            conn.send((False, traceback.format_exc()))
+
+##---CLASSES
+
+class _SorterPool(PersistentPool):
+    """persistent pool of processes holding the neighbourhood sorters
+
+    The sorters are distributed over the processes once, when the pool is
+    started. Afterwards only the data slices are sent to the processes and
+    only the spike trains and templates of the found units are sent back.
+    """
+
+    def __init__(self, sorters, size):
+        centres = sorted(sorters)
+        size = max(1, min(int(size), len(centres)))
+        self._owner = {}
+        self._conns = []
+        self._procs = []
+        for k in xrange(size):
+            group = centres[k::size]
+            conn, child = multiprocessing.Pipe()
+            proc = multiprocessing.Process(
+                target=_sorter_loop,
+                args=(child, dict((c, sorters[c]) for c in group)))
+            proc.daemon = True
+            proc.start()
+            child.close()
+            self._conns.append(conn)
+            self._procs.append(proc)
+            for c in group:
+                self._owner[c] = k
+        super(_SorterPool, self).__init__()
+
+    def get_size(self):
+        return len(self._procs)
+
+    size = property(get_size, doc='number of processes')
+
+    def _call(self, cmd, args):
+        """send one message to every process and collect the replies"""
+
+        for conn, arg in zip(self._conns, args):
+            conn.send((cmd, arg))
+        rval, errors = {}, []
+        for conn in self._conns:
+            success, value = conn.recv()
+            if success is True:
+                rval.update(value)
+            else:
+                errors.append(value)
+        if errors:
+            raise RuntimeError('neighbourhood sorter failed in worker '
+                               'process:\n%s' % errors[0])
+        return rval
+
+    def sort(self, slices):
+        """sort the data slices with the resident sorters
+
+        :type slices: dict
+        :param slices: data slice by centre channel
+        :rtype: dict
+        :returns: dict - (spike trains, templates) by centre channel
+        """
+
+        args = [{} for _ in self._conns]
+        for c, data in slices.items():
+            args[self._owner[c]][c] = data
+        return self._call('sort', args)
+
+    def fetch(self):
+        """copies of the resident sorters by centre channel"""
+
+        return self._call('fetch', [None] * len(self._conns))
+
+    def close(self):
+        """stop the processes"""
+
+        for conn in self._conns:
+            try:
+                conn.send(None)
+            except (IOError, EOFError):
+                pass
+        for proc in self._procs:
+            proc.join()
+        for conn in self._conns:
+            conn.close()
+        self._conns = []
+        self._procs = []
+
+
+class ProbeSortingNode(Node):
+    """spike sorting on local channel neighbourhoods of a high-density probe
+
+    For every neighbourhood a filter bank sorting node (`sorter_cls`) is set
+    up on the neighbourhood channels only, so covariance matrices and filters
+    are of size (tf*k)^2 for neighbourhoods of k channels instead of
+    (tf*nc)^2 for the whole probe. Neighbourhoods are sorted independently,
+    optionally in a persistent pool of worker processes. The sorters are
+    resident in the workers, per chunk only the data slices and the found
+    spike trains are exchanged.
+
+    Units get global ids. Templates passed at construction keep their index
+    as id, units learned by adaptive sorters get the next free id. A unit is
+    only reported by the neighbourhood centred on its peak channel (if that
+    channel is the centre of a neighbourhood). Events of two units from
+    different neighbourhoods, whose templates are similar on the shared
+    channels, are duplicates if they are closer than `dup_window` samples,
+    the event of the unit with the larger amplitude is kept.
+    """
+
+    ## constructor
+
+    def __init__(self, **kwargs):
+        """
+        :type adjacency: dict
+        :keyword adjacency: channel adjacency map, mapping the centre channel
+            of each neighbourhood to the channels of the neighbourhood. The
+            centre is always included. Either `adjacency` or `geometry` is
+            required.
+        :type geometry: ndarray
+        :keyword geometry: channel positions [channels, dimensions], the
+            neighbourhoods are build with `neighbourhoods_from_geometry`.
+        :type radius: float
+        :keyword radius: neighbourhood radius, required with `geometry`.
+        :type templates: ndarray
+        :keyword templates: templates for the whole probe [ntemps][tf][nc].
+            Each template is assigned to the neighbourhood centred on its
+            peak channel, or else to the neighbourhood holding most of its
+            energy. If None, a sorter is set up for every neighbourhood,
+            which is only useful for adaptive sorters.
+            Default=None
+        :type tf: int
+        :keyword tf: temporal extend of the templates, required if no
+            templates are given.
+        :type noise: ndarray
+        :keyword noise: noise data [samples, channels] to initialise the
+            local covariance estimators. If None, these are initialised as
+            white noise.
+            Default=None
+        :type sorter_cls: FilterBankSortingNode
+        :keyword sorter_cls: sorting node class used for the neighbourhoods.
+            Default=BOTMNode
+        :type sorter_kwargs: dict
+        :keyword sorter_kwargs: keywords passed to each neighbourhood sorter.
+            Default={}
+        :type n_workers: int
+        :keyword n_workers: number of worker processes to sort the
+            neighbourhoods in, if < 2 sort in this process. The processes
+            are started with the first chunk and kept for the next ones.
+            Default=1
+        :type dup_window: int
+        :keyword dup_window: events closer than this many samples can be
+            duplicates. If None, use tf/2.
+            Default=None
+        :type dup_similarity: float
+        :keyword dup_similarity: min normalised cross-correlation of two
+            templates on the shared channels, for their units to be
+            considered duplicates.
+            Default=0.9
+        :type verbose: int
+        :keyword verbose: verbosity level, 0:none, >1: print .. ref `VERBOSE`
+            Default=0
+        """
+
+        # kwargs
+        adjacency = kwargs.pop('adjacency', None)
+        geometry = kwargs.pop('geometry', None)
+        radius = kwargs.pop('radius', None)
+        templates = kwargs.pop('templates', None)
+        tf = kwargs.pop('tf', None)
+        noise = kwargs.pop('noise', None)
+        sorter_cls = kwargs.pop('sorter_cls', BOTMNode)
+        sorter_kwargs = kwargs.pop('sorter_kwargs', {})
+        n_workers = kwargs.pop('n_workers', 1)
+        dup_window = kwargs.pop('dup_window', None)
+        dup_similarity = kwargs.pop('dup_similarity', 0.9)
+        verbose = kwargs.pop('verbose', 0)
+        # everything not popped goes to mdp.Node.__init__ via super
+
+        # checks
+        if adjacency is None:
+            if geometry is None or radius is None:
+                raise ValueError('\'adjacency\' or \'geometry\' and '
+                                 '\'radius\' are required!')
+            adjacency = neighbourhoods_from_geometry(geometry, radius)
+        if templates is not None:
+            templates = sp.asarray(templates)
+            if templates.ndim != 3:
+                raise ValueError('templates have to be provided in a tensor '
+                                 'of shape [ntemps][tf][nc]!')
+            tf = templates.shape[1]
+        if tf is None:
+            raise ValueError('\'templates\' or \'tf\' are required!')
+
+        # super
+        super(ProbeSortingNode, self).__init__(**kwargs)
+
+        # members
+        self._nbh = dict((int(c), tuple(sorted(set(chans) | set([c]))))
+                         for c, chans in adjacency.items())
+        self._nc = max(max(chans) for chans in self._nbh.values()) + 1
+        if geometry is not None:
+            self._nc = max(self._nc, len(geometry))
+        self._tf = int(tf)
+        self._sorters = {}
+        self._pool = None
+        self._units = {}
+        self._unit_map = {}
+        self._n_dup = 0
+        self.n_workers = int(n_workers or 1)
+        self.dup_window = int(dup_window or self._tf / 2)
+        self.dup_similarity = float(dup_similarity)
+        self.verbose = VERBOSE(verbose)
+        self.rval = {}
+
+        # build neighbourhood sorters
+        if templates is not None:
+            if templates.shape[2] != self._nc:
+                raise ValueError('templates have %d channels, the probe has '
+                                 '%d!' % (templates.shape[2], self._nc))
+            assign = {}
+            for k in xrange(templates.shape[0]):
+                assign.setdefault(self._home(templates[k]), []).append(k)
+        else:
+            assign = dict((c, None) for c in self._nbh)
+        for c in sorted(assign):
+            chans = list(self._nbh[c])
+            temps = None
+            if assign[c] is not None:
+                temps = templates[assign[c]][:, :, chans]
+                for i, k in enumerate(assign[c]):
+                    self._unit_map[c, i] = k
+                    self._units[k] = (c, i)
+            self._sorters[c] = sorter_cls(
+                tf=self._tf,
+                templates=temps,
+                ce=self._local_ce(chans, noise),
+                dtype=self.dtype,
+                **sorter_kwargs)
+        if self.verbose.has_print:
+            print 'ProbeSortingNode: %d channels, %d neighbourhoods sorted' % (
+                self._nc, len(self._sorters))
+
+    ## properties
+
+    def get_nc(self):
+        return self._nc
+
+    nc = property(get_nc, doc='number of channels of the probe')
+
+    def get_neighbourhoods(self):
+        return dict(self._nbh)
+
+    neighbourhoods = property(get_neighbourhoods,
+                              doc='channel neighbourhoods by centre channel')
+
+    def get_sorters(self):
+        self._sync()
+        return dict(self._sorters)
+
+    sorters = property(get_sorters, doc='neighbourhood sorters by centre '
+                                        'channel, copies of the resident '
+                                        'sorters while worker processes run')
+
+    def get_units(self):
+        return dict(self._units)
+
+    units = property(get_units, doc='(centre channel, filter idx) by unit id')
+
+    def get_n_duplicates(self):
+        return self._n_dup
+
+    n_duplicates = property(get_n_duplicates,
+                            doc='duplicate events dropped in the last merge')
+
+    ## internal
+
+    def _home(self, xi):
+        """centre of the neighbourhood a template is assigned to"""
+
+        amp = xi.max(axis=0) - xi.min(axis=0)
+        peak = int(amp.argmax())
+        if peak in self._nbh:
+            return peak
+        energy = (xi * xi).sum(axis=0)
+        return max(sorted(self._nbh),
+                   key=lambda c: energy[list(self._nbh[c])].sum())
+
+    def _local_ce(self, chans, noise):
+        """covariance estimator for the channels of one neighbourhood"""
+
+        if noise is None:
+            return TimeSeriesCovE.white_noise_init(self._tf, len(chans),
+                                                   dtype=self.dtype)
+        ce = TimeSeriesCovE(tf_max=self._tf, nc=len(chans))
+        ce.update(sp.asarray(noise)[:, chans])
+        return ce
+
+    def _sync(self):
+        """fetch the state of the sorters resident in the worker processes"""
+
+        if self._pool is not None:
+            self._sorters.update(self._pool.fetch())
+
+    def _unit_id(self, c, i):
+        """global id of the i-th filter of the neighbourhood sorter at c"""
+
+        if (c, i) not in self._unit_map:
+            gid = max(self._units) + 1 if self._units else 0
+            self._unit_map[c, i] = gid
+            self._units[gid] = (c, i)
+        return self._unit_map[c, i]
+
+    def _similarity(self, cu, xu, cv, xv):
+        """normalised cross-correlation of two templates on shared channels"""
+
+        shared = sorted(set(self._nbh[cu]) & set(self._nbh[cv]))
+        if not shared:
+            return 0.0
+        a = xu[:, [self._nbh[cu].index(s) for s in shared]]
+        b = xv[:, [self._nbh[cv].index(s) for s in shared]]
+        cc = sum(sp.correlate(a[:, k], b[:, k], 'full')
+                 for k in xrange(len(shared)))
+        norm = sp.sqrt((xu * xu).sum() * (xv * xv).sum())
+        if norm == 0.0:
+            return 0.0
+        return cc.max() / norm
+
+    ## mdp.Node interface
+
+    def is_invertible(self):
+        return False
+
+    def is_trainable(self):
+        return False
+
+    def _execute(self, x):
+        # checks
+        if x.shape[1] != self._nc:
+            raise ValueError('data has %d channels, the probe has %d!' % (
+                x.shape[1], self._nc))
+
+        # sort neighbourhoods
+        n_workers = min(self.n_workers, len(self._sorters))
+        if n_workers > 1:
+            if self._pool is None or self._pool.size != n_workers:
+                self._sync()
+                if self._pool is not None:
+                    self._pool.close()
+                self._pool = _SorterPool(self._sorters, n_workers)
+            results = self._pool.sort(dict(
+                (c, sp.ascontiguousarray(x[:, list(self._nbh[c])]))
+                for c in self._sorters))
+        else:
+            self._sync()
+            if self._pool is not None:
+                self._pool.close()
+                self._pool = None
+            results = {}
+            for c in sorted(self._sorters):
+                self._sorters[c](x[:, list(self._nbh[c])])
+                results[c] = _neighbourhood_result(self._sorters[c])
+
+        # merge
+        self._merge(results)
+        return x
+
+    def _merge(self, results):
+        """collect the results of the neighbourhoods and drop duplicates
+
+        :type results: dict
+        :param results: (spike trains, templates) by centre channel
+        """
+
+        # collect owned units
+        self.rval = {}
+        info = {}
+        for c in sorted(results):
+            rval, temps = results[c]
+            for i in sorted(rval):
+                xi = temps[i]
+                amp = xi.max(axis=0) - xi.min(axis=0)
+                peak = self._nbh[c][int(amp.argmax())]
+                if peak != c and peak in self._nbh:
+                    continue
+                gid = self._unit_id(c, i)
+                info[gid] = (c, xi, amp.max())
+                self.rval[gid] = sp.sort(sp.asarray(rval[i]))
+
+        # resolve duplicates
+        self._n_dup = 0
+        gids = sorted(info)
+        for p, u in enumerate(gids):
+            for v in gids[p + 1:]:
+                cu, xu, au = info[u]
+                cv, xv, av = info[v]
+                if cu == cv or self.rval[u].size == 0 or \
+                        self.rval[v].size == 0:
+                    continue
+                if self._similarity(cu, xu, cv, xv) < self.dup_similarity:
+                    continue
+                keep, drop = (u, v) if au >= av else (v, u)
+                ref, ev = self.rval[keep], self.rval[drop]
+                pos = sp.searchsorted(ref, ev)
+                dist = sp.minimum(
+                    sp.absolute(ev - ref[sp.clip(pos - 1, 0, ref.size - 1)]),
+                    sp.absolute(ev - ref[sp.clip(pos, 0, ref.size - 1)]))
+                dup = dist <= self.dup_window
+                self._n_dup += int(dup.sum())
+                self.rval[drop] = ev[~dup]
+        if self.verbose.has_print:
+            print 'ProbeSortingNode: %d units, %d duplicate events dropped' % (
+                len(self.rval), self._n_dup)
+
+    ## special methods
+
+    def __getstate__(self):
+        # DOC: the worker processes are not picklable, the sorters are
+        # fetched from them and the pool is restarted on demand
+        self._sync()
+        state = self.__dict__.copy()
+        state['_pool'] = None
+        return state
+
+##---MAIN
+
+if __name__ == '__main__':
+    pass
@@ -61,12 +61,12 @@ __all__ = ['FilterBankSortingNode', 'AdaptiveBayesOptimalTemplateMatchingNode',
 import collections
 import copy
 import logging
+import multiprocessing
 import sys
 
 import scipy as sp
 from scipy import linalg as sp_la
 
-from sklearn.mixture import log_multivariate_normal_density
 from sklearn.utils.extmath import logsumexp
 
 from .base_nodes import PCANode
@@ -75,12 +75,12 @@ from .filter_bank import FilterBankError, FilterBankNode
 from .prewhiten import PrewhiteningNode
 from .spike_detection import SDMteoNode, ThresholdDetectorNode
 from ..common import (
-    overlaps, epochs_from_spiketrain, epochs_from_spiketrain_set,
-    shifted_matrix_sub, mcvec_to_conc, epochs_from_binvec, merge_epochs,
-    matrix_argmax, dict_list_to_ndarray, get_cut, GdfFile, MxRingBuffer,
+    event_overlaps, epochs_from_spiketrain, epochs_from_spiketrain_set,
+    sic_epoch, sic_subtrahends, mcvec_to_conc, epochs_from_binvec,
+    matrix_argmax, get_cut, GdfFile, MxRingBuffer,
     mcvec_from_conc, get_aligned_spikes, vec2ten, get_tau_align_min,
     get_tau_align_max, get_tau_align_energy, mad_scaling, mad_scale_op_mx,
-    mad_scale_op_vec)
+    mad_scale_op_vec, WorkspaceArena, EventAccumulator, INDEX_DTYPE)
 
 ##---CONSTANTS
 
@@ -89,6 +89,29 @@ MTEO_KWARGS = {'kvalues': [3, 9, 15, 21],
                'threshold_factor': 0.98,
                'min_dist': 32}
 
+# chunk related members, dropped when sorters are sent between processes
+TRANSIENT_MEMBERS = ['_data', '_chunk', '_fout', '_disc', '_disc_max',
+                     '_carry_fout', '_carry_data', '_events_sorted']
+
+##---FUNCTIONS
+
+def _sort_segment(args):
+    """worker process: sort a segment of a recording
+
+    The segment is sorted from an empty filter history. Only the events in
+    [start, stop) of the segment are returned, None means unbounded.
+    """
+
+    sorter, data, start, stop = args
+    sorter.reset_stream()
+    sorter(data)
+    rval = sorter.events
+    if start is not None:
+        rval = rval[rval[:, 0] >= start]
+    if stop is not None:
+        rval = rval[rval[:, 0] < stop]
+    return rval
+
 ##---CLASSES
 
 class FilterBankSortingNode(FilterBankNode):
@@ -100,8 +123,24 @@ class FilterBankSortingNode(FilterBankNode):
     `self._sort_chunk` and `self._post_sort` methods with meaning full
     processing. After the filter steps the filter output is present and can be
     processed on. Input data can be partitioned into chunks of smaller size.
+
+    The part of a chunk that can not be sorted without the following samples
+    (e.g. a spike epoch at the end of the chunk) is carried over to the next
+    chunk, if `_sort_chunk` supports this. Continuous streams of data can be
+    sorted block by block with `push`.
+
+    The per chunk buffers (filter output, carry-over, discriminants) are
+    taken from a `WorkspaceArena` and reused for the following chunks, see
+    `arena` for the allocation statistics.
+
+    The spikes found are collected in an `EventAccumulator`. After sorting,
+    `rval` holds the time sorted spike train per filter index and `events`
+    the time sorted stream of all spikes.
     """
 
+    # if True, the sorting supports carrying over unsorted parts of a chunk
+    _chunk_carry = False
+
     def __init__(self, **kwargs):
         """
         :type ce: TimeSeriesCovE
@@ -168,6 +207,12 @@ class FilterBankSortingNode(FilterBankNode):
         self._chunk = None
         self._chunk_offset = 0
         self._chunk_size = int(chunk_size)
+        self._arena = WorkspaceArena()
+        self._events = EventAccumulator()
+        self._events_sorted = None
+        self._ovlp = {}
+        self._ovlp_version = None
+        self._reset_carry()
         self.rval = {}
 
         # create filters for templates
@@ -175,6 +220,23 @@ class FilterBankSortingNode(FilterBankNode):
             for temp in templates:
                 self.create_filter(temp)
 
+    ## properties
+
+    def get_arena(self):
+        return self._arena
+
+    arena = property(get_arena, doc='buffers of the chunk-wise sorting')
+
+    def get_events(self):
+        if self._events_sorted is None:
+            self._events_sorted = self._events.sorted_events(
+                offset=-int(self._tf / 2))
+        return self._events_sorted
+
+    events = property(get_events,
+                      doc='spikes of the last call as [[time, filter index]] '
+                          'sorted by time')
+
     ## SortingNode interface
 
     def _execute(self, x):
@@ -182,44 +244,167 @@ class FilterBankSortingNode(FilterBankNode):
         #self._data = x[:, self._chan_set]
         self._data = x
         dlen = self._data.shape[0]
-        self.rval.clear()
-        for i in self._idx_active_set:
-            self.rval[i] = []
-        curr_chunk = 0
-        has_next_chunk = True
-
-        # sort per chunk
-        while has_next_chunk:
-            # get chunk limits
-            self._chunk_offset = curr_chunk * self._chunk_size
-            clen = min(dlen, (curr_chunk + 1) * self._chunk_size)
-            clen -= self._chunk_offset
-
-            # generate data chunk and process
-            self._chunk = self._data[
-                          self._chunk_offset:self._chunk_offset + clen]
-            self._fout = sp.empty((clen, self.nf))
-
-            # filtering
-            self._pre_filter()
-            self._fout = super(FilterBankSortingNode, self)._execute(
-                self._chunk)
-            self._post_filter()
-
-            # sorting
-            self._pre_sort()
-            self._sort_chunk()
-            self._post_sort()
-
-            # iteration
-            curr_chunk += 1
-            if self._chunk_offset + clen >= dlen:
-                has_next_chunk = False
+        self._reset_carry()
+        self._events.clear()
+
+        # sort per chunk, spike epochs are carried over the chunk borders
+        for start in xrange(0, max(dlen, 1), self._chunk_size):
+            stop = min(dlen, start + self._chunk_size)
+            self._sort_block(self._data[start:stop],
+                             final=stop >= dlen or not self._chunk_carry)
         self._combine_results()
 
         # return input data
         return x
 
+    ## streaming interface
+
+    def push(self, x):
+        """sort a block of a continuous stream of samples
+
+        The filter outputs of the samples that can not be sorted yet are
+        carried over to the next call, so every spike is reported exactly
+        once, by the call that completes its spike epoch. A spike is
+        reported with a latency of about 3*tf/2 samples after its spike
+        time (plus the largest overlap shift for the overlap channel method),
+        or later if its spike epoch extends further.
+
+        The filter set must not change while a stream is open, call `flush`
+        before changing the filter bank. Use `reset_stream` to start a new
+        stream.
+
+        :type x: ndarray
+        :param x: block of samples [n, nc], may be of any length
+        :rtype: dict
+        :returns: spike trains of the spikes completed by this block, keyed
+            by filter index. Spike times are relative to the start of the
+            stream.
+        """
+
+        self._pre_execution_checks(x)
+        self._events.clear()
+        self._sort_block(self._refcast(x), final=not self._chunk_carry)
+        self._combine_results()
+        return self.rval
+
+    def flush(self):
+        """sort the samples carried over in the stream
+
+        :rtype: dict
+        :returns: spike trains of the remaining spikes, keyed by filter
+            index. Spike times are relative to the start of the stream.
+        """
+
+        self._events.clear()
+        if self._carry_fout is not None:
+            self._sort_block(None, final=True)
+        self._combine_results()
+        return self.rval
+
+    def reset_stream(self):
+        """start a new stream, the filter history is reset as well"""
+
+        self._reset_carry()
+        self.reset_history()
+
+    def sort_source(self, source):
+        """sort a recording chunk by chunk from a chunk source
+
+        The chunks of `source` are sorted like the chunks in `_execute`, with
+        the spike epochs carried over the chunk borders if the sorter supports
+        it, so the result equals `self(data)` for the whole recording. Only
+        the chunks in flight are held in memory and `_data` is not set, so
+        the methods that need the data of the last call (e.g. `spikes_u`) are
+        not available. Use the dtype of this node as the dtype of `source`,
+        to convert the chunks in its prefetch thread.
+
+        :type source: ChunkSource
+        :param source: the recording
+        :rtype: dict
+        :returns: spike trains keyed by filter index
+        """
+
+        self._data = None
+        self._reset_carry()
+        self._events.clear()
+
+        # sort per chunk, the last chunk resolves all spike epochs
+        ns = source.nsample
+        pos = 0
+        for x in source:
+            pos += x.shape[0]
+            self._pre_execution_checks(x)
+            self._sort_block(self._refcast(x),
+                             final=pos >= ns or not self._chunk_carry)
+        self._combine_results()
+        return self.rval
+
+    def _reset_carry(self):
+        self._carry_fout = None
+        self._carry_data = None
+        self._carry_offset = 0
+        self._stream_pos = 0
+        self._sort_from = 0
+
+    def _sort_block(self, x, final=True):
+        """filter and sort a block of data together with the carry-over
+
+        :type x: ndarray
+        :param x: block of data, or None to sort the carry-over only
+        :type final: bool
+        :param final: if True, all spike epochs are resolved and nothing is
+            carried over
+        """
+
+        # filtering, the filter output is written behind the carry-over
+        self._pre_filter()
+        n_carry = n_new = 0
+        if self._carry_fout is not None:
+            if self._carry_fout.shape[1] != self.nf:
+                raise FilterBankError('the filter set changed during the '
+                                      'stream, call flush() first!')
+            n_carry = self._carry_fout.shape[0]
+        if x is not None:
+            n_new = x.shape[0]
+        self._fout = self._arena.get('fout', (n_carry + n_new, self.nf),
+                                     self.dtype)
+        if n_carry > 0:
+            self._fout[:n_carry] = self._carry_fout
+        if x is not None:
+            self._filter(x, out=self._fout[n_carry:])
+        if n_carry > 0:
+            self._chunk_offset = self._carry_offset
+            self._chunk = self._arena.get(
+                'chunk', (n_carry + n_new,) + self._carry_data.shape[1:],
+                self._carry_data.dtype)
+            self._chunk[:n_carry] = self._carry_data
+            if x is not None:
+                self._chunk[n_carry:] = x
+        else:
+            self._chunk_offset = self._stream_pos
+            self._chunk = x
+        self._stream_pos += n_new
+        self._post_filter()
+
+        # sorting
+        self._pre_sort()
+        keep = self._sort_chunk(final=final)
+        self._post_sort()
+
+        # carry over
+        if final or keep is None or keep >= self._fout.shape[0]:
+            self._carry_fout = self._carry_data = None
+            self._sort_from = 0
+        else:
+            n = self._fout.shape[0] - keep
+            self._carry_fout = self._arena.get(
+                'carry_fout', (n,) + self._fout.shape[1:], self._fout.dtype)
+            self._carry_fout[:] = self._fout[keep:]
+            self._carry_data = self._arena.get(
+                'carry_data', (n,) + self._chunk.shape[1:], self._chunk.dtype)
+            self._carry_data[:] = self._chunk[keep:]
+            self._carry_offset = self._chunk_offset + keep
+
     ## FilterBankSortingNode interface - prototypes
 
     def _pre_filter(self):
@@ -234,17 +419,58 @@ class FilterBankSortingNode(FilterBankNode):
     def _post_sort(self):
         pass
 
-    def _sort_chunk(self):
-        pass
+    def _sort_chunk(self, final=True):
+        """sort the current buffer
+
+        :type final: bool
+        :param final: if False, only the part of the buffer that does not
+            depend on the samples to come is sorted
+        :rtype: int
+        :returns: buffer row from which on the buffer has to be carried
+            over to the next block, None if nothing is carried over
+        """
+
+        return None
 
     def _combine_results(self):
-        self.rval = dict_list_to_ndarray(self.rval)
-        correct = int(self._tf / 2)
-        for k in self.rval:
-            self.rval[k] -= correct
+        self.rval = self._events.spike_trains(self._idx_active_set,
+                                              offset=-int(self._tf / 2))
+        self._events_sorted = None
+        self.get_overlaps()
 
     ## result access
 
+    def get_overlaps(self, overlap_window=None):
+        """yields the overlap mask for the spike trains in `rval`
+
+        The mask is computed for all units at once from the time sorted event
+        stream. It is cached per window until the events change, the mask
+        for the default window is computed with the results of each chunk.
+
+        :type overlap_window: int
+        :param overlap_window: overlap range, if None set
+            overlap_window=self._tf.
+            Default=None
+        :rtype: dict
+        :returns: boolean sequence per filter index, True for the spikes
+            that participate in an overlap event
+        """
+
+        window = int(overlap_window or self._tf)
+        if self._ovlp_version != self._events.version:
+            self._ovlp.clear()
+            self._ovlp_version = self._events.version
+        if window not in self._ovlp:
+            ev = self.events
+            mask = event_overlaps(ev[:, 0], ev[:, 1], window)
+            order = sp.argsort(ev[:, 1], kind='mergesort')
+            units = ev[order, 1]
+            self._ovlp[window] = dict(
+                (k, mask[order[sp.searchsorted(units, k, side='left'):
+                               sp.searchsorted(units, k, side='right')]])
+                for k in self.rval)
+        return self._ovlp[window]
+
     def spikes_u(self, u, mc=True, exclude_overlaps=True, overlap_window=None,
                  align_at=-1, align_kind='min', align_rsf=1.):
         """yields the spike for the u-th filter
@@ -265,26 +491,20 @@ class FilterBankSortingNode(FilterBankNode):
         """
 
         # init
-        cut = get_cut(self._tf)
-        rval = None
-        size = 0, sum(cut), self._data.shape[1]
-        if mc is False:
-            size = size[0], size[1] * size[2]
-        st_dict = copy.deepcopy(self.rval)
+        st_u = self.rval[u]
+        if exclude_overlaps is True:
+            # overlaps are decided on the sorted event times, before alignment
+            st_u = st_u[self.get_overlaps(overlap_window)[u] == False]
 
         # extract spikes
-        spks, st_dict[u] = get_aligned_spikes(
+        spks, st_u = get_aligned_spikes(
             self._data,
-            st_dict[u],
+            st_u.copy(),
             align_at=align_at,
             tf=self._tf,
             mc=mc,
             kind=align_kind,
             rsf=align_rsf)
-        if exclude_overlaps is True:
-            if st_dict[u].size > 0:
-                ovlp_info = overlaps(st_dict, overlap_window or self._tf)[0]
-                spks = spks[ovlp_info[u] == False]
         return spks
 
     ## plotting methods
@@ -399,8 +619,22 @@ class BayesOptimalTemplateMatchingNode(FilterBankSortingNode):
     signal, the other implementation uses subtractive interference
     cancellation (SIC) on epochs of the signal, where the template
     discriminants are greater the the noise discriminant.
+
+    Overlap channels are not stored for the whole chunk. Only the single unit
+    discriminants are kept in `self._disc`, the maximum over all channels per
+    sample is kept in `self._disc_max`. The overlap channels are evaluated
+    exactly where an upper bound allows them to exceed the noise
+    discriminant, and for the rows of the spike epochs when these are
+    resolved, see `_disc_slice`.
+
+    Spike epochs at the end of a chunk are carried over to the next chunk,
+    so the sorting does not depend on the chunk size. The same mechanism
+    serves the streaming interface `push`. Long recordings can be sorted on
+    several processes with `sort_parallel`.
     """
 
+    _chunk_carry = True
+
     ## constructor
 
     def __init__(self, **kwargs):
@@ -426,11 +660,22 @@ class BayesOptimalTemplateMatchingNode(FilterBankSortingNode):
             'sic'. After a spike has been found in a spike epoch, its
             discriminant will be biased by the `bias` for `extend` samples.
 
+            Default=None
+        :type ovlp_footprint: float
+        :keyword ovlp_footprint: will only be used when the resolution method
+            is 'och'. If not None, overlap channels are only built for pairs
+            of templates whose spatial footprints share a channel. The
+            footprint of a template are the channels with a peak-to-peak
+            amplitude of at least `ovlp_footprint` times its maximum. Note
+            that this changes the result if overlaps of far apart units
+            would have been detected.
+
             Default=None
         """
 
         # kwargs
         ovlp_taus = kwargs.pop('ovlp_taus', None)
+        ovlp_footprint = kwargs.pop('ovlp_footprint', None)
         noi_pr = kwargs.pop('noi_pr', 1e0)
         spk_pr = kwargs.pop('spk_pr', 1e-6)
         spk_pr_bias = kwargs.pop('spk_pr_bias', None)
@@ -447,7 +692,15 @@ class BayesOptimalTemplateMatchingNode(FilterBankSortingNode):
         else:
             if self.verbose.has_print:
                 print 'using subtractive interference cancelation'
+        self._ovlp_footprint = ovlp_footprint
         self._disc = None
+        self._disc_max = None
+        self._oc = None
+        self._oc_xcorrs = None
+        self._sic_sub = None
+        self._sic_xcorrs = None
+        self._whi = None
+        self._whi_key = None
         self._pr_n = None
         self._lpr_n = None
         self._pr_s = None
@@ -509,32 +762,129 @@ class BayesOptimalTemplateMatchingNode(FilterBankSortingNode):
 
         # tune filter outputs to prob. model
         ns = self._fout.shape[0]
-        nf = self.nf
-        if self._ovlp_taus is not None:
-            nf += nf * (nf - 1) * 0.5 * len(self._ovlp_taus)
-        self._disc = sp.empty((ns, nf), dtype=self.dtype)
-        self._disc[:] = sp.nan
-        for i in xrange(self.nf):
-            self._disc[:, i] = (self._fout[:, i] + self._lpr_s -
-                                .5 * self.get_xcorrs_at(i))
-
-        # build overlap channels from filter outputs for overlap channels
+        self._disc = self._arena.get('disc', (ns, self.nf), self.dtype)
+        self._disc_max = self._arena.get('disc_max', ns, self.dtype)
+        if self.nf:
+            sp.add(self._fout, self._lpr_s, out=self._disc)
+            self._disc -= sp.array([.5 * self.get_xcorrs_at(i)
+                                    for i in xrange(self.nf)],
+                                   dtype=self._disc.dtype)
+            sp.nanmax(self._disc, axis=1, out=self._disc_max)
+        else:
+            self._disc_max.fill(sp.nan)
+
+        # index the overlap channels and include them in the maximum
         if self._ovlp_taus is not None:
-            self._oc_idx = {}
-            oc_idx = self.nf
-            for f0 in xrange(self.nf):
-                for f1 in xrange(f0 + 1, self.nf):
-                    for tau in self._ovlp_taus:
-                        self._oc_idx[oc_idx] = (f0, f1, tau)
-                        f0_lim = [max(0, 0 - tau), min(ns, ns - tau)]
-                        f1_lim = [max(0, 0 + tau), min(ns, ns + tau)]
-                        self._disc[f0_lim[0]:f0_lim[1], oc_idx] = (
-                            self._disc[f0_lim[0]:f0_lim[1], f0] +
-                            self._disc[f1_lim[0]:f1_lim[1], f1] -
-                            self.get_xcorrs_at(f0, f1, tau))
-                        oc_idx += 1
-
-    def _sort_chunk(self):
+            if self._oc_xcorrs is not self._xcorrs:
+                self._build_oc()
+                self._oc_xcorrs = self._xcorrs
+            self._update_disc_max()
+
+    def _build_oc(self):
+        """index the overlap channels of the current filter set
+
+        Overlap channel `nf + k` is the pair (f0, f1) with f1 delayed by tau,
+        as stored in `self._oc_idx`. The discriminant of an overlap channel
+        is disc[t, f0] + disc[t + tau, f1] - xcorr(f0, f1, tau).
+        """
+
+        keep = None
+        if self._ovlp_footprint is not None:
+            temps = self.get_template_set()
+            amp = temps.max(axis=1) - temps.min(axis=1)
+            keep = amp >= self._ovlp_footprint * amp.max(axis=1)[:, None]
+        self._oc_idx = {}
+        oc = []
+        oc_idx = self.nf
+        for f0 in xrange(self.nf):
+            for f1 in xrange(f0 + 1, self.nf):
+                if keep is not None and not (keep[f0] & keep[f1]).any():
+                    continue
+                for tau in self._ovlp_taus:
+                    self._oc_idx[oc_idx] = (f0, f1, tau)
+                    oc.append((f0, f1, tau, self.get_xcorrs_at(f0, f1, tau)))
+                    oc_idx += 1
+        oc = sp.asarray(oc).reshape(-1, 4)
+        # DOC: xcorrs are cast to the disc dtype, as in a column operation
+        self._oc = (oc[:, 0].astype(int), oc[:, 1].astype(int),
+                    oc[:, 2].astype(int), oc[:, 3].astype(self._disc.dtype))
+
+    def _update_disc_max(self, block_size=4096):
+        """include the overlap channels in the per sample maximum
+
+        With M(t) the maximum over the single unit discriminants, an overlap
+        channel at t is bounded by M(t) + M(t + tau) - min xcorr(tau). Only
+        samples where this bound exceeds the noise discriminant are evaluated,
+        in blocks of at most `block_size` samples per delay.
+        """
+
+        f0, f1, tau, xc = self._oc
+        if len(tau) == 0:
+            return
+        ns = self._disc.shape[0]
+        m = self._arena.get('oc_max', ns, sp.float64)
+        m[:] = self._disc_max
+        # DOC: margin for the rounding of the discriminants, the rows with
+        # DOC: bound + 1e-4 * |bound| > thr are evaluated
+        thr = self._lpr_n - 1e-4 * (1.0 + abs(self._lpr_n))
+        for t in sp.unique(tau):
+            lo, hi = max(0, -t), min(ns, ns - t)
+            if lo >= hi:
+                continue
+            sel = tau == t
+            bound = self._arena.get('oc_bound', hi - lo, sp.float64)
+            sp.add(m[lo:hi], m[lo + t:hi + t], out=bound)
+            bound -= xc[sel].min()
+            mag = self._arena.get('oc_mag', hi - lo, sp.float64)
+            sp.absolute(bound, out=mag)
+            mag *= 1e-4
+            mag += bound
+            mask = self._arena.get('oc_mask', hi - lo, bool)
+            rows = lo + sp.flatnonzero(sp.greater(mag, thr, out=mask))
+            for b in xrange(0, rows.size, block_size):
+                r = rows[b:b + block_size]
+                oc = self._disc[r][:, f0[sel]] + self._disc[r + t][:, f1[sel]]
+                oc -= xc[sel]
+                self._disc_max[r] = sp.fmax(self._disc_max[r],
+                                            sp.nanmax(oc, axis=1))
+
+    def _disc_rows(self, rows):
+        """discriminants including the overlap channels for a set of rows
+
+        :type rows: ndarray
+        :param rows: row indices into `self._disc`
+        :rtype: ndarray
+        :returns: discriminants [rows, nf + overlap channels], NaN where the
+            delayed filter is outside of the chunk
+        """
+
+        nf = self._disc.shape[1]
+        if self._ovlp_taus is None or self._oc is None:
+            return self._disc[rows]
+        f0, f1, tau, xc = self._oc
+        ns = self._disc.shape[0]
+        rval = sp.empty((len(rows), nf + len(tau)), dtype=self._disc.dtype)
+        rval[:, :nf] = self._disc[rows]
+        src = rows[:, None] + tau[None, :]
+        valid = (src >= 0) & (src < ns)
+        oc = self._disc[rows[:, None], f0[None, :]] + \
+             self._disc[sp.clip(src, 0, ns - 1), f1[None, :]]
+        oc -= xc
+        oc[~valid] = sp.nan
+        rval[:, nf:] = oc
+        return rval
+
+    def _disc_slice(self, start, stop):
+        """discriminants including the overlap channels for a slice of rows
+
+        Equivalent to slicing the dense discriminant matrix [start:stop].
+        """
+
+        if self._ovlp_taus is None:
+            return self._disc[start:stop]
+        return self._disc_rows(sp.arange(self._disc.shape[0])[start:stop])
+
+    def _sort_chunk(self, final=True):
         """sort this chunk on the calculated discriminant functions
 
         method: "och"
@@ -544,149 +894,266 @@ class BayesOptimalTemplateMatchingNode(FilterBankSortingNode):
             f2:    |-----|   |-----|   |-----|   |-----|   |-----|
             res:    +++       ++++      +++++      ++++       +++
         method: "sic"
-            TODO:
+            Spike epochs are resolved by subtractive interference
+            cancellation, see `botmpy.common.sic`.
+
+        If `final` is False, only the spike epochs that can not change with
+        the samples to come are resolved, see `_spike_epochs`.
         """
 
         # init
         if self.nf == 0:
-            return
-        spk_ep = epochs_from_binvec(
-            sp.nanmax(self._disc, axis=1) > self._lpr_n)
-        if spk_ep.size == 0:
-            return
+            return None
+        spk_ep, commit = self._spike_epochs(final=final)
+        if self._ovlp_taus is None and spk_ep.size > 0:
+            if self._sic_xcorrs is not self._xcorrs:
+                self._sic_sub = sic_subtrahends(self._xcorrs,
+                                                self._disc.dtype)
+                self._sic_xcorrs = self._xcorrs
+
+        # resolve spike epochs
+        for i in xrange(spk_ep.shape[0]):
+            if self._ovlp_taus is not None:
+                self._sort_epoch_och(spk_ep[i])
+            else:
+                self._sort_epoch_sic(spk_ep[i])
+
+        # carry over from the unresolved spike epochs on
+        if final is True:
+            return None
+        ctx = get_cut(self._tf)[0] + max([0] + [-tau for tau in
+                                                self._ovlp_taus or []])
+        keep = max(0, commit - ctx)
+        self._sort_from = commit - keep
+        return keep
+
+    def _spike_epochs(self, final=True):
+        """merged spike epochs of the current buffer
+
+        The spike epochs are the runs of samples where the discriminant
+        exceeds the noise discriminant, cut around their maximum by the
+        template length and merged where they overlap. Only runs starting at
+        or after `self._sort_from` are considered.
+
+        If `final` is False, only the merged epochs that can not change with
+        the samples to come are returned: the discriminant maximum of the
+        last max(ovlp_taus) samples is incomplete, a run reaching into these
+        samples may still grow, and a future epoch may start up to tf/2
+        samples before its run.
+
+        :type final: bool
+        :param final: if True, all spike epochs of the buffer are returned
+        :rtype: tuple
+        :returns: merged spike epochs [[start, stop]], buffer row before
+            which all runs are resolved by these epochs
+        """
+
+        ns = self._disc.shape[0]
         l, r = get_cut(self._tf)
+        mask = self._arena.get('disc_mask', ns, bool)
+        sp.greater(self._disc_max, self._lpr_n, out=mask)
+        runs = sp.asarray(epochs_from_binvec(mask), dtype=INDEX_DTYPE)
+        runs = runs[runs[:, 0] >= self._sort_from]
+        lim = ns
+        if final is False:
+            valid = ns - max([0] + list(self._ovlp_taus or []))
+            pending = runs[:, 1] + 1 >= valid
+            lim = min([valid] + list(runs[pending, 0]))
+            runs = runs[~pending]
+
+        # cut epochs around the discriminant maximum of the runs
+        spk_ep = runs.copy()
         for i in xrange(spk_ep.shape[0]):
             # FIX: for now we just continue for empty epochs,
             # where do they come from anyways?!
             if spk_ep[i, 1] - spk_ep[i, 0] < 1:
                 continue
-            mc = self._disc[spk_ep[i, 0]:spk_ep[i, 1], :].argmax(0).argmax()
-            s = self._disc[spk_ep[i, 0]:spk_ep[i, 1], mc].argmax() + spk_ep[
-                i, 0]
+            ep_disc = self._disc_slice(spk_ep[i, 0], spk_ep[i, 1])
+            mc = ep_disc.argmax(0).argmax()
+            s = ep_disc[:, mc].argmax() + spk_ep[i, 0]
             spk_ep[i] = [s - l, s + r]
 
-        # check epochs
-        spk_ep = merge_epochs(spk_ep)
-        n_ep = spk_ep.shape[0]
-
-        for i in xrange(n_ep):
-            #
-            # method: overlap channels
-            #
-            if self._ovlp_taus is not None:
-                # get event time and channel
-                ep_t, ep_c = matrix_argmax(
-                    self._disc[spk_ep[i, 0]:spk_ep[i, 1]])
-                ep_t += spk_ep[i, 0]
-
-                # lets fill in the results
-                if ep_c < self.nf:
-                    # was single unit
-                    fid = self.get_idx_for(ep_c)
-                    self.rval[fid].append(ep_t + self._chunk_offset)
-                else:
-                    # was overlap
-                    my_oc_idx = self._oc_idx[ep_c]
-                    fid0 = self.get_idx_for(my_oc_idx[0])
-                    self.rval[fid0].append(ep_t + self._chunk_offset)
-                    fid1 = self.get_idx_for(my_oc_idx[1])
-                    self.rval[fid1].append(
-                        ep_t + my_oc_idx[2] + self._chunk_offset)
-
-            #
-            # method: subtractive interference cancellation
-            #
+        # merge overlapping epochs, as `merge_epochs` does
+        groups = []
+        member = sp.empty(spk_ep.shape[0], dtype=int)
+        for i in sp.lexsort((spk_ep[:, 1], spk_ep[:, 0])):
+            if groups and spk_ep[i, 0] <= groups[-1][1] - 1:
+                groups[-1][1] = max(spk_ep[i, 1], groups[-1][1])
             else:
-                ep_fout = self._fout[spk_ep[i, 0]:spk_ep[i, 1], :]
-                ep_fout_norm = sp_la.norm(ep_fout)
-                ep_disc = self._disc[spk_ep[i, 0]:spk_ep[i, 1], :].copy()
-
-                niter = 0
-                while sp.nanmax(ep_disc) > self._lpr_n:
-                    # warn on spike overflow
-                    niter += 1
-                    if niter > self.nf:
-                        logging.warn(
-                            'more spikes than filters found! '
-                            'epoch: [%d:%d] %d' % (
-                                spk_ep[i][0] + self._chunk_offset,
-                                spk_ep[i][1] + self._chunk_offset,
-                                niter))
-                        if niter > 2 * self.nf:
-                            break
+                groups.append(list(spk_ep[i]))
+            member[i] = len(groups) - 1
+
+        # the merged epochs ending before any future epoch may start
+        n_final = len(groups)
+        commit = ns
+        if final is False:
+            n_final = 0
+            while n_final < len(groups) and groups[n_final][1] <= lim - l:
+                n_final += 1
+            while True:
+                done = member < n_final
+                commit = min([lim] + list(runs[~done, 0]))
+                if n_final == 0 or (runs[done, 0] < commit).all():
+                    break
+                n_final -= 1
+        rval = sp.asarray(groups[:n_final], dtype=INDEX_DTYPE).reshape(-1, 2)
+        rval[:, 0] = sp.maximum(rval[:, 0], 0)
+        rval = rval[rval[:, 1] - rval[:, 0] > 0]
+        return rval, commit
+
+    def _sort_epoch_och(self, ep):
+        """resolve a spike epoch on the overlap channels"""
+
+        # get event time and channel
+        ep_t, ep_c = matrix_argmax(self._disc_slice(ep[0], ep[1]))
+        ep_t += ep[0]
+
+        # lets fill in the results
+        if ep_c < self.nf:
+            # was single unit
+            fid = self.get_idx_for(ep_c)
+            self._events.append(ep_t + self._chunk_offset, fid)
+        else:
+            # was overlap
+            my_oc_idx = self._oc_idx[ep_c]
+            fid0 = self.get_idx_for(my_oc_idx[0])
+            self._events.append(ep_t + self._chunk_offset, fid0)
+            fid1 = self.get_idx_for(my_oc_idx[1])
+            self._events.append(ep_t + my_oc_idx[2] + self._chunk_offset,
+                                fid1)
+
+    def _sort_epoch_sic(self, ep):
+        """resolve a spike epoch by subtractive interference cancellation"""
+
+        ep_fout = self._fout[ep[0]:ep[1], :]
+        ep_disc = self._disc[ep[0]:ep[1], :].copy()
+        if self.verbose.get_has_plot(1):
+            ep_disc_pre = ep_disc.copy()
+        bias, extend = self._pr_s_b or (None, 0)
+
+        ep_events, niter = sic_epoch(
+            ep_disc, ep_fout, self._sic_sub, self._lpr_n, self._lpr_s,
+            bias=bias, extend=extend, max_iter=2 * self.nf)
+
+        # warn on spike overflow
+        if niter > self.nf:
+            logging.warn(
+                'more spikes than filters found! '
+                'epoch: [%d:%d] %d' % (
+                    ep[0] + self._chunk_offset,
+                    ep[1] + self._chunk_offset,
+                    niter))
+
+        ## DEBUG
+
+        if self.verbose.get_has_plot(1) and ep_events:
+            try:
+                from spikeplot import plt, COLOURS
+
+                x_range = sp.arange(ep[0] + self._chunk_offset,
+                                    ep[1] + self._chunk_offset)
+                f = plt.figure()
+                f.suptitle('spike epoch [%d:%d] #%d' % (
+                    ep[0] + self._chunk_offset, ep[1] + self._chunk_offset,
+                    len(ep_events)))
+                ax1 = f.add_subplot(111)
+                ax1.set_color_cycle(['k'] + COLOURS[:self.nf] * 2)
+                ax1.plot(x_range, sp.zeros_like(x_range), ls='--')
+                ax1.plot(x_range, ep_disc_pre, label='pre_sub')
+                ax1.plot(x_range, ep_disc, ls=':', lw=2, label='post_sub')
+                for ep_t, _ in ep_events:
+                    ax1.axvline(x_range[ep_t], c='k')
+                ax1.legend(loc=2)
+            except:
+                pass
 
-                    # find epoch details
-                    ep_t = sp.nanargmax(sp.nanmax(ep_disc, axis=1))
-                    ep_c = sp.nanargmax(ep_disc[ep_t])
-
-                    # build subtrahend
-                    sub = shifted_matrix_sub(
-                        sp.zeros_like(ep_disc),
-                        self._xcorrs[ep_c, :, :].T,
-                        ep_t - self._tf + 1)
-
-                    # apply subtrahend
-                    if ep_fout_norm > sp_la.norm(ep_fout + sub):
-                        ## DEBUG
-
-                        if self.verbose.get_has_plot(1):
-                            try:
-                                from spikeplot import xvf_tensor, plt, COLOURS
-
-                                x_range = sp.arange(
-                                    spk_ep[i, 0] + self._chunk_offset,
-                                    spk_ep[i, 1] + self._chunk_offset)
-                                f = plt.figure()
-                                f.suptitle('spike epoch [%d:%d] #%d' %
-                                           (spk_ep[i, 0] + self._chunk_offset,
-                                            spk_ep[i, 1] + self._chunk_offset,
-                                            niter))
-                                ax1 = f.add_subplot(211)
-                                ax1.set_color_cycle(
-                                    ['k'] + COLOURS[:self.nf] * 2)
-                                ax1.plot(x_range, sp.zeros_like(x_range),
-                                         ls='--')
-                                ax1.plot(x_range, ep_disc, label='pre_sub')
-                                ax1.axvline(x_range[ep_t], c='k')
-                                ax2 = f.add_subplot(212, sharex=ax1, sharey=ax1)
-                                ax2.set_color_cycle(['k'] + COLOURS[:self.nf])
-                                ax2.plot(x_range, sp.zeros_like(x_range),
-                                         ls='--')
-                                ax2.plot(x_range, sub)
-                                ax2.axvline(x_range[ep_t], c='k')
-                            except:
-                                pass
-
-                        ## BUGED
-
-                        ep_disc += sub + self._lpr_s
-                        if self._pr_s_b is not None:
-                            bias, extend = self._pr_s_b
-                            ep_disc[ep_t:min(ep_t + extend,
-                                             ep_disc.shape[0]), ep_c] -= bias
-
-                        ## DEBUG
-
-                        if self.verbose.get_has_plot(1):
-                            try:
-                                ax1.plot(x_range, ep_disc, ls=':', lw=2,
-                                         label='post_sub')
-                                ax1.legend(loc=2)
-                            except:
-                                pass
-
-                        ## BUGED
-
-                        fid = self.get_idx_for(ep_c)
-                        self.rval[fid].append(
-                            spk_ep[i, 0] + ep_t + self._chunk_offset)
-                    else:
-                        break
-                del ep_fout, ep_disc, sub
+        ## BUGED
+
+        for ep_t, ep_c in ep_events:
+            fid = self.get_idx_for(ep_c)
+            self._events.append(ep[0] + ep_t + self._chunk_offset, fid)
+
+    ## offline sorting
+
+    def sort_parallel(self, data, n_workers=None, overlap=None):
+        """sort a long recording offline in segments on worker processes
+
+        The recording is split into `n_workers` segments, extended by
+        `overlap` samples on both sides. Each segment is sorted in a worker
+        process by a copy of this node (filter bank, covariance estimator
+        and priors), starting from an empty filter history. The spike trains
+        are stitched by keeping the events of each segment that fall into
+        its own part of the recording, events found in the overlap of two
+        segments are reported once.
+
+        The result equals the serial sorting `reset_stream(); self(data)`,
+        unless the spike epochs merge into a single epoch over the whole
+        overlap around a segment border. The filter bank of this node is not
+        changed, the result is stored in `rval` and `events`.
+
+        :type data: ndarray
+        :param data: the recording [n, nc]
+        :type n_workers: int
+        :param n_workers: number of worker processes. If None, use the cpu
+            count.
+            Default=None
+        :type overlap: int
+        :param overlap: overlap of the segments in samples. If None, use 20
+            times the template length.
+            Default=None
+        :rtype: dict
+        :returns: spike trains keyed by filter index
+        """
+
+        # inits
+        self._pre_execution_checks(data)
+        ns = data.shape[0]
+        if n_workers is None:
+            n_workers = multiprocessing.cpu_count()
+        if overlap is None:
+            overlap = 20 * self._tf
+        overlap = max(int(overlap), 1)
+        n_seg = max(1, min(int(n_workers), ns // overlap))
+        bounds = [ns * k // n_seg for k in xrange(n_seg + 1)]
+
+        # sorter copy without the chunk related members
+        sorter = copy.copy(self)
+        for name in TRANSIENT_MEMBERS:
+            setattr(sorter, name, None)
+        sorter.rval = {}
+        sorter._events = EventAccumulator()
+        sorter = copy.deepcopy(sorter)
+
+        # sort segments
+        jobs = []
+        for k in xrange(n_seg):
+            start = max(0, bounds[k] - overlap)
+            stop = min(ns, bounds[k + 1] + overlap)
+            jobs.append((sorter, data[start:stop],
+                         bounds[k] - start if k > 0 else None,
+                         bounds[k + 1] - start if k < n_seg - 1 else None))
+        if n_workers > 1 and n_seg > 1:
+            pool = multiprocessing.Pool(n_seg)
+            try:
+                results = pool.map(_sort_segment, jobs, chunksize=1)
+            finally:
+                pool.terminate()
+                pool.join()
+        else:
+            results = map(_sort_segment, jobs)
+        del jobs
+
+        # stitch, the segments are in order so the events stay sorted
+        self._events.clear()
+        for i, ev in enumerate(results):
+            self._events.extend(ev[:, 0] + max(0, bounds[i] - overlap) +
+                                int(self._tf / 2), ev[:, 1])
+        self._combine_results()
+        return self.rval
 
     ## BOTM implementation
 
-    def posterior_prob(self, obs, with_noise=False):
+    def posterior_prob(self, obs, with_noise=False, block_size=None):
         """posterior probabilities for data under the model
 
         :type obs: ndarray
@@ -695,26 +1162,16 @@ class BayesOptimalTemplateMatchingNode(FilterBankSortingNode):
         :param with_noise: if True, include the noise cluster as component
             in the mixture.
             Default=False
+        :type block_size: int
+        :param block_size: if not None, whiten the observations in blocks of
+            this many spikes to bound the memory used.
+            Default=None
         :rtype: ndarray
         :returns: matrix with per component posterior probabilities [n, c]
         """
 
         # check obs
-        obs = sp.atleast_2d(obs)
-        if len(obs) == 0:
-            raise ValueError('no observations passed!')
-        data = []
-        if obs.ndim == 2:
-            if obs.shape[1] != self._tf * self._nc:
-                raise ValueError('data dimensions not compatible with model')
-            for i in xrange(obs.shape[0]):
-                data.append(obs[i])
-        elif obs.ndim == 3:
-            if obs.shape[1:] != (self._tf, self._nc):
-                raise ValueError('data dimensions not compatible with model')
-            for i in xrange(obs.shape[0]):
-                data.append(mcvec_to_conc(obs[i]))
-        data = sp.asarray(data, dtype=sp.float64)
+        data = self._obs_to_conc(obs)
 
         # build comps
         comps = self.get_template_set(mc=False)
@@ -722,27 +1179,29 @@ class BayesOptimalTemplateMatchingNode(FilterBankSortingNode):
             comps = sp.vstack((comps, sp.zeros((self._tf * self._nc))))
         comps = comps.astype(sp.float64)
         if len(comps) == 0:
-            return sp.zeros((len(obs), 1))
+            return sp.zeros((len(data), 1))
 
         # build priors
         prior = sp.array([self._lpr_s] * len(comps), dtype=sp.float64)
         if with_noise:
             prior[-1] = self._lpr_n
 
-        # get sigma
+        # get whitening
         try:
-            sigma = self._ce.get_cmx(tf=self._tf).astype(sp.float64)
+            whi = self._get_whitening()
         except:
-            return sp.zeros((len(obs), 1))
+            return sp.zeros((len(data), 1))
 
         # calc log probs
-        lpr = log_multivariate_normal_density(data, comps, sigma,
-                                              'tied') + prior
+        lpr = self._mahalanobis(data, comps, whi, block_size=block_size)
+        lpr += data.shape[1] * sp.log(2 * sp.pi) + whi[2]
+        lpr *= -0.5
+        lpr += prior
         logprob = logsumexp(lpr, axis=1)
         return sp.exp(lpr - logprob[:, sp.newaxis])
 
     def component_divergence(self, obs, with_noise=False, loading=False,
-                             subdim=None):
+                             subdim=None, block_size=None):
         """component probabilities under the model
 
         :type obs: ndarray
@@ -758,60 +1217,152 @@ class BayesOptimalTemplateMatchingNode(FilterBankSortingNode):
         :param subdim: dimensionality of subspace to build the inverse over.
             if None ignore
             Default=None
+        :type block_size: int
+        :param block_size: if not None, whiten the observations in blocks of
+            this many spikes to bound the memory used.
+            Default=None
         :rtype: ndarray
         :returns: divergence from means of current filter bank[n, c]
         """
 
         # check data
+        data = self._obs_to_conc(obs)
+
+        # build component
+        comps = self.get_template_set(mc=False)
+        if with_noise:
+            comps = sp.vstack((comps, sp.zeros((self._tf * self._nc))))
+        comps = comps.astype(sp.float64)
+        if len(comps) == 0:
+            return sp.ones((len(data), 1)) * sp.inf
+
+        # get whitening
+        try:
+            whi = self._get_whitening(loading=loading, subdim=subdim)
+        except:
+            return sp.ones((len(data), 1)) * sp.inf
+
+        # return component wise divergence
+        return self._mahalanobis(data, comps, whi, block_size=block_size)
+
+    def _obs_to_conc(self, obs):
+        """observations in channel concatenated form
+
+        :type obs: ndarray
+        :param obs: observations [n, tf, nc] or [n, tf*nc]
+        :rtype: ndarray
+        :returns: observations [n, tf*nc] as float64
+        """
+
         obs = sp.atleast_2d(obs)
         if len(obs) == 0:
             raise ValueError('no observations passed!')
-        data = []
         if obs.ndim == 2:
             if obs.shape[1] != self._tf * self._nc:
                 raise ValueError('data dimensions not compatible with model')
-            for i in xrange(obs.shape[0]):
-                data.append(obs[i])
         elif obs.ndim == 3:
             if obs.shape[1:] != (self._tf, self._nc):
                 raise ValueError('data dimensions not compatible with model')
-            for i in xrange(obs.shape[0]):
-                data.append(mcvec_to_conc(obs[i]))
-        data = sp.asarray(data, dtype=sp.float64)
+            # DOC: mcvec_to_conc for all observations at once
+            obs = obs.transpose(0, 2, 1).reshape(len(obs), -1)
+        else:
+            raise ValueError('data dimensions not compatible with model')
+        return sp.asarray(obs, dtype=sp.float64)
 
-        # build component
-        comps = self.get_template_set(mc=False)
-        if with_noise:
-            comps = sp.vstack((comps, sp.zeros((self._tf * self._nc))))
-        comps = comps.astype(sp.float64)
-        if len(comps) == 0:
-            return sp.ones((len(obs), 1)) * sp.inf
+    def _get_whitening(self, loading=False, subdim=None):
+        """whitening of the noise covariance matrix for tf
 
-        # get sigma
-        try:
-            if loading is True:
-                sigma_inv = self._ce.get_icmx_loaded(tf=self._tf).astype(
-                    sp.float64)
-            else:
-                sigma_inv = self._ce.get_icmx(tf=self._tf).astype(sp.float64)
+        The whitening W satisfies dot(W.T, W) = inverse covariance, so
+        Mahalanobis distances are squared norms of whitened vectors. It is
+        either the lower Cholesky factor L of the covariance (W = L^-1,
+        applied by triangular solves) or an explicit matrix from the svd of
+        the covariance. The result is cached until the covariance estimate
+        changes.
+
+        :type loading: bool
+        :param loading: if True, use the loaded matrix
+            Default=False
+        :type subdim: int
+        :param subdim: dimensionality of subspace to build the inverse over.
+            if None ignore
+            Default=None
+        :rtype: tuple
+        :returns: kind ('chol' or 'mx'), matrix, log determinant
+        """
+
+        key = (id(self._ce), self._ce.version, self._tf, bool(loading),
+               subdim)
+        if self._whi_key != key:
+            self._whi = None
             if subdim is not None:
                 subdim = int(subdim)
-                svd = self._ce.get_svd(tf=self._tf).astype(sp.float64)
-                sv = svd[1].copy()
-                t = sp.finfo(self._ce.dtype).eps * len(sv) * svd[1].max()
+                svd = self._ce.get_svd(tf=self._tf)
+                sv = svd[1].astype(sp.float64)
+                t = sp.finfo(self._ce.dtype).eps * len(sv) * sv.max()
                 sv[sv < t] = 0.0
-                sigma_inv = sp.dot(svd[0][:, :subdim],
-                                   sp.dot(sp.diag(1. / sv[:subdim]),
-                                          svd[2][:subdim]))
-        except:
-            return sp.ones((len(obs), 1)) * sp.inf
+                self._whi = (
+                    'mx',
+                    (svd[0][:, :subdim] / sp.sqrt(sv[:subdim])).T,
+                    sp.log(sv[:subdim]).sum())
+            else:
+                if loading is True:
+                    cmx = self._ce.get_cmx_loaded(tf=self._tf)
+                else:
+                    cmx = self._ce.get_cmx(tf=self._tf)
+                cmx = cmx.astype(sp.float64)
+                try:
+                    chol = sp_la.cholesky(cmx, lower=True)
+                    self._whi = (
+                        'chol', chol, 2.0 * sp.log(sp.diag(chol)).sum())
+                except sp_la.LinAlgError:
+                    # DOC: not positive definite, fall back to the svd
+                    u, sv, vh = sp_la.svd(cmx)
+                    self._whi = ('mx', (u / sp.sqrt(sv)).T,
+                                 sp.log(sv).sum())
+            self._whi_key = key
+        return self._whi
+
+    def _mahalanobis(self, data, comps, whi, block_size=None):
+        """squared Mahalanobis distances between observations and components
+
+        :type data: ndarray
+        :param data: observations [n, tf*nc]
+        :type comps: ndarray
+        :param comps: component means [c, tf*nc]
+        :type whi: tuple
+        :param whi: whitening as returned by `_get_whitening`
+        :type block_size: int
+        :param block_size: if not None, whiten the observations in blocks of
+            this many spikes.
+            Default=None
+        :rtype: ndarray
+        :returns: distances [n, c]
+        """
 
-        # return component wise divergence
-        rval = sp.zeros((obs.shape[0], comps.shape[0]), dtype=sp.float64)
-        for n in xrange(obs.shape[0]):
-            x = data[n] - comps
-            for c in xrange(comps.shape[0]):
-                rval[n, c] = sp.dot(x[c], sp.dot(sigma_inv, x[c]))
+        kind, mx = whi[:2]
+
+        def whiten(x):
+            if kind == 'chol':
+                return sp_la.solve_triangular(mx, x.T, lower=True,
+                                              check_finite=False)
+            return sp.dot(mx, x.T)
+
+        w_comps = whiten(comps)
+        sq_comps = (w_comps * w_comps).sum(0)
+        n = len(data)
+        if block_size is None:
+            block_size = max(1, n)
+        block_size = max(1, int(block_size))
+        rval = sp.empty((n, len(comps)), dtype=sp.float64)
+        for start in xrange(0, n, block_size):
+            w_data = whiten(data[start:start + block_size])
+            # DOC: |x - m|^2 = |x|^2 - 2 <x, m> + |m|^2 in whitened space
+            d = rval[start:start + block_size]
+            sp.dot(w_data.T, w_comps, out=d)
+            d *= -2.0
+            d += (w_data * w_data).sum(0)[:, sp.newaxis]
+            d += sq_comps
+            sp.maximum(d, 0.0, out=d)
         return rval
 
 # for legacy compatibility
@@ -826,8 +1377,17 @@ class AdaptiveBayesOptimalTemplateMatchingNode(
     covariances are adapted local temporal changes. In the forward sense a
     parallel spike detection is matched to find currently unidenified units
     in the data.
+
+    The adaptive sorting does not support `push`/`flush` and
+    `sort_parallel`. Filters and noise are adapted per call of the node, so
+    feed a stream by calling the node block by block. The inherited methods
+    sort with the current filter bank and do not adapt it, `sort_parallel`
+    adapts copies of the node that are discarded.
     """
 
+    # DOC: the detection and learning steps expect to see every chunk once
+    _chunk_carry = False
+
     def __init__(self, **kwargs):
         """
         :type learn_templates: int
@@ -1033,7 +1593,7 @@ class AdaptiveBayesOptimalTemplateMatchingNode(
                 mcdata(
                     data=self._chunk[ep[0]:ep[1]],
                     #other=self._disc[at[0]:at[1]], events=evts,
-                    other=self._disc[ep[0]:ep[1]],
+                    other=self._disc_slice(ep[0], ep[1]),
                     x_offset=ep[0],
                     events={0: [ev], 1: [data_ep[0] + self._tf]},
                     epochs={0: [data_ep], 1: [disc_ep]},
@@ -1046,7 +1606,7 @@ class AdaptiveBayesOptimalTemplateMatchingNode(
 
         start = max(0, disc_ep[0] - padding)
         stop = min(self._disc.shape[0], disc_ep[1] + padding)
-        return self._disc[start:stop, :].max() >= 0.0
+        return self._disc_slice(start, stop).max() >= 0.0
 
     def _post_sort(self):
         """check the spike sorting against multi unit"""
@@ -1243,9 +1803,10 @@ class AdaptiveBayesOptimalTemplateMatchingNode(
         """cluster step for initialisation"""
 
         # get all spikes and clear buffers
-        spks = self._det_buf[:].copy()
+        spks = self._det_buf[:]
         self._det_buf.clear()
         self._det_samples.clear()
+        rejected = []
 
         # noise covariance matrix, and scaling due to median average deviation
         C = self._ce.get_cmx(tf=self._tf, chan_set=self._chan_set)
@@ -1321,7 +1882,7 @@ class AdaptiveBayesOptimalTemplateMatchingNode(
         for i in sp.unique(lbls):
             spks_i = spks[lbls == i]
             if len(spks_i) < self._min_new_cluster_size:
-                self._det_buf.extend(spks_i)
+                rejected.append(spks_i)
                 if self.verbose.has_print:
                     print 'Unit %d rejected, only %d spikes' % (i, len(spks_i))
                 continue
@@ -1331,15 +1892,18 @@ class AdaptiveBayesOptimalTemplateMatchingNode(
             if self.verbose.has_print:
                 print 'Unit %d accepted, with %d spikes' % (i, len(spks_i))
         del pre_pro, clus, spks, spks_pp
+        for spks_i in rejected:
+            self._det_buf.extend(spks_i)
         self._cluster = self._cluster_base
 
     def _cluster_base(self):
         """cluster step for normal operation"""
 
         # get all spikes and clear buffer
-        spks = self._det_buf[:].copy()
+        spks = self._det_buf[:]
         self._det_buf.clear()
         self._det_samples.clear()
+        rejected = []
 
         # noise covariance matrix, and scaling due to median average deviation
         C = self._ce.get_cmx(tf=self._tf, chan_set=self._chan_set)
@@ -1369,7 +1933,7 @@ class AdaptiveBayesOptimalTemplateMatchingNode(
             spks_i = spks[lbls == i]
 
             if len(spks_i) < self._min_new_cluster_size:
-                self._det_buf.extend(spks_i)
+                rejected.append(spks_i)
                 if self.verbose.has_print:
                     print 'rejected, only %d spikes' % len(spks_i)
             else:
@@ -1378,6 +1942,8 @@ class AdaptiveBayesOptimalTemplateMatchingNode(
                 if self.verbose.has_print:
                     print 'accepted, with %d spikes' % len(spks_i)
         del pre_pro, clus, spks, spks_pp
+        for spks_i in rejected:
+            self._det_buf.extend(spks_i)
 
     def _update_mad_value(self, mad):
         """update the mad value if `mad_scaling` is True"""
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+#_____________________________________________________________________________
+#
+# Copyright (c) 2012 Berlin Institute of Technology
+# All rights reserved.
+#
+# Developed by:	Neural Information Processing Group (NI)
+#               School for Electrical Engineering and Computer Science
+#               Berlin Institute of Technology
+#               MAR 5-6, Marchstr. 23, 10587 Berlin, Germany
+#               http://www.ni.tu-berlin.de/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal with the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimers.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimers in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the names of Neural Information Processing Group (NI), Berlin
+#   Institute of Technology, nor the names of its contributors may be used to
+#   endorse or promote products derived from this Software without specific
+#   prior written permission.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# CONTRIBUTORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# WITH THE SOFTWARE.
+#_____________________________________________________________________________
+#
+# Acknowledgements:
+#   Philipp Meier <pmeier82@gmail.com>
+#_____________________________________________________________________________
+#
+
+
+
+##---IMPORTS
+
+try:
+    import unittest2 as ut
+except ImportError:
+    import unittest as ut
+
+import os
+import tempfile
+from numpy.testing import assert_equal
+import scipy as sp
+from botmpy.common import (ArrayChunkSource, MemmapChunkSource,
+                           ChunkSourceError, FilterWorkspace)
+
+##---TESTS
+
+class TestChunkSource(ut.TestCase):
+    def setUp(self):
+        self.data = (sp.arange(1003 * 3) % 300 - 150).astype(
+            sp.int16).reshape(-1, 3)
+        fd, self.filename = tempfile.mkstemp()
+        with os.fdopen(fd, 'wb') as f:
+            f.write('HEAD')
+            f.write(self.data.tostring())
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def testArray(self):
+        for prefetch in [0, 1, 3]:
+            src = ArrayChunkSource(self.data, chunk_size=100,
+                                   prefetch=prefetch)
+            chunks = list(src)
+            self.assertEqual(len(chunks), len(src))
+            self.assertEqual(len(chunks), 11)
+            self.assertEqual(chunks[-1].shape, (3, 3))
+            self.assertEqual(chunks[0].dtype, sp.int16)
+            assert_equal(sp.concatenate(chunks), self.data)
+        self.assertRaises(ChunkSourceError, ArrayChunkSource,
+                          self.data.ravel())
+
+    def testMemmap(self):
+        with MemmapChunkSource(self.filename, 3, offset=4, chunk_size=500,
+                               dtype=sp.float32) as src:
+            self.assertEqual(src.nsample, 1003)
+            self.assertEqual(src.nc, 3)
+            chunks = list(src)
+            self.assertEqual(chunks[0].dtype, sp.float32)
+            self.assertTrue(chunks[0].flags.c_contiguous)
+            assert_equal(sp.concatenate(chunks), self.data)
+            assert_equal(src.read(1000, 2000), self.data[1000:])
+
+            # read into a workspace region
+            ws = FilterWorkspace(5, 3, dtype=sp.float64)
+            out = src.read(100, 600, out=ws.reserve(500))
+            self.assertTrue(sp.may_share_memory(out, ws.load(out)))
+            assert_equal(out, self.data[100:600])
+            self.assertRaises(ValueError, src.read, 0, 10,
+                              out=sp.zeros((5, 3)))
+
+            # stop early
+            it = iter(src)
+            assert_equal(it.next(), self.data[:500])
+            it.close()
+        self.assertRaises(ChunkSourceError, MemmapChunkSource,
+                          self.filename, 3)
+
+    def testReadError(self):
+        class BrokenSource(ArrayChunkSource):
+            def _read(self, start, stop):
+                if start >= 200:
+                    raise IOError('broken')
+                return self._data[start:stop]
+
+        src = BrokenSource(self.data, chunk_size=100)
+        self.assertRaises(IOError, list, src)
+
+if __name__ == '__main__':
+    ut.main()
@@ -88,6 +88,16 @@ class TestCovarianceEstimator(ut.TestCase):
         should_be_eye20 = sp.dot(C_2_10, iC_2_10)
         assert_almost_equal(should_be_eye20, sp.eye(20), decimal=5)
 
+    def testVersion(self):
+        v = self.CE.version
+        self.CE.get_icmx(tf=20, chan_set=(0, 1, 2, 3))
+        self.assertEqual(self.CE.version, v)
+        self.CE.update(self.white_noise[:1000])
+        self.assertGreater(self.CE.version, v)
+        v = self.CE.version
+        self.CE.reset()
+        self.assertGreater(self.CE.version, v)
+
 ##---MAIN
 
 if __name__ == '__main__':
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+#_____________________________________________________________________________
+#
+# Copyright (c) 2012 Berlin Institute of Technology
+# All rights reserved.
+#
+# Developed by:	Neural Information Processing Group (NI)
+#               School for Electrical Engineering and Computer Science
+#               Berlin Institute of Technology
+#               MAR 5-6, Marchstr. 23, 10587 Berlin, Germany
+#               http://www.ni.tu-berlin.de/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal with the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimers.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimers in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the names of Neural Information Processing Group (NI), Berlin
+#   Institute of Technology, nor the names of its contributors may be used to
+#   endorse or promote products derived from this Software without specific
+#   prior written permission.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# CONTRIBUTORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# WITH THE SOFTWARE.
+#_____________________________________________________________________________
+#
+# Acknowledgements:
+#   Philipp Meier <pmeier82@gmail.com>
+#_____________________________________________________________________________
+#
+
+
+##---IMPORTS
+
+try:
+    import unittest2 as ut
+except ImportError:
+    import unittest as ut
+
+from numpy.testing import assert_equal
+import scipy as sp
+from botmpy.common import EventAccumulator, INDEX_DTYPE
+
+##---TESTS
+
+class TestEventAccumulator(ut.TestCase):
+    def setUp(self):
+        self.acc = EventAccumulator(capacity=2)
+
+    def testAppend(self):
+        for t, u in [(10, 1), (5, 0), (12, 1), (5, 1), (3, 1)]:
+            self.acc.append(t, u)
+        self.assertEqual(len(self.acc), 5)
+        self.assertEqual(self.acc.capacity, 8)
+        self.assertEqual(self.acc.events.dtype, INDEX_DTYPE)
+        assert_equal(self.acc.events[:, 0], [10, 5, 12, 5, 3])
+        # stable for equal times
+        assert_equal(self.acc.sorted_events(),
+                     [[3, 1], [5, 0], [5, 1], [10, 1], [12, 1]])
+        st = self.acc.spike_trains([0, 1, 2], offset=-1)
+        self.assertListEqual(sorted(st), [0, 1, 2])
+        assert_equal(st[0], [4])
+        assert_equal(st[1], [2, 4, 9, 11])
+        self.assertEqual(st[2].dtype, INDEX_DTYPE)
+        self.assertEqual(len(st[2]), 0)
+        self.assertListEqual(sorted(self.acc.spike_trains()), [0, 1])
+
+    def testExtend(self):
+        self.acc.extend(sp.arange(10), 3)
+        version = self.acc.version
+        self.acc.extend([], 2)
+        self.assertEqual(self.acc.version, version)
+        self.acc.extend(sp.array([20, 1]), sp.array([0, 1]))
+        self.assertNotEqual(self.acc.version, version)
+        self.assertEqual(len(self.acc), 12)
+        self.assertGreaterEqual(self.acc.capacity, 12)
+        st = self.acc.spike_trains()
+        assert_equal(st[3], sp.arange(10))
+        assert_equal(st[0], [20])
+        assert_equal(st[1], [1])
+        version = self.acc.version
+        self.acc.clear()
+        self.assertNotEqual(self.acc.version, version)
+        self.assertEqual(len(self.acc), 0)
+        self.assertEqual(self.acc.sorted_events().shape, (0, 2))
+        self.assertDictEqual(self.acc.spike_trains(), {})
+
+if __name__ == '__main__':
+    ut.main()
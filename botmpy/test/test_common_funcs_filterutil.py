@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+#_____________________________________________________________________________
+#
+# Copyright (c) 2012 Berlin Institute of Technology
+# All rights reserved.
+#
+# Developed by:	Neural Information Processing Group (NI)
+#               School for Electrical Engineering and Computer Science
+#               Berlin Institute of Technology
+#               MAR 5-6, Marchstr. 23, 10587 Berlin, Germany
+#               http://www.ni.tu-berlin.de/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal with the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimers.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimers in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the names of Neural Information Processing Group (NI), Berlin
+#   Institute of Technology, nor the names of its contributors may be used to
+#   endorse or promote products derived from this Software without specific
+#   prior written permission.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# CONTRIBUTORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# WITH THE SOFTWARE.
+#_____________________________________________________________________________
+#
+# Acknowledgements:
+#   Philipp Meier <pmeier82@gmail.com>
+#_____________________________________________________________________________
+#
+
+
+##---IMPORTS
+
+try:
+    import unittest2 as ut
+except ImportError:
+    import unittest as ut
+
+from numpy.testing import assert_equal, assert_almost_equal
+import scipy as sp
+from botmpy.common import xi_vs_f, mcvec_to_conc
+
+##---TESTS
+
+class TestXiVsF(ut.TestCase):
+    def testXiVsFRect(self, nc=2):
+        """cross-correlations of different template and filter sets"""
+
+        xis = sp.randn(3, 5 * nc)
+        fs = sp.randn(3, 5 * nc)
+        xvf = xi_vs_f(xis, fs, nc=nc)
+        assert_almost_equal(xi_vs_f(xis[1:], fs, nc=nc), xvf[1:])
+        assert_almost_equal(xi_vs_f(xis, fs[[0, 2]], nc=nc), xvf[:, [0, 2]])
+
+    def testXiVsFEven(self, nc=2):
+        """lag layout of the cross-correlations for even tf"""
+
+        xi = sp.array([[0, 1, 2, 0]] * nc, dtype=float).T
+        xvf = xi_vs_f(mcvec_to_conc(xi), mcvec_to_conc(xi), nc=nc)
+        assert_equal(xvf.shape, (1, 1, 7))
+        assert_almost_equal(xvf[0, 0], [0, 0, 2 * nc, 5 * nc, 2 * nc, 0, 0])
+
+if __name__ == '__main__':
+    ut.main()
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+#_____________________________________________________________________________
+#
+# Copyright (c) 2012 Berlin Institute of Technology
+# All rights reserved.
+#
+# Developed by:	Neural Information Processing Group (NI)
+#               School for Electrical Engineering and Computer Science
+#               Berlin Institute of Technology
+#               MAR 5-6, Marchstr. 23, 10587 Berlin, Germany
+#               http://www.ni.tu-berlin.de/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal with the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimers.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimers in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the names of Neural Information Processing Group (NI), Berlin
+#   Institute of Technology, nor the names of its contributors may be used to
+#   endorse or promote products derived from this Software without specific
+#   prior written permission.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# CONTRIBUTORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# WITH THE SOFTWARE.
+#_____________________________________________________________________________
+#
+# Acknowledgements:
+#   Philipp Meier <pmeier82@gmail.com>
+#_____________________________________________________________________________
+#
+
+
+##---IMPORTS
+
+try:
+    import unittest2 as ut
+except ImportError:
+    import unittest as ut
+
+from numpy.testing import assert_equal
+import scipy as sp
+from botmpy.common import overlaps, event_overlaps, overlap_mask
+
+##---TESTS
+
+class TestOverlaps(ut.TestCase):
+    def testOverlapPairs(self):
+        """every pair of spikes within the window counts"""
+
+        ovlp, ovlp_nums = overlaps({0: sp.array([0]), 1: sp.array([3, 5])}, 10)
+        assert_equal(ovlp[0], [True])
+        assert_equal(ovlp[1], [True, True])
+        ovlp, ovlp_nums = overlaps({0: sp.array([]), 1: sp.array([3])}, 10)
+        assert_equal(ovlp[1], [False])
+        assert_equal(ovlp_nums[0], 0)
+
+    def testEventOverlaps(self):
+        """overlap finder on event streams"""
+
+        times = sp.array([20, 50, 51, 150, 200, 250, 251, 299, 300])
+        units = sp.array([2, 0, 1, 0, 2, 0, 1, 2, 1])
+        assert_equal(event_overlaps(times, units, 10),
+                     [False, True, True, False, False, True, True, True,
+                      True])
+        assert_equal(event_overlaps(times, sp.zeros_like(units), 10),
+                     sp.zeros(times.size, dtype=bool))
+        assert_equal(event_overlaps([], [], 10).shape, (0,))
+
+    def testOverlapMask(self):
+        """overlap mask of a spike train against reference spikes"""
+
+        assert_equal(overlap_mask(sp.array([5, 40, 100]),
+                                  sp.array([0, 45, 120]), 10),
+                     [True, True, False])
+        assert_equal(overlap_mask(sp.array([5]), sp.array([]), 10), [False])
+
+if __name__ == '__main__':
+    ut.main()
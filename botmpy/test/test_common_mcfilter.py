@@ -48,12 +48,27 @@ try:
 except ImportError:
     import unittest as ut
 
+import copy
+import logging
+import sys
+import warnings
+
 from numpy.testing import assert_equal, assert_almost_equal
 import scipy as sp
 from botmpy.common.mcfilter.mcfilter_cy import (
-    _mcfilter_cy32, _mcfilter_cy64, _mcfilter_hist_cy32, _mcfilter_hist_cy64)
+    _mcfilter_cy32, _mcfilter_cy64, _mcfilter_hist_cy32, _mcfilter_hist_cy64,
+    _mcfilter_hist_bank_cy32_mt)
 from botmpy.common.mcfilter.mcfilter_py import (
-    _mcfilter_py, _mcfilter_hist_py)
+    _mcfilter_py, _mcfilter_hist_py, _mcfilter_hist_bank_py)
+from botmpy.common.mcfilter import mcfilter_fft
+from botmpy.common.mcfilter.mcfilter_fft import (
+    _mcfilter_fft, _mcfilter_hist_fft, _mcfilter_hist_bank_fft)
+from botmpy.common.mcfilter import (
+    mcfilter, mcfilter_hist, mcfilter_hist_bank, mcfilter_valid_bank,
+    FilterWorkspace, WorkspaceArena, LowRankFilterBank)
+
+# the package, botmpy.common.mcfilter is shadowed by the function
+mcfilter_mod = sys.modules['botmpy.common.mcfilter']
 
 ##---TESTS
 
@@ -78,6 +93,20 @@ class TestMcFilter(ut.TestCase):
         fout, hist = _mcfilter_hist_cy64(data, filt, hist)
         assert_equal(hist, data[-(tf - 1):])
 
+    def testHistoryPy(self):
+        """test history item"""
+        tf = 7
+        nc = 2
+        data = sp.randn(100, nc)
+        filt = sp.randn(tf, nc)
+        hist = sp.randn(tf - 1, nc)
+        fopy, hopy = _mcfilter_hist_py(data[:3], filt, hist.copy())
+        focy, hocy = _mcfilter_hist_cy64(data[:3], filt, hist.copy())
+        assert_almost_equal(fopy, focy)
+        assert_equal(hopy, hocy)
+        fopy, hopy = _mcfilter_hist_py(data, filt, hopy)
+        assert_equal(hopy, data[-(tf - 1):])
+
     def testPyVsCyOnesCy32(self):
         """test python and cython, float"""
         tf = 3
@@ -177,6 +206,370 @@ class TestMcFilter(ut.TestCase):
         self.assertTupleEqual(data.shape, (fout.shape[0], 1))
         assert_equal(data, sp.array([fout]).T)
 
+    def testFftVsCyHist32(self):
+        for tf in [3, 8, 47, 64]:
+            nc = 4
+            data = sp.randn(1000, nc).astype(sp.float32)
+            filt = sp.randn(tf, nc).astype(sp.float32)
+            hist_cy = sp.randn(tf - 1, nc).astype(sp.float32)
+            hist_fft = hist_cy.copy()
+            focy, hocy = _mcfilter_hist_cy32(data, filt, hist_cy)
+            fofft, hofft = _mcfilter_hist_fft(data, filt, hist_fft)
+            self.assertEqual(fofft.dtype, sp.float32)
+            assert_almost_equal(fofft, focy, decimal=3)
+            assert_equal(hofft, hocy)
+
+    def testFftVsCyHist64(self):
+        for tf in [3, 8, 47, 64]:
+            nc = 4
+            data = sp.randn(1000, nc)
+            filt = sp.randn(tf, nc)
+            hist_cy = sp.randn(tf - 1, nc)
+            hist_fft = hist_cy.copy()
+            focy, hocy = _mcfilter_hist_cy64(data, filt, hist_cy)
+            fofft, hofft = _mcfilter_hist_fft(data, filt, hist_fft)
+            assert_almost_equal(fofft, focy, decimal=9)
+            assert_equal(hofft, hocy)
+
+    def testFftVsCy64(self):
+        for tf in [3, 8, 47, 64]:
+            data = sp.randn(1000, 4)
+            filt = sp.randn(tf, 4)
+            assert_almost_equal(_mcfilter_fft(data, filt),
+                                _mcfilter_cy64(data, filt))
+
+    def testFftBatches(self):
+        tf, nc = 21, 4
+        data = (sp.randn(5000, nc) * 1000).astype(sp.int16)
+        filt = sp.randn(tf, nc)
+        fout_all = mcfilter_hist(data.astype(sp.float64), filt,
+                                 method='direct')[0]
+        batch_size = mcfilter_fft.FFT_BATCH_SIZE
+        try:
+            # a few blocks per batch
+            mcfilter_fft.FFT_BATCH_SIZE = 3 * 128 * nc
+            fout = mcfilter_hist(data, filt, method='fft')[0]
+            assert_almost_equal(fout / 100.0, fout_all / 100.0, decimal=4)
+        finally:
+            mcfilter_fft.FFT_BATCH_SIZE = batch_size
+
+    def testPyFallbackInfo(self):
+        data = sp.randn(100, 2)
+        filt = sp.randn(5, 2)
+        state = mcfilter_mod.USE_CYTHON, mcfilter_mod._PY_FALLBACK_REPORTED
+        records = []
+        handler = logging.Handler()
+        handler.emit = records.append
+        logger = logging.getLogger()
+        level = logger.level
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        try:
+            mcfilter_mod.USE_CYTHON = False
+            mcfilter_mod._PY_FALLBACK_REPORTED = False
+            with warnings.catch_warnings(record=True) as w:
+                warnings.simplefilter('always')
+                for _ in xrange(2):
+                    fout = mcfilter_mod._py_fallback(_mcfilter_py, data, filt)
+            assert_equal(fout, _mcfilter_py(data, filt))
+            self.assertEqual(len(w), 0)
+            self.assertEqual(len(records), 1)
+            self.assertEqual(records[0].levelno, logging.INFO)
+            self.assertIn('Msamples/s', records[0].getMessage())
+        finally:
+            logger.removeHandler(handler)
+            logger.setLevel(level)
+            mcfilter_mod.USE_CYTHON, mcfilter_mod._PY_FALLBACK_REPORTED = state
+
+    def testFftShortChunk(self):
+        tf, nc = 65, 2
+        data = sp.randn(10, nc)
+        filt = sp.randn(tf, nc)
+        hist = sp.randn(tf - 1, nc)
+        focy, hocy = _mcfilter_hist_cy64(data, filt, hist.copy())
+        fofft, hofft = _mcfilter_hist_fft(data, filt, hist.copy())
+        assert_almost_equal(fofft, focy)
+        assert_equal(hofft, hocy)
+
+    def testFftChunkedStream(self):
+        tf, nc = 47, 4
+        data = sp.randn(3000, nc)
+        filt = sp.randn(tf, nc)
+        fout_all = mcfilter_hist(data, filt, method='direct')[0]
+        fouts, hist = [], None
+        for i in xrange(0, 3000, 700):
+            fout, hist = mcfilter_hist(data[i:i + 700], filt, hist,
+                                       method='fft')
+            fouts.append(fout)
+        assert_almost_equal(sp.concatenate(fouts), fout_all)
+
+    def testMethodSelection(self):
+        data = sp.randn(1000, 2)
+        filt = sp.randn(5, 2)
+        self.assertRaises(ValueError, mcfilter, data, filt, method='foo')
+        assert_almost_equal(mcfilter(data, filt, method='fft'),
+                            mcfilter(data, filt, method='direct'))
+        # serially the numpy kernels are used for a single filter
+        select = mcfilter_mod._select_method
+        self.assertEqual(select('direct', 1000, 5, 2, sp.float32),
+                         'correlate')
+        self.assertEqual(select('auto', 1000, 5, 2, sp.float32),
+                         'correlate')
+        self.assertEqual(select('fft', 1000, 5, 2, sp.float32), 'fft')
+        self.assertEqual(select('direct', 1000, 5, 2, sp.float32, nf=1),
+                         'direct')
+        if mcfilter_mod.USE_CYTHON is True:
+            self.assertEqual(
+                select('direct', 1000, 5, 2, sp.float32, num_threads=2),
+                'direct')
+            assert_almost_equal(
+                mcfilter_hist(data, filt, method='direct', num_threads=2)[0],
+                mcfilter_hist(data, filt, method='direct')[0])
+
+    def testBankVsSingle(self):
+        nf, tf, nc = 5, 47, 4
+        data = sp.randn(2000, nc)
+        filt = sp.randn(nf, tf, nc)
+        hist = sp.randn(tf - 1, nc)
+        for kernel in [_mcfilter_hist_bank_py, _mcfilter_hist_bank_fft]:
+            fout, hout = kernel(data, filt, hist.copy())
+            self.assertTupleEqual(fout.shape, (2000, nf))
+            for i in xrange(nf):
+                focy, hocy = _mcfilter_hist_cy64(data, filt[i], hist.copy())
+                assert_almost_equal(fout[:, i], focy)
+                assert_equal(hout, hocy)
+
+    def testBankChunkedStream(self):
+        nf, tf, nc = 3, 21, 2
+        data = sp.randn(1500, nc).astype(sp.float32)
+        filt = sp.randn(nf, tf, nc).astype(sp.float32)
+        fout_all = mcfilter_hist_bank(data, filt, method='direct')[0]
+        for method in ['direct', 'fft']:
+            fouts, hist = [], None
+            for i in xrange(0, 1500, 400):
+                fout, hist = mcfilter_hist_bank(data[i:i + 400], filt, hist,
+                                                method=method)
+                self.assertEqual(fout.dtype, sp.float32)
+                fouts.append(fout)
+            assert_almost_equal(sp.vstack(fouts), fout_all, decimal=4)
+
+    def testThreaded(self):
+        tf, nc = 21, 3
+        data = sp.randn(1000, nc)
+        filt = sp.randn(4, tf, nc)
+        hist = sp.randn(tf - 1, nc)
+        for num_threads in [2, 3, None]:
+            assert_almost_equal(
+                mcfilter(data, filt[0], method='direct',
+                         num_threads=num_threads),
+                mcfilter(data, filt[0], method='direct'))
+            fout, hout = mcfilter_hist(data, filt[0], hist.copy(),
+                                       method='direct',
+                                       num_threads=num_threads)
+            focy, hocy = _mcfilter_hist_cy64(data, filt[0], hist.copy())
+            assert_almost_equal(fout, focy)
+            assert_equal(hout, hocy)
+
+    def testThreadedBank(self):
+        tf, nc = 21, 3
+        data = sp.randn(1000, nc).astype(sp.float32)
+        filt = sp.randn(4, tf, nc).astype(sp.float32)
+        hist = sp.randn(tf - 1, nc).astype(sp.float32)
+        fopy, hopy = _mcfilter_hist_bank_py(data, filt, hist.copy())
+        for num_threads in [1, 2, 5]:
+            fout, hout = _mcfilter_hist_bank_cy32_mt(data, filt, hist.copy(),
+                                                     num_threads)
+            assert_almost_equal(fout, fopy, decimal=4)
+            assert_equal(hout, hopy)
+
+    def testValidBankStridedOut(self):
+        tf, nc = 21, 3
+        data = sp.randn(1000 + tf - 1, nc)
+        filt = sp.randn(6, tf, nc)
+        fout_all = mcfilter_valid_bank(data, filt, method='direct')
+        for method, num_threads in [('direct', 1), ('direct', 4),
+                                    ('fft', 1)]:
+            out = sp.empty((1000, 6))
+            out.fill(sp.nan)
+            view = out[:, 2:5]
+            rval = mcfilter_valid_bank(data, filt[2:5], method=method,
+                                       num_threads=num_threads, out=view)
+            self.assertIs(rval, view)
+            assert_almost_equal(out[:, 2:5], fout_all[:, 2:5])
+            self.assertTrue(sp.isnan(out[:, [0, 1, 5]]).all())
+
+    def testWorkspace(self):
+        tf, nc = 21, 2
+        data = sp.randn(1000, nc + 1)
+        filt = sp.randn(tf, nc)
+        fout_all, hist_all = mcfilter_hist(data[:, 1:], filt, method='direct')
+        for method in ['direct', 'fft']:
+            ws = FilterWorkspace(tf, nc, chan_set=(1, 2))
+            fouts = []
+            # chunks shorter than the history and a growing capacity
+            for a, b in [(0, 5), (5, 300), (300, 310), (310, 1000)]:
+                fout, ws = mcfilter_hist(data[a:b], filt, ws, method=method)
+                fouts.append(fout)
+            assert_almost_equal(sp.concatenate(fouts), fout_all)
+            assert_equal(ws.hist, hist_all)
+            self.assertEqual(ws.capacity, 690)
+
+    def testWorkspaceDtype(self):
+        tf, nc = 5, 2
+        self.assertRaises(ValueError, FilterWorkspace, tf, nc,
+                          dtype=sp.int32)
+        ws = FilterWorkspace(tf, nc)
+        self.assertRaises(ValueError, ws.load, sp.zeros((10, nc), sp.uint8))
+        self.assertIsNone(ws.dtype)
+        ws.load(sp.ones((10, nc), dtype=sp.int16))
+        self.assertEqual(ws.dtype, sp.int16)
+        # float data would be truncated into the int16 history
+        self.assertRaises(ValueError, ws.load,
+                          sp.ones((10, nc), dtype=sp.float64) * 0.5)
+        ws = FilterWorkspace(tf, nc, dtype=sp.float64)
+        data = ws.load(sp.ones((10, nc), dtype=sp.float32) * 0.5)
+        self.assertEqual(data.dtype, sp.float64)
+        assert_equal(data[tf - 1:], 0.5)
+
+    def testWorkspaceReserve(self):
+        tf, nc = 21, 2
+        data = sp.randn(1000, nc)
+        filt = sp.randn(tf, nc)
+        fout_all, hist_all = mcfilter_hist(data, filt, method='direct')
+        ws = FilterWorkspace(tf, nc, dtype=sp.float32)
+        assert_equal(ws.hist, sp.zeros((tf - 1, nc), dtype=sp.float32))
+        ws = FilterWorkspace(tf, nc)
+        fouts = []
+        for a, b in [(0, 5), (5, 300), (300, 1000)]:
+            chunk = ws.reserve(b - a, dtype=data.dtype)
+            chunk[:] = data[a:b]
+            # the reserved region is filtered without another copy
+            self.assertTrue(sp.may_share_memory(ws.load(chunk), chunk))
+            fout, ws = mcfilter_hist(chunk, filt, ws, method='direct')
+            fouts.append(fout)
+        assert_almost_equal(sp.concatenate(fouts), fout_all)
+        assert_almost_equal(ws.hist, hist_all)
+        self.assertRaises(ValueError, ws.reserve, 10, dtype=sp.complex128)
+
+    def testWorkspaceBank(self):
+        nf, tf, nc = 3, 21, 2
+        data = sp.randn(1000, nc).astype(sp.float32)
+        filt = sp.randn(nf, tf, nc).astype(sp.float32)
+        fout_all = mcfilter_hist_bank(data, filt, method='direct')[0]
+        for method, num_threads in [('direct', 1), ('direct', 2), ('fft', 1)]:
+            ws = FilterWorkspace(tf, nc, capacity=500)
+            fouts = []
+            for i in xrange(0, 1000, 250):
+                fout, ws = mcfilter_hist_bank(data[i:i + 250], filt, ws,
+                                              method=method,
+                                              num_threads=num_threads)
+                self.assertEqual(fout.dtype, sp.float32)
+                fouts.append(fout)
+            assert_almost_equal(sp.vstack(fouts), fout_all, decimal=4)
+            self.assertEqual(ws.capacity, 500)
+        ws.reset()
+        assert_equal(ws.hist, sp.zeros((tf - 1, nc)))
+
+    def testArena(self):
+        nf, tf, nc = 3, 21, 2
+        data = sp.randn(1000, nc).astype(sp.float32)
+        filt = sp.randn(nf, tf, nc).astype(sp.float32)
+        fout_all = mcfilter_hist_bank(data, filt, method='direct')[0]
+        arena = WorkspaceArena()
+        for method in ['direct', 'fft']:
+            ws = FilterWorkspace(tf, nc)
+            fouts = []
+            for a, b in [(0, 250), (250, 600), (600, 700), (700, 1000)]:
+                out = arena.get('fout', (b - a, nf), sp.float32)
+                fout, ws = mcfilter_hist_bank(data[a:b], filt, ws,
+                                              method=method, out=out)
+                self.assertIs(fout, out)
+                fouts.append(fout.copy())
+            assert_almost_equal(sp.vstack(fouts), fout_all, decimal=4)
+        # grown once, reused for the shorter chunks
+        self.assertEqual(arena.n_alloc, 2)
+        self.assertEqual(arena.n_request, 8)
+        self.assertEqual(arena.nbytes, 350 * nf * 4)
+        self.assertEqual(arena.peak_nbytes, 350 * nf * 4)
+        # new allocation for a changed trailing shape or dtype
+        self.assertEqual(arena.get('fout', (10, nf + 1), sp.float32).shape,
+                         (10, nf + 1))
+        arena.get('fout', (10, nf + 1), sp.float64)
+        self.assertEqual(arena.n_alloc, 4)
+        self.assertEqual(arena.nbytes, 10 * (nf + 1) * 8)
+        self.assertEqual(arena.peak_nbytes, 350 * nf * 4)
+        # copies start empty
+        self.assertEqual(copy.deepcopy(arena).nbytes, 0)
+        arena.clear()
+        self.assertEqual(arena.nbytes, 0)
+
+    def testBankEmpty(self):
+        data = sp.randn(100, 2)
+        fout, hist = mcfilter_hist_bank(data, sp.zeros((0, 5, 2)))
+        self.assertTupleEqual(fout.shape, (100, 0))
+        assert_equal(hist, data[-4:])
+
+    def testInt16(self):
+        tf, nc = 21, 4
+        data = (sp.randn(1000, nc) * 1000).astype(sp.int16)
+        filt = sp.randn(tf, nc).astype(sp.float32)
+        gain = sp.array([0.1, 0.2, 0.5, 1.0])
+        fout_all = mcfilter_hist(data.astype(sp.float64),
+                                 filt.astype(sp.float64) * gain)[0]
+        for method in ['direct', 'fft']:
+            fout, hist = mcfilter_hist(data, filt, gain=gain, method=method)
+            self.assertEqual(fout.dtype, sp.float32)
+            self.assertEqual(hist.dtype, sp.int16)
+            assert_equal(hist, data[-(tf - 1):])
+            assert_almost_equal(fout / 100.0, fout_all / 100.0, decimal=4)
+            ws = FilterWorkspace(tf, nc)
+            fouts = []
+            for i in xrange(0, 1000, 250):
+                fout, ws = mcfilter_hist(data[i:i + 250], filt, ws,
+                                         method=method, gain=gain)
+                fouts.append(fout)
+            self.assertEqual(ws.dtype, sp.int16)
+            assert_almost_equal(sp.hstack(fouts) / 100.0, fout_all / 100.0,
+                                decimal=4)
+        self.assertRaises(TypeError, mcfilter_hist_bank, data, filt[None],
+                          FilterWorkspace(tf, nc))
+
+    def testLowRankFull(self):
+        nf, tf, nc = 3, 21, 4
+        data = sp.randn(1000, nc)
+        filt = sp.randn(nf, tf, nc)
+        lr = LowRankFilterBank(rank=nc).fit(filt)
+        assert_almost_equal(lr.reconstruct(), filt)
+        assert_almost_equal(lr.error, sp.zeros(nf))
+        ws = FilterWorkspace(tf, nc)
+        fouts, hist = [], None
+        for i in xrange(0, 1000, 250):
+            fout, ws = lr.mcfilter_hist(data[i:i + 250], ws)
+            fouts.append(fout)
+            fout, hist = lr.mcfilter_hist(data[i:i + 250], hist)
+            assert_almost_equal(fout, fouts[-1])
+        assert_almost_equal(sp.vstack(fouts),
+                            mcfilter_hist_bank(data, filt)[0])
+
+    def testLowRankSeparable(self):
+        nf, tf, nc = 2, 21, 16
+        data = sp.randn(500, nc)
+        filt = sp.asarray([sp.outer(sp.randn(tf), sp.randn(nc))
+                           for _ in xrange(nf)])
+        filt += 1e-3 * sp.randn(nf, tf, nc)
+        lr = LowRankFilterBank(tol=0.01).fit(filt)
+        assert_equal(lr.ranks, [1, 1])
+        self.assertTrue(sp.all(lr.error < 0.01))
+        dense, lowrank = lr.flops
+        self.assertEqual(dense, nf * tf * nc)
+        self.assertEqual(lowrank, nf * (tf + nc))
+        fout = lr.mcfilter_hist(data)[0]
+        assert_almost_equal(fout,
+                            mcfilter_hist_bank(data, lr.reconstruct())[0])
+        self.assertFalse(lr.update(filt))
+        self.assertTrue(lr.update(filt[:1]))
+        self.assertEqual(lr.nf, 1)
+
 """
 def mcfilter_hist_py_test(inp=None, plot=False):
     if inp is None:
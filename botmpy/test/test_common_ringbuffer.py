@@ -135,6 +135,35 @@ class TestMxRingbuffer(ut.TestCase):
         assert_equal(self.rb.mean(2), sp.eye(4) * 5.5)
         assert_equal(self.rb.mean(1), sp.eye(4) * 6.0)
 
+    def testMeanRunning(self):
+        """running sum mean against the mean of the contents"""
+
+        rb = MxRingBuffer(50, (3, 2), dtype=sp.float64)
+        for i in xrange(173):
+            rb.append(sp.randn(3, 2) * 100)
+            for last in [None, 1, 7, 30, 49, 50]:
+                assert_almost_equal(rb.mean(last), sp.mean(rb[-last:], axis=0)
+                                    if last else sp.mean(rb[:], axis=0))
+        rb.fill(sp.ones((3, 2)))
+        assert_equal(rb.mean(), sp.ones((3, 2)))
+        rb.clear()
+        assert_equal(rb.mean(), sp.zeros((3, 2)))
+
+    def testExtend(self):
+        """batch extend against appending one by one"""
+
+        rb1 = MxRingBuffer(7, (2,), dtype=sp.float64)
+        rb2 = MxRingBuffer(7, (2,), dtype=sp.float64)
+        for m in [0, 1, 3, 5, 7, 2, 16, 6]:
+            items = sp.randn(m, 2)
+            rb1.extend(items)
+            for item in items:
+                rb2.append(item)
+            self.assertEqual(len(rb1), len(rb2))
+            assert_equal(rb1[:], rb2[:])
+            assert_almost_equal(rb1.mean(), rb2.mean())
+        self.assertRaises(ValueError, rb1.extend, sp.zeros((3, 4)))
+
     def testIndexing(self):
         """test for indexing elements and slices"""
 
@@ -153,5 +182,56 @@ class TestMxRingbuffer(ut.TestCase):
             assert_equal(self.rb[i], sp.eye(4) * (i + 4))
         assert_equal(self.rb[:2], sp.array([sp.eye(4) * 4, sp.eye(4) * 5]))
 
+    def testSegments(self):
+        """zero-copy views on the contents"""
+
+        rb = MxRingBuffer(5, (2,), dtype=sp.float64)
+        for n in xrange(12):
+            rb.append([n, -n])
+            segs = rb.segments()
+            self.assertLessEqual(len(segs), 2)
+            content = sp.concatenate(segs)
+            assert_equal(content, rb[:])
+            assert_equal(content, sp.array(list(rb)))
+            for seg in segs:
+                self.assertTrue(seg.base is rb._data or seg is rb._data)
+        self.assertEqual(len(rb.segments()), 2)
+        assert_equal(rb[1:4], [[8, -8], [9, -9], [10, -10]])
+        assert_equal(rb[::2], [[7, -7], [9, -9], [11, -11]])
+        assert_equal(rb[-1], [11, -11])
+        v = rb.version
+        lin = rb.linearize()
+        self.assertEqual(rb.version, v)
+        assert_equal(lin, sp.arange(7, 12)[:, None] * [1, -1])
+        self.assertEqual(len(rb.segments()), 1)
+        self.assertTrue(lin.base is rb._data)
+        # indexing copies
+        content, first = rb[:], rb[0]
+        self.assertFalse(sp.may_share_memory(content, rb._data))
+        self.assertFalse(sp.may_share_memory(first, rb._data))
+        rb.append([12, -12])
+        assert_equal(rb[:], sp.arange(8, 13)[:, None] * [1, -1])
+        assert_equal(content, sp.arange(7, 12)[:, None] * [1, -1])
+        assert_equal(first, [7, -7])
+        assert_almost_equal(rb.mean(3), [11, -11])
+
+    def testVersion(self):
+        """modification counter"""
+
+        v = self.rb.version
+        self.rb.append(sp.eye(4))
+        self.assertEqual(self.rb.version, v + 1)
+        self.rb.extend([sp.eye(4)] * 3)
+        self.assertGreater(self.rb.version, v + 1)
+        v = self.rb.version
+        self.rb.mean()
+        self.rb[0]
+        self.assertEqual(self.rb.version, v)
+        self.rb.fill(sp.eye(4))
+        self.assertGreater(self.rb.version, v)
+        v = self.rb.version
+        self.rb.clear()
+        self.assertGreater(self.rb.version, v)
+
 if __name__ == '__main__':
     ut.main()
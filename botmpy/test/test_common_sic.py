@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+#_____________________________________________________________________________
+#
+# Copyright (c) 2012 Berlin Institute of Technology
+# All rights reserved.
+#
+# Developed by:	Neural Information Processing Group (NI)
+#               School for Electrical Engineering and Computer Science
+#               Berlin Institute of Technology
+#               MAR 5-6, Marchstr. 23, 10587 Berlin, Germany
+#               http://www.ni.tu-berlin.de/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal with the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimers.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimers in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the names of Neural Information Processing Group (NI), Berlin
+#   Institute of Technology, nor the names of its contributors may be used to
+#   endorse or promote products derived from this Software without specific
+#   prior written permission.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# CONTRIBUTORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# WITH THE SOFTWARE.
+#_____________________________________________________________________________
+#
+# Acknowledgements:
+#   Philipp Meier <pmeier82@gmail.com>
+#_____________________________________________________________________________
+#
+
+##---IMPORTS
+
+try:
+    import unittest2 as ut
+except ImportError:
+    import unittest as ut
+
+from numpy.testing import assert_equal
+import scipy as sp
+from scipy import linalg as sp_la
+from botmpy.common import sic_epoch, sic_subtrahends, shifted_matrix_sub
+from botmpy.common.sic import USE_CYTHON, _sic_epoch_py
+
+##---FUNCTIONS
+
+def sic_epoch_ref(ep_disc, ep_fout, xcorrs, lpr_n, lpr_s, max_iter):
+    """reference loop, as formerly used in the BOTM sorter"""
+
+    tf = (xcorrs.shape[2] + 1) // 2
+    ep_fout_norm = sp_la.norm(ep_fout)
+    events = []
+    niter = 0
+    while sp.nanmax(ep_disc) > lpr_n:
+        niter += 1
+        if niter > max_iter:
+            break
+        ep_t = sp.nanargmax(sp.nanmax(ep_disc, axis=1))
+        ep_c = sp.nanargmax(ep_disc[ep_t])
+        sub = shifted_matrix_sub(sp.zeros_like(ep_disc), xcorrs[ep_c].T,
+                                 ep_t - tf + 1)
+        if ep_fout_norm > sp_la.norm(ep_fout + sub):
+            ep_disc += sub + lpr_s
+            events.append((ep_t, ep_c))
+        else:
+            break
+    return events, niter
+
+##---TESTS
+
+class TestSic(ut.TestCase):
+    def setUp(self):
+        self.rs = sp.random.RandomState(0)
+
+    def epoch(self, nf, tf, ns, n_spk, dtype):
+        xcorrs = self.rs.randn(nf, nf, 2 * tf - 1)
+        xcorrs[range(nf), range(nf), tf - 1] = 30.0
+        fout = self.rs.randn(ns, nf)
+        for t, c in zip(self.rs.randint(0, ns, n_spk),
+                        self.rs.randint(0, nf, n_spk)):
+            lo, hi = max(0, t - tf + 1), min(ns, t + tf)
+            fout[lo:hi] += xcorrs[c].T[lo - t + tf - 1:hi - t + tf - 1]
+        fout = fout.astype(dtype)
+        return fout - 10.0, fout, xcorrs
+
+    def testSubtrahends(self):
+        xcorrs = self.rs.randn(3, 3, 9)
+        sub = sic_subtrahends(xcorrs, sp.float32)
+        self.assertTupleEqual(sub.shape, (3, 9, 3))
+        self.assertEqual(sub.dtype, sp.float32)
+        assert_equal(sub[1, :, 2], xcorrs[1, 2].astype(sp.float32))
+
+    def testAgainstReference(self):
+        """cython and python implementation agree with the reference"""
+
+        for dtype in [sp.float32, sp.float64]:
+            for nf, tf, ns, n_spk in [(1, 5, 30, 2), (4, 11, 80, 6),
+                                      (8, 21, 200, 12)]:
+                disc, fout, xcorrs = self.epoch(nf, tf, ns, n_spk, dtype)
+                sub = sic_subtrahends(xcorrs, dtype)
+                disc_ref = disc.copy()
+                rval_ref = sic_epoch_ref(disc_ref, fout, xcorrs, 0.0, -1.0,
+                                         2 * nf)
+                self.assertGreater(len(rval_ref[0]), 0)
+                disc_py = disc.copy()
+                rval_py = _sic_epoch_py(disc_py, fout, sub, 0.0, -1.0, None,
+                                        0, 2 * nf)
+                self.assertEqual(rval_py, rval_ref)
+                assert_equal(disc_py, disc_ref)
+                disc_dispatch = disc.copy()
+                rval_dispatch = sic_epoch(disc_dispatch, fout, sub, 0.0, -1.0)
+                self.assertEqual(rval_dispatch, rval_ref)
+                assert_equal(disc_dispatch, disc_ref)
+
+    def testBias(self):
+        disc, fout, xcorrs = self.epoch(4, 11, 80, 4, sp.float64)
+        sub = sic_subtrahends(xcorrs)
+        disc_py, disc_dispatch = disc.copy(), disc.copy()
+        rval_py = _sic_epoch_py(disc_py, fout, sub, 0.0, -1.0, 2.5, 5, 8)
+        rval_dispatch = sic_epoch(disc_dispatch, fout, sub, 0.0, -1.0,
+                                  bias=2.5, extend=5)
+        self.assertEqual(rval_py, rval_dispatch)
+        assert_equal(disc_py, disc_dispatch)
+
+    def testShapeMismatch(self):
+        disc, fout, xcorrs = self.epoch(4, 11, 80, 4, sp.float64)
+        sub = sic_subtrahends(xcorrs)
+        self.assertRaises(ValueError, sic_epoch, disc, fout[:, :3], sub, 0.0,
+                          -1.0)
+        self.assertRaises(ValueError, sic_epoch, disc, fout, sub[:3], 0.0,
+                          -1.0)
+
+    @ut.skipIf(USE_CYTHON is False, 'Cython implementation not built')
+    def testCython(self):
+        from botmpy.common.sic.sic_cy import _sic_epoch_cy
+
+        disc, fout, xcorrs = self.epoch(6, 15, 150, 10, sp.float32)
+        sub = sic_subtrahends(xcorrs, sp.float32)
+        disc_py, disc_cy = disc.copy(), disc.copy()
+        rval_py = _sic_epoch_py(disc_py, fout, sub, 0.0, -1.0, 1.0, 3, 12)
+        rval_cy = _sic_epoch_cy(disc_cy, fout, sub, 0.0, -1.0, 1.0, 3, 12)
+        self.assertEqual(rval_py, rval_cy)
+        assert_equal(disc_py, disc_cy)
+
+if __name__ == '__main__':
+    ut.main()
@@ -48,11 +48,13 @@ try:
 except ImportError:
     import unittest as ut
 
+import cPickle as pickle
 from numpy.testing import assert_equal, assert_almost_equal
 import scipy as sp
 from botmpy.common import (TimeSeriesCovE, mcfilter, mcvec_to_conc,
-                            mcvec_from_conc)
-from botmpy.nodes import MatchedFilterNode, NormalisedMatchedFilterNode
+                            mcvec_from_conc, xi_vs_f)
+from botmpy.nodes import (MatchedFilterNode, NormalisedMatchedFilterNode,
+                          FilterBankNode)
 
 ##---TESTS
 
@@ -79,6 +81,123 @@ class TestFilterNodes(ut.TestCase):
         assert_equal(mf_h.f, f)
         assert_equal(nmf_h.f, f / nf)
 
+    def testFilterBankVsFilters(self):
+        tf = self.tf - 1
+        xi = self.xi[:tf]
+        fb = FilterBankNode(tf=tf, ce=self.ce, filter_cls=MatchedFilterNode,
+                            dtype=sp.float64)
+        fb.create_filter(xi)
+        fb.create_filter(xi[::-1])
+        x = self.noise
+        fouts = [fb(x[:300]), fb(x[300:])]
+        for k, i in enumerate(fb._idx_active_set):
+            assert_almost_equal(sp.vstack(fouts)[:, k], fb.bank[i](x))
+
+    def testFilterBankWorkers(self):
+        tf = self.tf - 1
+        xi = self.xi[:tf]
+        fbs = [FilterBankNode(tf=tf, ce=self.ce, filter_cls=MatchedFilterNode,
+                              dtype=sp.float64, workers=w) for w in [1, 3]]
+        for fb in fbs:
+            for k in xrange(7):
+                fb.create_filter(xi * (k + 1) + k)
+        x = self.noise
+        fouts = [sp.vstack([fb(x[:300]), fb(x[300:])]) for fb in fbs]
+        self.assertEqual(fbs[1]._pool.size, 3)
+        assert_almost_equal(fouts[1], fouts[0])
+        fb = pickle.loads(pickle.dumps(fbs[1]))
+        self.assertIsNone(fb._pool)
+        assert_almost_equal(fb(x[:300]), fbs[1](x[:300]))
+
+    def testFilterBankXcorrs(self):
+        tf = self.tf - 1
+        xi = self.xi[:tf]
+        fb = FilterBankNode(tf=tf, ce=self.ce, filter_cls=MatchedFilterNode,
+                            dtype=sp.float64, xcorr_check=True)
+        for k in xrange(4):
+            fb.create_filter(xi * (k + 1) + sp.randn(*xi.shape))
+        fb.deactivate(1, check=True)
+        self.assertTupleEqual(fb.xcorrs.shape, (3, 3, 2 * tf - 1))
+        fb.bank[2].append_xi_buf(xi[::-1], recalc=True)
+        fb.activate(1, check=True)
+        self.assertTupleEqual(fb.xcorrs.shape, (4, 4, 2 * tf - 1))
+        assert_almost_equal(
+            fb.xcorrs, xi_vs_f(fb.get_template_set(mc=False),
+                               fb.get_filter_set(mc=False), nc=self.nc))
+
+    def testFilterBankStore(self):
+        tf = self.tf - 1
+        xi = self.xi[:tf]
+        fb = FilterBankNode(tf=tf, ce=self.ce, filter_cls=MatchedFilterNode,
+                            dtype=sp.float64)
+        for k in xrange(12):
+            fb.create_filter(xi * (k + 1))
+        fb.deactivate(3)
+        fb.deactivate(7, check=True)
+        idx = [i for i in xrange(12) if i not in [3, 7]]
+        self.assertListEqual(fb._idx_active_set, idx)
+        self.assertListEqual([fb.get_idx_for(k) for k in xrange(fb.nf)], idx)
+        temps = fb.get_template_set()
+        assert_equal(temps, [fb.bank[i].xi for i in idx])
+        assert_equal(fb.get_filter_set(mc=False),
+                     [fb.bank[i].f_conc for i in idx])
+        assert_equal(fb.get_template_set(active=False),
+                     [fb.bank[i].xi for i in xrange(12)])
+        self.assertIs(fb.get_template_set(), temps)
+        fb.bank[5].append_xi_buf(xi * -1.0, recalc=True)
+        self.assertIsNot(fb.get_template_set(), temps)
+        assert_equal(fb.get_template_set()[4], fb.bank[5].xi)
+        fb.activate(3)
+        self.assertEqual(fb.get_idx_for(3), 3)
+        self.assertEqual(fb.get_template_set().shape, (11, tf, self.nc))
+
+    def testFilterLazyCalc(self):
+        mf_h = MatchedFilterNode(self.tf, self.nc, self.ce)
+        mf_h.append_xi_buf(self.xi, recalc=True)
+        f = mf_h.f
+        self.assertFalse(mf_h.calc_filter())
+        self.assertIs(mf_h.f, f)
+        mf_h.ce = self.ce
+        self.assertDictEqual(mf_h.calc_stats, {'performed': 1, 'skipped': 2})
+        mf_h.append_xi_buf(self.xi * 2.0)
+        self.assertTrue(mf_h.calc_filter())
+        self.ce.update(self.noise)
+        self.assertTrue(mf_h.calc_filter())
+        self.assertTrue(mf_h.calc_filter(force=True))
+        self.assertDictEqual(mf_h.calc_stats, {'performed': 4, 'skipped': 2})
+
+    def testFilterBankLazyCalc(self):
+        tf = self.tf - 1
+        fb = FilterBankNode(tf=tf, ce=self.ce, filter_cls=MatchedFilterNode,
+                            dtype=sp.float64)
+        fb.create_filter(self.xi[:tf])
+        fb.create_filter(self.xi[:tf][::-1])
+        stats = fb.calc_stats
+        fb.deactivate(0, check=True)
+        fb.activate(0, check=True)
+        self.assertEqual(fb.calc_stats['performed'], stats['performed'])
+        self.assertEqual(fb.calc_stats['xcorrs_performed'],
+                         stats['xcorrs_performed'] + 2)
+        fb.ce = self.ce
+        self.assertEqual(fb.calc_stats['xcorrs_skipped'],
+                         stats['xcorrs_skipped'] + 1)
+
+    def testFilterBankLowRank(self):
+        tf = self.tf - 1
+        xi = self.xi[:tf]
+        kwargs = dict(tf=tf, ce=self.ce, filter_cls=MatchedFilterNode,
+                      dtype=sp.float64)
+        fb = FilterBankNode(**kwargs)
+        fb_lr = FilterBankNode(rank=self.nc, **kwargs)
+        self.assertIsNone(fb.lowrank_error)
+        for bank in [fb, fb_lr]:
+            bank.create_filter(xi)
+            bank.create_filter(xi[::-1])
+        x = self.noise
+        fouts = [fb_lr(x[:300]), fb_lr(x[300:])]
+        assert_almost_equal(sp.vstack(fouts), fb(x))
+        assert_almost_equal(fb_lr.lowrank_error, sp.zeros(2))
+
     """
     # build signals
     signal = sp.zeros_like(noise)
@@ -48,16 +48,53 @@ try:
 except ImportError:
     import unittest as ut
 
+import cPickle as pickle
 import scipy as sp
-from botmpy.common import TimeSeriesCovE, VERBOSE
-from botmpy.nodes import BOTMNode
+from botmpy.common import (TimeSeriesCovE, VERBOSE, ArrayChunkSource,
+                           overlaps)
+from botmpy.nodes import (BOTMNode, ProbeSortingNode,
+                          neighbourhoods_from_geometry)
 from numpy.testing import assert_array_almost_equal
 
 ##---TESTS
 
 class TestSortingNodes(ut.TestCase):
     def setUp(self):
-        pass
+        self.tf = 21
+        self.nc = 3
+        proto = sp.cos(sp.linspace(-sp.pi, 3 * sp.pi, self.tf))
+        proto *= sp.hanning(self.tf)
+        self.templates = sp.asarray([sp.outer(proto, [5., 4., 1.]),
+                                     sp.outer(sp.roll(proto, 3),
+                                              [2., 2., 6.])])
+        self.noise = sp.random.RandomState(5).randn(4000, self.nc)
+        self.ce = TimeSeriesCovE(tf_max=self.tf, nc=self.nc)
+        self.ce.update(self.noise)
+        self.taus = [None, range(-9, 10, 3)]
+
+        # spikes every 170 samples, every other one with an overlap
+        rs = sp.random.RandomState(5)
+        signal = sp.zeros_like(self.noise)
+        for pos in xrange(150, 3800, 170):
+            signal[pos:pos + self.tf] += self.templates[rs.randint(2)]
+            if rs.rand() < .5:
+                pos += rs.randint(-8, 9) + 40
+                signal[pos:pos + self.tf] += self.templates[1]
+        self.x = sp.ascontiguousarray(signal + self.noise, dtype=sp.float32)
+
+    def botmKwargs(self, taus):
+        return dict(templates=self.templates, ce=self.ce, ovlp_taus=taus)
+
+    def sortReference(self, taus):
+        """sort the stream in a single chunk"""
+
+        ref = BOTMNode(chunk_size=100000, **self.botmKwargs(taus))
+        ref(self.x)
+        return ref
+
+    def assertRvalEqual(self, rval, ref):
+        for k in ref:
+            self.assertListEqual(list(rval[k]), list(ref[k]))
 
     def testMainSingle(self, verbose=VERBOSE.PLOT):
         import time
@@ -121,5 +158,222 @@ class TestSortingNodes(ut.TestCase):
         for k in FB.rval:
             assert_array_almost_equal(FB.rval[k], test_rval[k], decimal=0)
 
+    def testOverlapChannels(self):
+        signal = sp.zeros_like(self.noise)
+        for pos in [300, 1200, 2100]:
+            signal[pos:pos + self.tf] += self.templates[0]
+            signal[pos + 4:pos + 4 + self.tf] += self.templates[1]
+        x = sp.ascontiguousarray(signal + self.noise, dtype=sp.float32)
+        FB = BOTMNode(templates=self.templates, ce=self.ce,
+                      ovlp_taus=range(-6, 7, 2))
+        FB(x)
+
+        # dense reference of the discriminant functions
+        ns, nf = FB._disc.shape
+        self.assertEqual(nf, FB.nf)
+        dense = sp.empty((ns, nf + len(FB._oc_idx)), dtype=FB._disc.dtype)
+        dense.fill(sp.nan)
+        dense[:, :nf] = FB._disc
+        for k, (f0, f1, tau) in FB._oc_idx.items():
+            lo, hi = max(0, -tau), min(ns, ns - tau)
+            dense[lo:hi, k] = (FB._disc[lo:hi, f0] +
+                               FB._disc[lo + tau:hi + tau, f1] -
+                               FB.get_xcorrs_at(f0, f1, tau))
+        assert_array_almost_equal(FB._disc_slice(0, ns), dense)
+        assert_array_almost_equal(FB._disc_slice(100, 200), dense[100:200])
+        d_max = sp.nanmax(dense, axis=1)
+        self.assertTrue(
+            ((FB._disc_max > FB._lpr_n) == (d_max > FB._lpr_n)).all())
+
+    def testComponentDivergence(self):
+        rs = sp.random.RandomState(7)
+        tf, nc = self.tf, self.nc
+        FB = BOTMNode(templates=self.templates, ce=self.ce)
+        obs = self.templates[rs.randint(2, size=50)] + rs.randn(50, tf, nc)
+
+        # explicit quadratic forms
+        icmx = sp.linalg.inv(self.ce.get_cmx(tf=tf).astype(sp.float64))
+        comps = sp.vstack((FB.get_template_set(mc=False), sp.zeros(tf * nc)))
+        ref = sp.zeros((len(obs), len(comps)))
+        for n in xrange(len(obs)):
+            x = obs[n].T.flatten() - comps
+            for c in xrange(len(comps)):
+                ref[n, c] = sp.dot(x[c], sp.dot(icmx, x[c]))
+        div = FB.component_divergence(obs, with_noise=True)
+        assert_array_almost_equal(div / ref, sp.ones_like(ref))
+        assert_array_almost_equal(
+            FB.component_divergence(obs, with_noise=True, block_size=7), div)
+
+        # posterior
+        post = FB.posterior_prob(obs, with_noise=True, block_size=7)
+        lpr = -.5 * ref + [FB._lpr_s, FB._lpr_s, FB._lpr_n]
+        lpr -= lpr.max(axis=1)[:, sp.newaxis]
+        ref_post = sp.exp(lpr) / sp.exp(lpr).sum(axis=1)[:, sp.newaxis]
+        assert_array_almost_equal(post, ref_post)
+
+    def testEarlySpike(self):
+        tf = self.tf
+
+        # spike starting before the data, its epoch starts before sample 0
+        x = self.noise[:1000] * .5
+        x[:tf - 13] += 10 * self.templates[0][13:]
+        x[500:500 + tf] += self.templates[0]
+        x = sp.ascontiguousarray(x, dtype=sp.float32)
+        for taus in self.taus:
+            FB = BOTMNode(templates=self.templates, ce=self.ce,
+                          ovlp_taus=taus)
+            FB(x)
+            self.assertTrue(any(abs(FB.rval[0] - (tf / 2 - 13)) <= 1))
+            self.assertIn(500 + tf / 2, FB.rval[0])
+
+    def testEvents(self):
+        for taus in self.taus:
+            ref = self.sortReference(taus)
+            self.assertGreater(len(ref.rval[0]) + len(ref.rval[1]), 0)
+            ev = ref.events
+            self.assertTrue((sp.diff(ev[:, 0]) >= 0).all())
+            for k in ref.rval:
+                self.assertListEqual(list(ev[ev[:, 1] == k, 0]),
+                                     list(ref.rval[k]))
+            ovlp = ref.get_overlaps()
+            self.assertIs(ref.get_overlaps(ref._tf), ovlp)
+            for k, mask in overlaps(ref.rval, ref._tf)[0].items():
+                self.assertListEqual(list(ovlp[k]), list(mask))
+                self.assertEqual(len(ref.spikes_u(k)), (mask == False).sum())
+
+    def testChunking(self):
+        for taus in self.taus:
+            ref = self.sortReference(taus)
+            FB = BOTMNode(chunk_size=333, **self.botmKwargs(taus))
+            FB(self.x)
+            self.assertRvalEqual(FB.rval, ref.rval)
+
+    def testArenaAllocations(self):
+        for taus in self.taus:
+            FB = BOTMNode(chunk_size=333, **self.botmKwargs(taus))
+            FB(self.x)
+
+            # no allocations in the steady state
+            n_alloc = FB.arena.n_alloc
+            FB.reset_stream()
+            FB(self.x)
+            self.assertEqual(FB.arena.n_alloc, n_alloc)
+            self.assertEqual(FB._disc.dtype, sp.float32)
+
+    def testPushFlush(self):
+        rs = sp.random.RandomState(11)
+        for taus in self.taus:
+            ref = self.sortReference(taus)
+            FB = BOTMNode(**self.botmKwargs(taus))
+            rval = dict((k, []) for k in ref.rval)
+            pos = 0
+            while pos < len(self.x):
+                blk = rs.randint(1, 60)
+                for k, v in FB.push(self.x[pos:pos + blk]).items():
+                    rval[k].extend(v)
+                pos += blk
+            for k, v in FB.flush().items():
+                rval[k].extend(v)
+            self.assertRvalEqual(rval, ref.rval)
+
+    def testSortParallel(self):
+        for taus in self.taus:
+            ref = self.sortReference(taus)
+            FB = BOTMNode(**self.botmKwargs(taus))
+            rval = FB.sort_parallel(self.x, n_workers=2, overlap=200)
+            self.assertRvalEqual(rval, ref.rval)
+
+    def testSortSource(self):
+        for taus in self.taus:
+            ref = self.sortReference(taus)
+            FB = BOTMNode(**self.botmKwargs(taus))
+            for prefetch in [0, 2]:
+                FB.reset_stream()
+                rval = FB.sort_source(ArrayChunkSource(
+                    self.x, chunk_size=250, dtype=FB.dtype,
+                    prefetch=prefetch))
+                self.assertIsNone(FB._data)
+                self.assertRvalEqual(rval, ref.rval)
+
+
+class TestProbeSortingNode(ut.TestCase):
+    def setUp(self):
+        self.tf = 21
+        self.nc = 6
+        proto = sp.cos(sp.linspace(-sp.pi, 3 * sp.pi, self.tf))
+        proto *= sp.hanning(self.tf)
+        self.proto = proto
+        self.xi = [sp.outer(proto, [1., 5., 4., 0., 0., 0.]),
+                   sp.outer(proto, [0., 0., 0., 2., 6., 3.])]
+        self.len = 4000
+        self.pos = [[200, 1100, 2000, 2900], [600, 1500, 2400, 3300]]
+        self.noise = sp.random.RandomState(1).randn(self.len, self.nc)
+        x = self.noise.copy()
+        for xi, pos in zip(self.xi, self.pos):
+            for p in pos:
+                x[p:p + self.tf] += xi
+        self.x = sp.ascontiguousarray(x, dtype=sp.float32)
+        self.geometry = sp.arange(self.nc) * 25.0
+
+    def assertSpikeTrain(self, st, pos, tol=2):
+        self.assertEqual(len(st), len(pos))
+        self.assertTrue(all(abs(st - sp.asarray(pos)) <= tol))
+
+    def testNeighbourhoods(self):
+        nbh = neighbourhoods_from_geometry(self.geometry, 30.0)
+        self.assertEqual(nbh[0], (0, 1))
+        self.assertEqual(nbh[3], (2, 3, 4))
+        self.assertEqual(nbh[5], (4, 5))
+
+    def testProbeSorting(self):
+        PS = ProbeSortingNode(templates=sp.asarray(self.xi),
+                              geometry=self.geometry, radius=30.0,
+                              noise=self.noise, n_workers=2)
+        self.assertListEqual(sorted(PS.sorters), [1, 4])
+        self.assertEqual(PS.sorters[1].nc, 3)
+        PS(self.x)
+        self.assertListEqual(sorted(PS.rval), [0, 1])
+        for k in PS.rval:
+            self.assertSpikeTrain(PS.rval[k],
+                                  sp.asarray(self.pos[k]) + self.tf / 2)
+
+    def testProbeSortingPool(self):
+        kwargs = dict(templates=sp.asarray(self.xi), geometry=self.geometry,
+                      radius=30.0, noise=self.noise)
+        PS = ProbeSortingNode(n_workers=2, **kwargs)
+        ref = ProbeSortingNode(**kwargs)
+        half = self.len / 2
+        for chunk in [self.x[:half], self.x[half:]]:
+            PS(chunk)
+            ref(chunk)
+            self.assertListEqual(sorted(PS.rval), sorted(ref.rval))
+            for k in ref.rval:
+                self.assertListEqual(list(PS.rval[k]), list(ref.rval[k]))
+        pool = PS._pool
+        self.assertEqual(pool.size, 2)
+        PS(self.x[:half])
+        self.assertIs(PS._pool, pool)
+        self.assertEqual(PS.sorters[1].nf, ref.sorters[1].nf)
+        PS2 = pickle.loads(pickle.dumps(PS))
+        self.assertIsNone(PS2._pool)
+        self.assertListEqual(sorted(PS2.sorters), [1, 4])
+        PS.n_workers = 1
+        PS(self.x[:half])
+        self.assertIsNone(PS._pool)
+        self.assertEqual(pool.size, 0)
+
+    def testProbeSortingDuplicates(self):
+        # third template, similar to the first but peaking on channel 2
+        xi_dup = sp.outer(self.proto, [.5, 4.5, 4.8, .2, 0., 0.])
+        PS = ProbeSortingNode(templates=sp.asarray(self.xi + [xi_dup]),
+                              geometry=self.geometry, radius=30.0,
+                              noise=self.noise)
+        self.assertListEqual(sorted(PS.sorters), [1, 2, 4])
+        PS(self.x)
+        self.assertGreater(PS.n_duplicates, 0)
+        self.assertSpikeTrain(PS.rval[0],
+                              sp.asarray(self.pos[0]) + self.tf / 2)
+        self.assertEqual(len(PS.rval[2]), 0)
+
 if __name__ == '__main__':
     ut.main()
@@ -59,6 +59,7 @@ except ImportError:
 
 # other imports
 import numpy
+import sys
 
 ##--HELPERS
 
@@ -80,13 +81,27 @@ def find_version():
 
 ##---CYTHON
 
+# openmp flags for the parallel kernels, without openmp they run serial
+if sys.platform == 'win32':
+    omp_compile_args, omp_link_args = ['/openmp'], []
+elif sys.platform == 'darwin':
+    omp_compile_args, omp_link_args = [], []
+else:
+    omp_compile_args, omp_link_args = ['-fopenmp'], ['-fopenmp']
+
 ext_mod_list = []
 if build_ext is not None:
     ext_mod_list.append(
         Extension(
             'botmpy.common.mcfilter.mcfilter_cy',
             ['botmpy/common/mcfilter/mcfilter_cy.pyx'],
-            include_dirs=[numpy.get_include()]))
+            include_dirs=[numpy.get_include()],
+            extra_compile_args=omp_compile_args,
+            extra_link_args=omp_link_args))
+    ext_mod_list.append(
+        Extension(
+            'botmpy.common.sic.sic_cy',
+            ['botmpy/common/sic/sic_cy.pyx']))
 
 ##---MAIN
 
@@ -99,6 +114,7 @@ if __name__ == '__main__':
                   'botmpy.common',
                   'botmpy.common.datafile',
                   'botmpy.common.mcfilter',
+                  'botmpy.common.sic',
                   'botmpy.nodes'],
         requires=['numpy', 'scipy', 'mdp', 'sklearn'],
         zip_safe=False,